@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from qc import flag_outliers
 
 def add_replicate_count(summary, df_channel):
     # Count ALL rows per Loaded (independent of Cq or detection)
@@ -30,13 +31,21 @@ def flatten_summary(summary, channel_name):
 
     return flat
 
-def run_analysis(df, layout_lines):
+# run_analysis is split into stages (clean -> layout -> summaries) so callers can
+# cache each one and a layout edit only reruns the last two.
+
+def clean_frame(df):
     # Clean columns
     df.columns = df.columns.str.strip().str.replace(" ", "_")
 
     df["Sample_Name"] = df["Sample_Name"].ffill()
     df["Well_ID"] = df["Well_ID"].ffill()
 
+    return df
+
+def apply_layout(df, layout_lines):
+    df = df.copy()
+
     # Parse layout
     layout = [row.split("\t") for row in layout_lines]
     num_rows = len(layout)
@@ -53,6 +62,11 @@ def run_analysis(df, layout_lines):
     df["Condition"] = df["Loaded"].astype(str).str.split("_").str[1]
     df["Concentration"] = df["Loaded"].astype(str).str.split("_").str[0]
 
+    return df
+
+def summarize_channels(df, exclude_outliers=False, outlier_method="mad"):
+    df = df.copy()
+
     # Split channels
     df_ch2 = df[df["Channel"] == "CH2"].copy()
     df_ch3 = df[df["Channel"] == "CH3"].copy()
@@ -61,9 +75,17 @@ def run_analysis(df, layout_lines):
     df_ch2.loc[df_ch2["Cq"] == -1, "Cq"] = np.nan
     df_ch3.loc[df_ch3["Cq"] == -1, "Cq"] = np.nan
 
+    # Flag replicate outliers per Loaded group (QC_outlier + per-metric scores)
+    df_ch2 = flag_outliers(df_ch2, method=outlier_method)
+    df_ch3 = flag_outliers(df_ch3, method=outlier_method)
+
     ch2_raw = df_ch2.copy()
     ch3_raw = df_ch3.copy()
 
+    if exclude_outliers:
+        df_ch2 = df_ch2[~df_ch2["QC_outlier"]]
+        df_ch3 = df_ch3[~df_ch3["QC_outlier"]]
+
     numeric_cols = ["Cq", "Ampl.", "Slope"]
 
     green_col = "Block02_Phase06_Cycle00_GREEN"
@@ -105,5 +127,10 @@ def run_analysis(df, layout_lines):
 
     return (df, ch2_raw, ch3_raw, flat_ch2, flat_ch3)
 
+def run_analysis(df, layout_lines, exclude_outliers=False, outlier_method="mad"):
+    df = clean_frame(df)
+    df = apply_layout(df, layout_lines)
+    return summarize_channels(df, exclude_outliers=exclude_outliers, outlier_method=outlier_method)
+
 
 
@@ -1,78 +1,80 @@
 import streamlit as st
 import pandas as pd
-from analysis_v6 import run_analysis
+from batch import unique_names
+from comparisons import pairwise_tests, comparison_matrix
+from platemap import METRIC_COLUMNS, layout_grid, plate_figure
+from qc import METHODS as OUTLIER_METHODS, dropped_wells
+from jobs import JobRunner, DONE, FAILED, CANCELLED
+from multiplex import show_co_detection, well_pivot
+from metrics import serve, track_cache, track_jobs, track_streamlit_session
+from instrumentation import StageRecorder, show_timings_panel
+from pipeline import StageCache, analyze_cached
+from report import html_report
+from tables import show_table
+from drilldown import group_index, show_replicates
+from snapshot import EXTENSION as SNAPSHOT_EXTENSION, open_snapshot, save_snapshot
+from static_render import RENDERERS, write_image
+from validation import show_validation_report
 from io import BytesIO
-import plotly.express as px
-import plotly.graph_objects as go
+import hashlib
 from pathlib import Path
-import zipfile
-from zipfile import ZipFile
-import tempfile
 
-# Force a colored template/palette for BOTH interactive display and static exports
-px.defaults.template = "plotly_white"
-px.defaults.color_discrete_sequence = px.colors.qualitative.Plotly
+ANALYSIS_STAGES = ["Analyzing workbooks", "Building figures", "Exporting plots"]
+SNAPSHOT_FRAMES = ["full_df", "ch2", "ch3", "flat_ch2", "flat_ch3", "validation", "well_pivot"]
 
 
-if "analysis_done" not in st.session_state:
-    st.session_state.analysis_done = False
-
-
-st.title("Experiment Analysis")
-
-uploaded_file = st.file_uploader(
-    "Upload Excel file",
-    type=["xlsx"]
-)
-
-st.markdown(
-    "Paste pod loading scheme (tab-separated)  \n"
-    "Use the following format: `concentration_condition`"
-)
+@st.cache_resource
+def get_job_runner():
+    # One pool per server process, shared by all sessions
+    runner = JobRunner(max_workers=2)
+    track_jobs(runner, app="app_v3")
+    return runner
 
-layout_text = st.text_area(
-    "pod_loading_scheme",
-    height=200,
-    placeholder="100_FluA\t100_FluA\t10_FluA\t10_FluA\n50_FluA\t50_FluA\t100_MG\t100_MG\t",
-    label_visibility="collapsed",
-)
 
+@st.cache_resource
+def get_stage_cache():
+    # Parsed workbooks, layout-mapped frames, summaries, figures and exports, keyed per
+    # stage; a layout edit only re-runs mapping + aggregation (and what depends on it)
+    cache = StageCache(max_entries=64)
+    track_cache("stage", lambda: len(cache.entries))
+    return cache
 
-if uploaded_file and layout_text:
-    if st.button("Run analysis"):
-        df = pd.read_excel(uploaded_file)
-        layout_lines = layout_text.strip().split("\n")
 
-        results = run_analysis(df, layout_lines)
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus endpoint on METRICS_PORT, started once per server process
+    return serve()
 
-        (
-            st.session_state.full_df,
-            st.session_state.ch2,
-            st.session_state.ch3,
-            st.session_state.flat_ch2,
-            st.session_state.flat_ch3,
-        ) = results
 
-        st.session_state.analysis_done = True
+def plotting():
+    # plotly is imported on first use so cold starts and table-only views skip it
+    import plotly.express as px
+    import plotly.graph_objects as go
 
-if st.session_state.analysis_done:
-    full_df = st.session_state.full_df
-    ch2 = st.session_state.ch2
-    ch3 = st.session_state.ch3
-    flat_ch2 = st.session_state.flat_ch2
-    flat_ch3 = st.session_state.flat_ch3
+    # Force a colored template/palette for BOTH interactive display and static exports
+    px.defaults.template = "plotly_white"
+    px.defaults.color_discrete_sequence = px.colors.qualitative.Plotly
+    return px, go
 
-    st.success("Analysis completed!")
 
-    st.subheader("CH2 Summary")
-    st.dataframe(flat_ch2)
+def build_figures(ch2, ch3, flat_ch2, flat_ch3):
+    px, go = plotting()
 
-    st.subheader("CH3 Summary")
-    st.dataframe(flat_ch3)
+    # Several pods: compare them side by side, one color per source file
+    multi_file = "Source_File" in ch2.columns and ch2["Source_File"].nunique() > 1
+    color = "Source_File" if multi_file else "Condition"
 
-    # Add numeric helper column for sorting
-    for df in [flat_ch2, flat_ch3]:
-        df["Loaded_num"] = df["Loaded"].str.extract(r"(\d+)").astype(float)
+    # The summaries are shared cached results: plotting columns go on copies
+    det_col = "Detection_%_"
+    flat_ch2, flat_ch3 = (
+        df.assign(
+            Loaded_num=df["Loaded"].str.extract(r"(\d+)", expand=False).astype(float),
+            # Numeric plotting columns (prevents weird label behavior)
+            **{det_col: pd.to_numeric(df.get(det_col), errors="coerce"),
+               "QC_N_loaded": pd.to_numeric(df.get("QC_N_loaded"), errors="coerce")},
+        )
+        for df in (flat_ch2, flat_ch3)
+    )
 
     # Determine descending order per dataframe
     ch2_order = flat_ch2.sort_values(["Loaded_num", "Loaded"], ascending=[False, True])["Loaded"].unique()
@@ -81,19 +83,20 @@ if st.session_state.analysis_done:
 
     figures = {}
 
+    # Boxes mark outliers only; individual replicates come from the summary drill-down
     # --- CH2 boxplots ---
     for metric in ["Cq", "Ampl.", "Slope"]:
         fig = px.box(
             ch2,
             x="Loaded",
             y=metric,
-            color="Condition",
-            points="all",
+            color=color,
+            points="outliers",
             title=f"{metric} by Loaded (CH2)",
             category_orders={"Loaded": ch2_order}
         )
         # cleaner look: legend not needed (x-axis already shows it)
-        fig.update_layout(showlegend=False)
+        fig.update_layout(showlegend=multi_file)
         figures[f"CH2_{metric}_box"] = fig
 
     # --- CH3 boxplots ---
@@ -102,29 +105,24 @@ if st.session_state.analysis_done:
             ch3,
             x="Loaded",
             y=metric,
-            color="Condition",
-            points="all",
+            color=color,
+            points="outliers",
             title=f"{metric} by Loaded (CH3)",
             category_orders={"Loaded": ch3_order}
         )
         # cleaner look: legend not needed (x-axis already shows it)
-        fig.update_layout(showlegend=False)
+        fig.update_layout(showlegend=multi_file)
         figures[f"CH3_{metric}_box"] = fig
 
     # --- Detection rate ---
-    det_col = "Detection_%_"
-
-    # Make sure plotting columns are numeric (prevents weird label behavior)
-    for df in (flat_ch2, flat_ch3):
-        df[det_col] = pd.to_numeric(df.get(det_col), errors="coerce")
-        df["QC_N_loaded"] = pd.to_numeric(df.get("QC_N_loaded"), errors="coerce")
-
     figures["CH2_detection"] = px.bar(
         flat_ch2,
         x="Loaded",
         y=det_col,
         range_y=[0, 100],
-        color="Condition",
+        color=color,
+        barmode="group" if multi_file else "relative",
+        hover_data=["QC_N_loaded"],
         title="Detection rate (CH2)",
         category_orders={"Loaded": ch2_order},
     )
@@ -135,19 +133,20 @@ if st.session_state.analysis_done:
         textfont_size=16,
         insidetextanchor="middle",
     )
-    # n on top (separate text layer)
-    figures["CH2_detection"].add_trace(
-        go.Scatter(
-            x=flat_ch2["Loaded"],
-            y=flat_ch2[det_col],
-            text=flat_ch2["QC_N_loaded"].apply(lambda v: f"n={int(v)}" if pd.notna(v) else ""),
-            mode="text",
-            textposition="top center",
-            textfont=dict(size=14, color="black"),
-            showlegend=False,
-            cliponaxis=False,
+    # n on top (separate text layer); grouped bars keep n in the hover instead
+    if not multi_file:
+        figures["CH2_detection"].add_trace(
+            go.Scatter(
+                x=flat_ch2["Loaded"],
+                y=flat_ch2[det_col],
+                text=flat_ch2["QC_N_loaded"].apply(lambda v: f"n={int(v)}" if pd.notna(v) else ""),
+                mode="text",
+                textposition="top center",
+                textfont=dict(size=14, color="black"),
+                showlegend=False,
+                cliponaxis=False,
+            )
         )
-    )
     figures["CH2_detection"].update_layout(margin=dict(t=60))
     figures["CH2_detection"].update_yaxes(range=[0, 105])
 
@@ -156,7 +155,9 @@ if st.session_state.analysis_done:
         x="Loaded",
         y=det_col,
         range_y=[0, 100],
-        color="Condition",
+        color=color,
+        barmode="group" if multi_file else "relative",
+        hover_data=["QC_N_loaded"],
         title="Detection rate (CH3)",
         category_orders={"Loaded": ch3_order},
     )
@@ -167,28 +168,332 @@ if st.session_state.analysis_done:
         textfont_size=16,
         insidetextanchor="middle",
     )
-    # n on top (separate text layer)
-    figures["CH3_detection"].add_trace(
-        go.Scatter(
-            x=flat_ch3["Loaded"],
-            y=flat_ch3[det_col],
-            text=flat_ch3["QC_N_loaded"].apply(lambda v: f"n={int(v)}" if pd.notna(v) else ""),
-            mode="text",
-            textposition="top center",
-            textfont=dict(size=14, color="black"),
-            showlegend=False,
-            cliponaxis=False,
+    # n on top (separate text layer); grouped bars keep n in the hover instead
+    if not multi_file:
+        figures["CH3_detection"].add_trace(
+            go.Scatter(
+                x=flat_ch3["Loaded"],
+                y=flat_ch3[det_col],
+                text=flat_ch3["QC_N_loaded"].apply(lambda v: f"n={int(v)}" if pd.notna(v) else ""),
+                mode="text",
+                textposition="top center",
+                textfont=dict(size=14, color="black"),
+                showlegend=False,
+                cliponaxis=False,
+            )
         )
-    )
     figures["CH3_detection"].update_layout(margin=dict(t=60))
     figures["CH3_detection"].update_yaxes(range=[0, 105])
 
+    return figures
+
+
+def build_export(figures, flat_ch2, flat_ch3, full_df, job=None, timings=None, renderer="kaleido"):
+    import tempfile
+    from zipfile import ZipFile
+
+    timings = timings or StageRecorder(log_path=None, trace_memory=False)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+
+        # ---- Save plots ----
+        plot_dir = tmpdir / "plots"
+        plot_dir.mkdir()
+
+        with timings.stage("png_export", rows=len(figures)) as rec:
+            rec["renderer"] = renderer
+            for name, fig in figures.items():
+                if job is not None:
+                    job.enter("Exporting plots")
+                # Ensure exported images keep the same styling/colors
+                fig.update_layout(template="plotly_white")
+                write_image(fig, plot_dir / f"{name}.png", renderer=renderer, scale=2)
+
+        # ---- Save Excel ----
+        excel_path = tmpdir / "qPCR_analysis.xlsx"
+        with timings.stage("excel_write", rows=len(full_df)):
+            with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
+                flat_ch2.to_excel(writer, sheet_name="CH2_summary")
+                flat_ch3.to_excel(writer, sheet_name="CH3_summary")
+                full_df.to_excel(writer, sheet_name="Full_Data", index=False)
+
+        # ---- Zip everything ----
+        zip_buffer = BytesIO()
+        with timings.stage("zip"):
+            with ZipFile(zip_buffer, "w") as zipf:
+                zipf.write(excel_path, arcname="qPCR_analysis.xlsx")
+                for img in plot_dir.iterdir():
+                    zipf.write(img, arcname=f"plots/{img.name}")
+
+    return zip_buffer.getvalue()
+
+
+def analysis_job(job, cache, files, layouts, qc_options, renderer="kaleido"):
+    timings = StageRecorder(
+        run_id=job.key, app="app_v3", files=len(files), upload_bytes=sum(len(b) for _, b in files)
+    )
+
+    # New workbooks are parsed in worker processes; cached ones skip straight to mapping
+    job.enter("Analyzing workbooks")
+    merged, key = analyze_cached(
+        cache, files, layouts, on_done=lambda name: job.enter("Analyzing workbooks"), timings=timings, **qc_options
+    )
+    full_df, ch2, ch3 = merged["full_df"], merged["ch2"], merged["ch3"]
+    flat_ch2, flat_ch3 = merged["flat_ch2"], merged["flat_ch3"]
+
+    with timings.stage("well_pivot", rows=len(full_df)):
+        pivot = cache.get("well_pivot", key, lambda: well_pivot(full_df, experiment_col="Source_File"))
+
+    job.enter("Building figures")
+    with timings.stage("figures") as rec:
+        figures = cache.get("figures", key, lambda: build_figures(ch2, ch3, flat_ch2, flat_ch3))
+        rec["rows"] = len(figures)
+
+    job.enter("Exporting plots")
+    with timings.stage("html_report", rows=len(figures)):
+        report_html = cache.get(
+            "report", key,
+            lambda: html_report(figures, {"CH2 summary": flat_ch2, "CH3 summary": flat_ch3}, title="qPCR analysis"),
+        )
+    export_zip = cache.get(
+        "export", (key, renderer),
+        lambda: build_export(figures, flat_ch2, flat_ch3, full_df, job=job, timings=timings, renderer=renderer),
+    )
+
+    return {
+        "full_df": full_df,
+        "ch2": ch2,
+        "ch3": ch3,
+        "flat_ch2": flat_ch2,
+        "flat_ch3": flat_ch3,
+        "figures": figures,
+        "export_zip": export_zip,
+        "report_html": report_html,
+        "validation": merged["validation"],
+        "well_pivot": pivot,
+        "timings": timings,
+        "layouts": layouts,
+        "qc_options": qc_options,
+        "renderer": renderer,
+    }
+
+
+def snapshot_bytes(state):
+    # Everything needed to show a finished analysis again, without the uploads. The
+    # ZIP export and HTML report are derived from these and rebuilt on demand.
+    return save_snapshot(
+        {name: state[name] for name in SNAPSHOT_FRAMES if name in state},
+        figures=state["figures"],
+        meta={
+            "app": "app_v3", "layouts": state["layouts"], "qc_options": state["qc_options"],
+            "renderer": state.get("renderer", "builtin"),
+        },
+    )
+
+
+def restore_snapshot(data):
+    snap = open_snapshot(data)
+    if snap.meta.get("app") != "app_v3":
+        raise ValueError("This file was saved by a different app")
+    frames = snap.frames()
+    for name, frame in frames.items():
+        st.session_state[name] = frame
+    # Figures stay JSON until a plot is drawn; downloads are rebuilt when clicked
+    figures = snap.figures
+    st.session_state.figures = figures
+    st.session_state.export_zip = lambda: build_export(
+        figures, frames["flat_ch2"], frames["flat_ch3"], frames["full_df"], renderer=snap.meta["renderer"]
+    )
+    st.session_state.report_html = lambda: html_report(
+        figures, {"CH2 summary": frames["flat_ch2"], "CH3 summary": frames["flat_ch3"]}, title="qPCR analysis"
+    )
+    st.session_state.renderer = snap.meta["renderer"]
+    st.session_state.layouts = snap.meta["layouts"]
+    st.session_state.qc_options = snap.meta["qc_options"]
+    st.session_state.timings = None
+    st.session_state.job_key = None
+    st.query_params.pop("job", None)
+    st.session_state.analysis_done = True
+
+
+def show_drilldown(summary, replicates, selected, name):
+    # Selected summary row -> its replicate wells, through a group index over this
+    # channel's replicates (built on the first drill-down)
+    keys = ["Source_File", "Loaded"]
+    if selected and selected[0] < len(summary):
+        index = group_index(st.session_state, name, replicates, keys)
+        with st.expander("Replicates", expanded=True):
+            show_replicates(replicates, index, tuple(summary.iloc[selected[0]][keys]), key=name)
+
+
+@st.fragment(run_every=1)
+def show_job_progress(job_key):
+    job = get_job_runner().get(job_key)
+    if job is None or not job.active:
+        # Finished (or gone): rerun the whole script to pick up the result
+        st.rerun()
+
+    st.progress(job.progress, text=f"{job.stage or 'Queued'}…")
+    if st.button("Cancel analysis"):
+        job.cancel()
+
+
+get_metrics_server()
+
+if "analysis_done" not in st.session_state:
+    st.session_state.analysis_done = False
+if "job_key" not in st.session_state:
+    # Re-attach to a job started before a browser refresh
+    st.session_state.job_key = st.query_params.get("job")
+
+
+with st.sidebar.expander("Saved analyses"):
+    saved = st.file_uploader("Open analysis", type=[SNAPSHOT_EXTENSION.lstrip(".")])
+    if saved is not None and st.session_state.get("restored_file") != saved.file_id:
+        try:
+            restore_snapshot(saved.getvalue())
+            st.session_state.restored_file = saved.file_id
+        except ValueError as exc:
+            st.error(str(exc))
+    if st.session_state.analysis_done:
+        state = {
+            name: st.session_state[name]
+            for name in SNAPSHOT_FRAMES + ["figures", "layouts", "qc_options", "renderer"] if name in st.session_state
+        }
+        # Built only when clicked, on Streamlit's download thread
+        st.download_button(
+            "Save analysis",
+            data=lambda: snapshot_bytes(state),
+            file_name=f"qPCR_analysis{SNAPSHOT_EXTENSION}",
+            mime="application/octet-stream",
+        )
+
+st.title("Experiment Analysis")
+
+uploaded_files = st.file_uploader(
+    "Upload Excel file(s)",
+    type=["xlsx"],
+    accept_multiple_files=True,
+)
+file_names = unique_names([f.name for f in uploaded_files or []])
+
+st.markdown(
+    "Paste pod loading scheme (tab-separated)  \n"
+    "Use the following format: `concentration_condition`"
+)
+
+same_layout = True
+if len(file_names) > 1:
+    same_layout = st.checkbox("Use the same loading scheme for all files", True)
+
+layout_placeholder = "100_FluA\t100_FluA\t10_FluA\t10_FluA\n50_FluA\t50_FluA\t100_MG\t100_MG\t"
+if same_layout:
+    layout_text = st.text_area(
+        "pod_loading_scheme",
+        height=200,
+        placeholder=layout_placeholder,
+        label_visibility="collapsed",
+    )
+    layout_texts = {name: layout_text for name in file_names}
+else:
+    layout_texts = {
+        name: st.text_area(f"Loading scheme for {name}", height=150, placeholder=layout_placeholder, key=f"layout_{name}")
+        for name in file_names
+    }
+
+
+with st.expander("Replicate QC"):
+    qc_options = {
+        "outlier_method": st.selectbox(
+            "Outlier test (per Loaded group)", OUTLIER_METHODS,
+            format_func={"mad": "Robust z-score (MAD)", "grubbs": "Grubbs", "dixon": "Dixon's Q"}.get,
+        ),
+        "exclude_outliers": st.checkbox("Exclude flagged replicates from summaries", False),
+    }
+
+with st.expander("Export"):
+    # Kaleido needs a headless Chromium; the builtin renderer draws the plots in-process
+    renderer = st.selectbox(
+        "Static plot renderer", RENDERERS,
+        format_func={"builtin": "Builtin (fast, no browser)", "kaleido": "Kaleido (exact plotly look)"}.get,
+    )
+
+if uploaded_files and all(t.strip() for t in layout_texts.values()):
+    if st.button("Run analysis"):
+        files = [(name, f.getvalue()) for name, f in zip(file_names, uploaded_files)]
+        layouts = {name: text.strip().split("\n") for name, text in layout_texts.items()}
+
+        # Same workbooks + layouts + QC options -> same job, so repeated clicks reuse the result
+        h = hashlib.sha256(repr((sorted(qc_options.items()), renderer)).encode())
+        for name, file_bytes in files:
+            h.update(name.encode() + file_bytes + layout_texts[name].strip().encode())
+        job_key = h.hexdigest()[:16]
+        get_job_runner().submit(
+            job_key, analysis_job, get_stage_cache(), files, layouts, qc_options, renderer, stages=ANALYSIS_STAGES
+        )
+
+        st.session_state.job_key = job_key
+        st.query_params["job"] = job_key
+        st.session_state.analysis_done = False
+
+job = get_job_runner().get(st.session_state.job_key) if st.session_state.job_key else None
+
+if job is not None and job.active:
+    show_job_progress(job.key)
+elif job is not None and job.status == DONE and not st.session_state.analysis_done:
+    for name, value in job.result.items():
+        st.session_state[name] = value
+    st.session_state.analysis_done = True
+elif job is not None and job.status == FAILED:
+    st.error(f"Analysis failed: {job.error.splitlines()[0]}")
+elif job is not None and job.status == CANCELLED:
+    st.warning("Analysis cancelled.")
+
+show_timings_panel(st.session_state.get("timings"))
+
+if st.session_state.analysis_done:
+    full_df = st.session_state.full_df
+    ch2 = st.session_state.ch2
+    ch3 = st.session_state.ch3
+    flat_ch2 = st.session_state.flat_ch2
+    flat_ch3 = st.session_state.flat_ch3
+    figures = st.session_state.figures
+
+    st.success("Analysis completed!")
+    show_validation_report(st.session_state.get("validation"))
+
+    st.caption("Select a summary row to see its replicate wells.")
+    st.subheader("CH2 Summary")
+    show_drilldown(flat_ch2, ch2, show_table(flat_ch2, key="flat_ch2", select=True), "ch2")
+
+    st.subheader("CH3 Summary")
+    show_drilldown(flat_ch3, ch3, show_table(flat_ch3, key="flat_ch3", select=True), "ch3")
+
+    flagged = dropped_wells(pd.concat([ch2, ch3], ignore_index=True))
+    if len(flagged):
+        st.subheader("QC: flagged replicates")
+        excluded = st.session_state.qc_options["exclude_outliers"]
+        st.caption(
+            f"{len(flagged)} replicate(s) flagged by {st.session_state.qc_options['outlier_method']}; "
+            + ("excluded from the summaries above." if excluded else "still included in the summaries above.")
+        )
+        st.dataframe(flagged)
+
 
     st.sidebar.header("Plots")
 
     show_ch2 = st.sidebar.checkbox("Show CH2", True)
     show_ch3 = st.sidebar.checkbox("Show CH3", True)
     show_detection = st.sidebar.checkbox("Show detection rate", True)
+    show_stats = st.sidebar.checkbox("Show statistical comparisons", False)
+    show_plate = st.sidebar.checkbox("Show plate map", False)
+    show_multiplex = st.sidebar.checkbox("Show multiplex co-detection", False)
+    show_replicates_toggle = st.sidebar.checkbox("Show replicate data", False)
+
+    if show_replicates_toggle:
+        st.subheader("Replicate data")
+        show_table(full_df, key="full_df")
 
     if show_ch2:
         st.subheader("CH2")
@@ -209,35 +514,78 @@ if st.session_state.analysis_done:
         if show_ch3:
             st.plotly_chart(figures["CH3_detection"], use_container_width=True)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir = Path(tmpdir)
-
-        # ---- Save plots ----
-        plot_dir = tmpdir / "plots"
-        plot_dir.mkdir()
-
-        for name, fig in figures.items():
-            # Ensure exported images keep the same styling/colors
-            fig.update_layout(template="plotly_white")
-            fig.write_image(plot_dir / f"{name}.png", scale=2)
+    if show_stats:
+        st.subheader("Pairwise comparisons (Welch t-test)")
+        correction = st.selectbox(
+            "Multiple-testing correction",
+            ["fdr_bh", "holm", "bonferroni", "none"],
+        )
+        # Conditions are compared within each pod, never across files
+        source_files = list(ch2["Source_File"].unique())
+        comparisons = pairwise_tests(
+            pd.concat([ch2, ch3], ignore_index=True),
+            group_col="Loaded",
+            by=["Channel", "Source_File"],
+            correction=correction,
+        )
+        st.dataframe(comparisons)
+
+        col_ch, col_metric = st.columns(2)
+        heat_channel = col_ch.selectbox("Channel", ["CH2", "CH3"])
+        heat_metric = col_metric.selectbox("Metric", ["Cq", "Ampl.", "Slope"])
+        heat_file = source_files[0]
+        if len(source_files) > 1:
+            heat_file = st.selectbox("File", source_files)
+        matrix = comparison_matrix(comparisons, heat_metric, Channel=heat_channel, Source_File=heat_file)
+        px, _ = plotting()
+        st.plotly_chart(
+            px.imshow(
+                matrix,
+                zmin=0,
+                zmax=1,
+                color_continuous_scale="RdBu",
+                text_auto=".3f",
+                title=f"Adjusted p-values, {heat_metric} ({heat_channel})",
+            ),
+            use_container_width=True,
+        )
 
-        # ---- Save Excel ----
-        excel_path = tmpdir / "qPCR_analysis.xlsx"
-        with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
-            flat_ch2.to_excel(writer, sheet_name="CH2_summary")
-            flat_ch3.to_excel(writer, sheet_name="CH3_summary")
-            full_df.to_excel(writer, sheet_name="Full_Data", index=False)
+    if show_multiplex and st.session_state.get("well_pivot") is not None:
+        st.subheader("Multiplex co-detection")
+        pivot = st.session_state.well_pivot
+        st.caption("One row per well; a well counts as positive in a channel when that channel's Classification is POSITIVE.")
+        show_co_detection(pivot, by=("Source_File", "Loaded") if pivot["Source_File"].nunique() > 1 else ("Loaded",))
+
+    if show_plate:
+        st.subheader("Plate map")
+        plate_metric = st.selectbox("Plate map metric", METRIC_COLUMNS)
+        layouts = st.session_state.layouts
+        grids = [layout_grid(lines) for lines in layouts.values()]
+        labels = grids[0]
+        # Hover labels only make sense if every file used the same scheme
+        same_scheme = all(g.shape == labels.shape and (g == labels).all() for g in grids)
+        st.plotly_chart(
+            plate_figure(
+                full_df,
+                plate_metric,
+                *labels.shape,
+                labels=labels if same_scheme else None,
+                experiment_col="Source_File" if len(layouts) > 1 else None,
+            ),
+            use_container_width=True,
+        )
 
-        # ---- Zip everything ----
-        zip_buffer = BytesIO()
-        with ZipFile(zip_buffer, "w") as zipf:
-            zipf.write(excel_path, arcname="qPCR_analysis.xlsx")
-            for img in plot_dir.iterdir():
-                zipf.write(img, arcname=f"plots/{img.name}")
+    st.download_button(
+        "Download Excel + all plots",
+        data=st.session_state.export_zip,
+        file_name="qPCR_results.zip",
+        mime="application/zip"
+    )
+    st.download_button(
+        "Download interactive HTML report",
+        data=st.session_state.report_html,
+        file_name="qPCR_report.html",
+        mime="text/html",
+    )
 
-        st.download_button(
-            "Download Excel + all plots",
-            data=zip_buffer.getvalue(),
-            file_name="qPCR_results.zip",
-            mime="application/zip"
-        )
\ No newline at end of file
+track_streamlit_session()
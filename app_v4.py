@@ -4,10 +4,31 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from io import BytesIO
-import plotly.express as px
-from scipy.stats import ttest_ind
-import zipfile
-import os
+from comparisons import pairwise_tests
+from dedup import DedupIndex, ingest_multi
+from drilldown import group_index, show_replicates
+from multi_experiment import ROLLUP_LEVELS, build_cube, rollup_summary, summary_from_cube
+from rollup import DIMENSIONS, with_derived
+from platemap import METRIC_COLUMNS, infer_geometry, layout_grid, plate_figure
+from qc import METHODS as OUTLIER_METHODS, dropped_wells, flag_outliers
+from jobs import JobRunner, DONE, FAILED, CANCELLED
+from multi_export import export_multi
+from multiplex import show_co_detection, well_pivot
+from instrumentation import StageRecorder, show_timings_panel
+from metrics import serve, track_cache, track_jobs, track_streamlit_session
+from pipeline import StageCache
+from filters import RowIndex, show_filters
+from formats import load
+from report import html_report
+from snapshot import EXTENSION as SNAPSHOT_EXTENSION, open_snapshot, save_snapshot
+from tables import show_table
+from trending import CONTROLS, TREND_KEY, ControlTracker, control_chart, control_rows
+from validation import show_validation_report, validate_multi, validate_pod
+import hashlib
+
+MULTI_METRICS = ["Cq", "Ampl.", "Slope"]
+# Summary rows are looked up by the replicate filter's surviving keys
+SUMMARY_INDEX = ["Experiment_ID", "Channel", "Loaded"]
 
 # --- Helpers ---
 
@@ -22,7 +43,7 @@ def flatten_summary(summary_df, channel):
     flat["Channel"] = channel
     return flat.reset_index()
 
-def run_analysis_single(df, layout_lines):
+def run_analysis_single(df, layout_lines, exclude_outliers=False, outlier_method="mad"):
     # Clean columns
     df.columns = df.columns.str.strip().str.replace(" ", "_")
     df["Sample_Name"] = df["Sample_Name"].ffill()
@@ -45,83 +66,451 @@ def run_analysis_single(df, layout_lines):
     ch2.loc[ch2["Cq"]==-1, "Cq"] = np.nan
     ch3.loc[ch3["Cq"]==-1, "Cq"] = np.nan
 
+    # Replicate QC per Loaded group; the flags are carried back onto the replicate rows
+    ch2 = flag_outliers(ch2, method=outlier_method)
+    ch3 = flag_outliers(ch3, method=outlier_method)
+    df = df.join(pd.concat([ch2, ch3])[["Cq_outlier_score", "QC_outlier"]])
+    df["QC_outlier"] = df["QC_outlier"].fillna(False).astype(bool)
+    used_ch2 = ch2[~ch2["QC_outlier"]] if exclude_outliers else ch2
+    used_ch3 = ch3[~ch3["QC_outlier"]] if exclude_outliers else ch3
+
     # Summaries
-    summary_ch2 = ch2.groupby("Loaded")[["Cq","Ampl.","Slope"]].agg(["mean","std"])
-    summary_ch3 = ch3.groupby("Loaded")[["Cq","Ampl.","Slope"]].agg(["mean","std"])
+    summary_ch2 = used_ch2.groupby("Loaded")[["Cq","Ampl.","Slope"]].agg(["mean","std"])
+    summary_ch3 = used_ch3.groupby("Loaded")[["Cq","Ampl.","Slope"]].agg(["mean","std"])
 
-    summary_ch2 = add_replicate_count(summary_ch2, ch2)
-    summary_ch3 = add_replicate_count(summary_ch3, ch3)
+    summary_ch2 = add_replicate_count(summary_ch2, used_ch2)
+    summary_ch3 = add_replicate_count(summary_ch3, used_ch3)
 
     # Detection %
-    summary_ch2["Detection_%_"] = ch2.groupby("Loaded")["Classification"].apply(lambda x: (x=="POSITIVE").mean()*100).values
-    summary_ch3["Detection_%_"] = ch3.groupby("Loaded")["Classification"].apply(lambda x: (x=="POSITIVE").mean()*100).values
+    summary_ch2["Detection_%_"] = used_ch2.groupby("Loaded")["Classification"].apply(lambda x: (x=="POSITIVE").mean()*100).values
+    summary_ch3["Detection_%_"] = used_ch3.groupby("Loaded")["Classification"].apply(lambda x: (x=="POSITIVE").mean()*100).values
 
     flat_ch2 = flatten_summary(summary_ch2, "CH2")
     flat_ch3 = flatten_summary(summary_ch3, "CH3")
 
     return df, summary_ch2, summary_ch3, flat_ch2, flat_ch3, ch2, ch3
 
-def parse_multi_experiment_excel(uploaded_file):
-    raw = pd.read_excel(uploaded_file, header=None)
-
-    # find experiment starts
-    id_rows = raw.index[
-        raw[0].astype(str).str.startswith("ID:")
-    ].tolist()
-    id_rows.append(len(raw))
-
-    experiments = []
-
-    for i in range(len(id_rows) - 1):
-        block = raw.iloc[id_rows[i]:id_rows[i+1]].reset_index(drop=True)
-
-        exp_id = block.iloc[0, 0].replace("ID:", "").strip()
-        exp_name = block.loc[block[0].str.startswith("Name:"), 0].iloc[0].replace("Name:", "").strip()
-        device = block.loc[block[0].str.startswith("Device:"), 0].iloc[0].replace("Device:", "").strip()
-
-        header_row = block.index[block[0] == "Sample Name"][0]
-
-        df = block.iloc[header_row + 1:].copy()
-        df.columns = block.iloc[header_row]
-        df = df.dropna(how="all")
-
-        df["Sample Name"] = df["Sample Name"].ffill()
-        df["Well ID"] = df["Well ID"].ffill()
-
-        df["Experiment_ID"] = exp_id
-        df["Experiment_Name"] = exp_name
-        df["Device"] = device
-
-        experiments.append(df)
-
-    df_all = pd.concat(experiments, ignore_index=True)
-
-    # clean numerics
-    for col in ["Cq", "Ampl.", "Slope"]:
-        df_all[col] = pd.to_numeric(df_all[col], errors="coerce")
+def build_pod_figures(raw_ch2, raw_ch3, flat_ch2, flat_ch3):
+    # plotly is only imported once figures are actually built
+    import plotly.express as px
+
+    figures = {}
+
+    # Boxes mark outliers only; individual replicates come from the summary drill-down
+    # CH2 boxplots
+    for metric in ["Cq","Ampl.","Slope"]:
+        fig = px.box(
+            raw_ch2,
+            x="Loaded",
+            y=metric,
+            points="outliers",
+            title=f"{metric} by Loaded (CH2)"
+        )
+        figures[f"CH2_{metric}_box"] = fig
+
+    # CH3 boxplots
+    for metric in ["Cq","Ampl.","Slope"]:
+        fig = px.box(
+            raw_ch3,
+            x="Loaded",
+            y=metric,
+            points="outliers",
+            title=f"{metric} by Loaded (CH3)"
+        )
+        figures[f"CH3_{metric}_box"] = fig
+
+    # Detection rate
+    for ch, flat in zip(["CH2","CH3"], [flat_ch2, flat_ch3]):
+        fig_det = px.bar(
+            flat,
+            x="Loaded",
+            y="Detection_%__",
+            text="Detection_%__",
+            title=f"Detection rate ({ch})",
+            range_y=[0,100]
+        )
+        fig_det.update_traces(
+            text=flat["Detection_%__"].round(1).astype(str)+"%",
+            textposition="inside"
+        )
+        for i,row in flat.iterrows():
+            fig_det.add_annotation(
+                x=row["Loaded"],
+                y=row["Detection_%__"],
+                text=f"n={int(row['QC_N_loaded_'])}",
+                showarrow=False,
+                yshift=12
+            )
+        figures[f"{ch}_detection"] = fig_det
+
+    return figures
+
+def multi_box_figure(df_multi, metric):
+    # Outliers only; individual replicates come from the summary drill-down
+    import plotly.express as px
+
+    return px.box(
+        df_multi,
+        x="Loaded",
+        y=metric,
+        color="Experiment_ID",
+        facet_col="Channel",
+        points="outliers",
+        title=f"{metric} by Loaded across experiments"
+    )
 
-    df_all["Detected"] = df_all["Classification"] == "POSITIVE"
+def detection_figure(combined_summary):
+    import plotly.express as px
+
+    fig_det = px.bar(
+        combined_summary,
+        x="Loaded",
+        y="Detection_%_",
+        color="Experiment_ID",
+        facet_col="Channel",
+        text="Detection_%_",
+        title="Detection rate across experiments",
+        range_y=[0,100]
+    )
+    for i,row in combined_summary.iterrows():
+        fig_det.add_annotation(
+            x=row["Loaded"],
+            y=row["Detection_%_"],
+            text=f"n={int(row['N_replicates'])}",
+            showarrow=False,
+            yshift=10
+        )
+    return fig_det
+
+def pvalue_figure(ch_cmp, ch):
+    import plotly.express as px
+
+    pivot = (
+        ch_cmp[ch_cmp["Metric"] == "Cq"]
+        .assign(Pair=lambda d: d["Group_A"].astype(str) + " vs " + d["Group_B"].astype(str))
+        .pivot_table(index="Loaded", columns="Pair", values="p_adj")
+    )
+    return px.imshow(
+        pivot,
+        zmin=0,
+        zmax=1,
+        color_continuous_scale="RdBu",
+        title=f"Adjusted p-values, Cq across experiments ({ch})"
+    )
 
-    return df_all
+def build_multi_figures(df_multi, combined_summary, comparisons):
+    figures = {}
+    for metric in MULTI_METRICS:
+        figures[f"{metric}_box"] = multi_box_figure(df_multi, metric)
+    # Detection
+    figures["detection"] = detection_figure(combined_summary)
+    for ch, ch_cmp in comparisons.groupby("Channel"):
+        figures[f"{ch}_Cq_pvalues"] = pvalue_figure(ch_cmp, ch)
+    return figures
+
+def show_flagged(result):
+    # Older saved pod analyses have no QC flags
+    flagged = result.get("flagged")
+    if flagged is not None and len(flagged):
+        st.subheader("QC: flagged replicates")
+        st.caption(
+            "Excluded from the summary above." if result.get("exclude_outliers")
+            else "Still included in the summary above."
+        )
+        st.dataframe(flagged)
+
+def show_drilldown(result, summary, replicates, selected, keys, name):
+    # Selected summary row -> its replicate wells, through a group index kept with the
+    # job result (built on the first drill-down)
+    if selected and selected[0] < len(summary):
+        index = group_index(result, name, replicates, keys)
+        with st.expander("Replicates", expanded=True):
+            show_replicates(replicates, index, tuple(summary.iloc[selected[0]][keys]), key=f"drill_{name}")
+
+def filtered_view(result, rows):
+    # Replicates, summary and comparisons restricted to the filtered rows. Summary rows
+    # are picked through their own index from the (Experiment_ID, Channel, Loaded) values
+    # left in the replicates; every filter column is a function of those three.
+    index = result["row_index"]
+    keep = {col: index.distinct(col, rows) for col in ("Experiment_ID", "Channel", "Loaded")}
+    summary_rows = result["summary_index"].rows(keep)
+    summary = result["combined_summary"]
+    comparisons = result["comparisons"]
+    in_view = (
+        comparisons["Channel"].isin(keep["Channel"]) & comparisons["Loaded"].isin(keep["Loaded"])
+        & comparisons["Group_A"].isin(keep["Experiment_ID"]) & comparisons["Group_B"].isin(keep["Experiment_ID"])
+    )
+    return (
+        result["full_df"].take(rows),
+        summary if summary_rows is None else summary.take(summary_rows),
+        comparisons[in_view.to_numpy()],
+    )
 
+def filtered_figures(job, rows, view):
+    # Figures for a filtered view. Each figure is keyed by the rows it is drawn from:
+    # figures whose input is unchanged come from the job (unfiltered) or from the
+    # previous view, so only the ones the filter touches are rebuilt.
+    df_view, summary_view, comparisons_view = view
+    previous = st.session_state.get("multi_figure_cache", {})
+    cache, figures = {}, {}
+
+    def figure(name, token, build):
+        if token is None:
+            figures[name] = job.result["figures"][name]
+            return
+        key = (job.key, name, token)
+        cache[key] = previous[key] if key in previous else build()
+        figures[name] = cache[key]
+
+    def token(positions, total):
+        return None if len(positions) == total else hashlib.sha1(np.asarray(positions).tobytes()).hexdigest()
+
+    rows_token = token(rows, len(job.result["full_df"]))
+    for metric in MULTI_METRICS:
+        figure(f"{metric}_box", rows_token, lambda metric=metric: multi_box_figure(df_view, metric))
+    figure(
+        "detection", token(summary_view.index, len(job.result["combined_summary"])),
+        lambda: detection_figure(summary_view),
+    )
+    comparisons = job.result["comparisons"]
+    for ch, ch_cmp in comparisons_view.groupby("Channel"):
+        figure(
+            f"{ch}_Cq_pvalues", token(ch_cmp.index, int((comparisons["Channel"] == ch).sum())),
+            lambda ch_cmp=ch_cmp, ch=ch: pvalue_figure(ch_cmp, ch),
+        )
+    st.session_state.multi_figure_cache = cache
+    return figures
+
+# --- Background jobs ---
+
+@st.cache_resource
+def get_job_runner():
+    runner = JobRunner(max_workers=2)
+    track_jobs(runner, app="app_v4")
+    return runner
+
+@st.cache_resource
+def get_control_tracker():
+    # Running control statistics shared by all sessions; history lives in TREND_DIR
+    return ControlTracker()
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus endpoint on METRICS_PORT, started once per server process
+    return serve()
+
+@st.cache_resource
+def get_stage_cache():
+    # Scanned uploads and parsed experiment blocks, keyed by content hash, so re-uploads
+    # and files sharing experiments skip the parsing
+    cache = StageCache(max_entries=256)
+    track_cache("stage", lambda: len(cache.entries))
+    return cache
+
+def pod_job(job, file_bytes, layout_lines, exclude_outliers=False, outlier_method="mad"):
+    timings = StageRecorder(run_id=job.key, app="app_v4", mode="single", upload_bytes=len(file_bytes))
+    job.enter("Reading workbook")
+    with timings.stage("ingest") as rec:
+        _, df = load(file_bytes, expect="single_pod")
+        rec["rows"] = len(df)
+    job.enter("Running analysis")
+    with timings.stage("run_analysis", rows=len(df)):
+        full_df, ch2, ch3, flat_ch2, flat_ch3, raw_ch2, raw_ch3 = run_analysis_single(
+            df, layout_lines, exclude_outliers=exclude_outliers, outlier_method=outlier_method,
+        )
+    with timings.stage("validate", rows=len(full_df)):
+        validation = validate_pod(full_df)
+    with timings.stage("well_pivot", rows=len(full_df)):
+        pivot = well_pivot(full_df)
+    job.enter("Building figures")
+    with timings.stage("figures") as rec:
+        figures = build_pod_figures(raw_ch2, raw_ch3, flat_ch2, flat_ch3)
+        rec["rows"] = len(figures)
+    with timings.stage("html_report", rows=len(figures)):
+        report_html = html_report(figures, {"CH2 summary": flat_ch2, "CH3 summary": flat_ch3}, title="Pod analysis")
+    return {
+        "full_df": full_df,
+        "flat_ch2": flat_ch2,
+        "flat_ch3": flat_ch3,
+        "figures": figures,
+        "timings": timings,
+        "report_html": report_html,
+        "validation": validation,
+        "well_pivot": pivot,
+        "layout_lines": layout_lines,
+        "flagged": dropped_wells(full_df),
+        "exclude_outliers": exclude_outliers,
+        "outlier_method": outlier_method,
+    }
+
+def multi_collection():
+    # Experiments ingested this session; an upload only adds the experiments not seen yet
+    if "multi_collection" not in st.session_state:
+        st.session_state.multi_collection = {"index": DedupIndex(), "frames": []}
+    return st.session_state.multi_collection
+
+def multi_job(job, files, collection, exclude_outliers=False, outlier_method="mad"):
+    # files: [(name, bytes)]; the analysis covers every experiment in the collection
+    upload_bytes = sum(len(data) for _, data in files)
+    timings = StageRecorder(run_id=job.key, app="app_v4", mode="multi", upload_bytes=upload_bytes)
+    job.enter("Parsing experiments")
+    with timings.stage("ingest_multi") as rec:
+        new, duplicates = ingest_multi(files, index=collection["index"], cache=get_stage_cache())
+        if len(new):
+            collection["frames"].append(new)
+        rec["rows"] = len(new)
+    frames = list(collection["frames"])
+    if not frames:
+        raise ValueError("No experiments to analyze")
+    df_multi = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    with timings.stage("validate", rows=len(df_multi)):
+        validation = validate_multi(df_multi)
+    job.enter("Summarizing")
+    with timings.stage("flag_outliers", rows=len(df_multi)):
+        df_multi = flag_outliers(df_multi, group_cols=["Experiment_ID", "Channel", "Loaded"], method=outlier_method)
+    # One pass of partial aggregates serves the summary table and every rollup level
+    with timings.stage("rollup_cube", rows=len(df_multi)):
+        cube = build_cube(df_multi, exclude_outliers=exclude_outliers, outlier_method=outlier_method)
+        combined_summary = summary_from_cube(cube)
+    with timings.stage("well_pivot", rows=len(df_multi)):
+        pivot = well_pivot(df_multi, well_col="Well ID", experiment_col="Experiment_ID")
+    job.enter("Comparing experiments")
+    # Same Loaded compared across experiments, per Channel
+    with timings.stage("pairwise_tests", rows=len(df_multi)):
+        comparisons = pairwise_tests(
+            df_multi.assign(Cq=df_multi["Cq"].where(df_multi["Cq"] != -1)),
+            group_col="Experiment_ID",
+            by=["Channel", "Loaded"],
+        )
+    with timings.stage("row_index", rows=len(df_multi)):
+        row_index = RowIndex(df_multi)
+        summary_index = RowIndex(combined_summary, columns=SUMMARY_INDEX)
+    job.enter("Building figures")
+    with timings.stage("figures") as rec:
+        figures = build_multi_figures(df_multi, combined_summary, comparisons)
+        rec["rows"] = len(figures)
+    with timings.stage("html_report", rows=len(figures)):
+        report_html = html_report(
+            figures, {"Summary": combined_summary, "Comparisons": comparisons}, title="Multi-experiment analysis"
+        )
+    return {
+        "full_df": df_multi,
+        "combined_summary": combined_summary,
+        "cube": cube,
+        "comparisons": comparisons,
+        "figures": figures,
+        "timings": timings,
+        "report_html": report_html,
+        "validation": validation,
+        "well_pivot": pivot,
+        "duplicates": duplicates,
+        "row_index": row_index,
+        "summary_index": summary_index,
+        "flagged": dropped_wells(df_multi),
+        "exclude_outliers": exclude_outliers,
+        "outlier_method": outlier_method,
+    }
+
+def export_job(job, result):
+    job.enter("Writing workbooks")
+    return export_multi(
+        result["full_df"], result["combined_summary"], result["comparisons"], result["figures"],
+        validation=result["validation"], on_done=lambda name: job.enter("Writing workbooks"),
+    )
 
-def summarize_multi_experiment(df):
-    numeric_cols = ["Cq","Ampl.","Slope"]
-    summaries = []
-    for exp_id, exp_df in df.groupby("Experiment_ID"):
-        for channel, ch_df in exp_df.groupby("Channel"):
-            summary = ch_df.groupby("Loaded")[numeric_cols].agg(["mean","std"]).reset_index()
-            summary["Experiment_ID"] = exp_id
-            summary["Experiment_Name"] = ch_df["Experiment_Name"].iloc[0]
-            summary["Channel"] = channel
-            summary["Detection_%_"] = ch_df.groupby("Loaded")["Classification"].apply(lambda x: (x=="POSITIVE").mean()*100).values
-            summary["N_replicates"] = ch_df.groupby("Loaded")["Cq"].count().values
-            summaries.append(summary)
-    combined_summary = pd.concat(summaries, ignore_index=True)
-    return combined_summary
+def job_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+    return h.hexdigest()[:16]
+
+@st.fragment(run_every=1)
+def show_job_progress(key):
+    job = get_job_runner().get(key)
+    if job is None or not job.active:
+        st.rerun()
+    st.progress(job.progress, text=f"{job.stage or 'Queued'}…")
+    if st.button("Cancel analysis"):
+        job.cancel()
+
+def finished_job(state_key):
+    # Returns the finished job for this mode, showing progress/errors otherwise
+    key = st.session_state.get(state_key) or st.query_params.get(state_key)
+    job = get_job_runner().get(key) if key else None
+    if job is None:
+        return None
+    if job.active:
+        show_job_progress(job.key)
+    elif job.status == FAILED:
+        st.error(f"Analysis failed: {job.error.splitlines()[0]}")
+    elif job.status == CANCELLED:
+        st.warning("Analysis cancelled.")
+    elif job.status == DONE:
+        return job
+    return None
+
+def job_snapshot(mode, result):
+    # Frames and figures of a finished job in one saved-analysis file; the HTML report
+    # (mostly plotly.js) is rebuilt from them when downloaded
+    frames = {name: value for name, value in result.items() if isinstance(value, pd.DataFrame)}
+    meta = {name: result[name] for name in ("layout_lines", "exclude_outliers", "outlier_method") if name in result}
+    return save_snapshot(frames, figures=result["figures"], meta={"app": "app_v4", "mode": mode, **meta})
+
+def restored_job(job, data, mode):
+    # Stands in for pod_job / multi_job: rebuilds a job result from a saved analysis
+    job.enter("Opening saved analysis")
+    snap = open_snapshot(data)
+    if snap.meta.get("app") != "app_v4" or snap.meta.get("mode") != mode:
+        raise ValueError(f"Not a saved {mode} analysis from this app")
+    result = snap.frames()
+    result.update({name: value for name, value in snap.meta.items() if name not in ("app", "mode")})
+    figures = result["figures"] = snap.figures
+    result["timings"] = None
+    if mode == "multi":
+        # The rollup cube is cheap to rebuild from the (already QC-flagged) replicates
+        result.setdefault("outlier_method", "mad")
+        result["cube"] = build_cube(
+            result["full_df"], exclude_outliers=result["exclude_outliers"], outlier_method=result["outlier_method"],
+        )
+        result["row_index"] = RowIndex(result["full_df"])
+        result["summary_index"] = RowIndex(result["combined_summary"], columns=SUMMARY_INDEX)
+        tables = {"Summary": result["combined_summary"], "Comparisons": result["comparisons"]}
+        title = "Multi-experiment analysis"
+    else:
+        tables = {"CH2 summary": result["flat_ch2"], "CH3 summary": result["flat_ch3"]}
+        title = "Pod analysis"
+    # download_button accepts a callable: the report is only built when clicked
+    result["report_html"] = lambda: html_report(figures, tables, title=title)
+    return result
+
+def saved_analyses(mode, state_key, job):
+    with st.sidebar.expander("Saved analyses"):
+        saved = st.file_uploader("Open analysis", type=[SNAPSHOT_EXTENSION.lstrip(".")], key=f"open_{mode}")
+        if saved is not None and st.session_state.get(f"restored_{mode}") != saved.file_id:
+            data = saved.getvalue()
+            key = job_key("snapshot", mode, data)
+            get_job_runner().submit(key, restored_job, data, mode, stages=["Opening saved analysis"])
+            st.session_state[f"restored_{mode}"] = saved.file_id
+            st.session_state[state_key] = key
+            st.query_params[state_key] = key
+            st.rerun()
+        if job is not None:
+            # Built only when clicked, on Streamlit's download thread
+            result = job.result
+            st.download_button(
+                "Save analysis",
+                data=lambda: job_snapshot(mode, result),
+                file_name=f"{mode}_analysis{SNAPSHOT_EXTENSION}",
+                mime="application/octet-stream",
+            )
 
 # --- Streamlit app ---
 
+get_metrics_server()
+# Job results live in the runner, not session_state, so they are counted explicitly
+session_jobs = [get_job_runner().get(st.session_state.get(k) or st.query_params.get(k)) for k in ("pod_job", "multi_job")]
+track_streamlit_session(*[j.result for j in session_jobs if j is not None and j.result is not None])
+
 st.title("Experiment analysis App")
 
 mode = st.sidebar.radio("Select mode:", ["Single pod", "Multi-experiment"])
@@ -134,153 +523,243 @@ if mode=="Single pod":
         height=200,
         placeholder="T1\tT1\tT2\tT2\nT3\tT3\tT4\tT4"
     )
+    with st.expander("Replicate QC"):
+        pod_outlier_method = st.selectbox("Outlier test (per Channel x Loaded)", OUTLIER_METHODS, key="pod_outlier_method")
+        pod_exclude_outliers = st.checkbox("Exclude flagged replicates from summaries", False, key="pod_exclude_outliers")
 
     if uploaded_file and layout_text:
         if st.button("Run pod analysis"):
-            df = pd.read_excel(uploaded_file)
+            file_bytes = uploaded_file.getvalue()
             layout_lines = layout_text.strip().split("\n")
-            results = run_analysis_single(df, layout_lines)
-            (
-                st.session_state.full_df,
-                st.session_state.ch2,
-                st.session_state.ch3,
-                st.session_state.flat_ch2,
-                st.session_state.flat_ch3,
-                st.session_state.raw_ch2,
-                st.session_state.raw_ch3,
-            ) = results
-
-            st.success("Analysis completed!")
-
-            st.subheader("CH2 Summary")
-            st.dataframe(st.session_state.flat_ch2)
-
-            st.subheader("CH3 Summary")
-            st.dataframe(st.session_state.flat_ch3)
-
-            # --- Plots ---
-            figures = {}
-
-            # CH2 boxplots
-            for metric in ["Cq","Ampl.","Slope"]:
-                fig = px.box(
-                    st.session_state.raw_ch2,
-                    x="Loaded",
-                    y=metric,
-                    points="all",
-                    title=f"{metric} by Loaded (CH2)"
-                )
-                figures[f"CH2_{metric}_box"] = fig
-
-            # CH3 boxplots
-            for metric in ["Cq","Ampl.","Slope"]:
-                fig = px.box(
-                    st.session_state.raw_ch3,
-                    x="Loaded",
-                    y=metric,
-                    points="all",
-                    title=f"{metric} by Loaded (CH3)"
-                )
-                figures[f"CH3_{metric}_box"] = fig
-
-            # Detection rate
-            for ch, flat in zip(["CH2","CH3"], [st.session_state.flat_ch2, st.session_state.flat_ch3]):
-                fig_det = px.bar(
-                    flat,
-                    x="Loaded",
-                    y="Detection_%__",
-                    text="Detection_%__",
-                    title=f"Detection rate ({ch})",
-                    range_y=[0,100]
-                )
-                fig_det.update_traces(
-                    text=flat["Detection_%__"].round(1).astype(str)+"%",
-                    textposition="inside"
-                )
-                for i,row in flat.iterrows():
-                    fig_det.add_annotation(
-                        x=row["Loaded"],
-                        y=row["Detection_%__"],
-                        text=f"n={int(row['QC_N_loaded_'])}",
-                        showarrow=False,
-                        yshift=12
-                    )
-                figures[f"{ch}_detection"] = fig_det
-
-            # --- Show plots ---
-            st.sidebar.header("Plots")
-            show_ch2 = st.sidebar.checkbox("Show CH2 plots", True)
-            show_ch3 = st.sidebar.checkbox("Show CH3 plots", True)
-            show_detection = st.sidebar.checkbox("Show detection rate", True)
-
-            if show_ch2:
-                st.subheader("CH2 plots")
-                for key, fig in figures.items():
-                    if key.startswith("CH2_") and "detection" not in key:
-                        st.plotly_chart(fig, use_container_width=True)
-            if show_ch3:
-                st.subheader("CH3 plots")
-                for key, fig in figures.items():
-                    if key.startswith("CH3_") and "detection" not in key:
-                        st.plotly_chart(fig, use_container_width=True)
-            if show_detection:
-                st.subheader("Detection rate")
-                st.plotly_chart(figures["CH2_detection"], use_container_width=True)
-                st.plotly_chart(figures["CH3_detection"], use_container_width=True)
+            key = job_key("pod", file_bytes, layout_text.strip(), pod_outlier_method, pod_exclude_outliers)
+            get_job_runner().submit(
+                key, pod_job, file_bytes, layout_lines, pod_exclude_outliers, pod_outlier_method,
+                stages=["Reading workbook", "Running analysis", "Building figures"],
+            )
+            st.session_state.pod_job = key
+            st.query_params["pod_job"] = key
+
+    job = finished_job("pod_job")
+    saved_analyses("pod", "pod_job", job)
+    show_timings_panel(job.result["timings"] if job is not None else None)
+    if job is not None:
+        st.session_state.full_df = job.result["full_df"]
+        st.session_state.flat_ch2 = job.result["flat_ch2"]
+        st.session_state.flat_ch3 = job.result["flat_ch3"]
+        figures = job.result["figures"]
+
+        st.success("Analysis completed!")
+        show_validation_report(job.result["validation"])
+
+        st.caption("Select a summary row to see its replicate wells.")
+        for name, flat in [("CH2", job.result["flat_ch2"]), ("CH3", job.result["flat_ch3"])]:
+            st.subheader(f"{name} Summary")
+            selected = show_table(flat, key=f"flat_{name}", select=True)
+            show_drilldown(job.result, flat, job.result["full_df"], selected, ["Channel", "Loaded"], name)
+
+        if st.sidebar.checkbox("Show replicate data", False, key="replicates_pod"):
+            st.subheader("Replicate data")
+            show_table(st.session_state.full_df, key="full_df_pod")
+        show_flagged(job.result)
+
+        # --- Show plots ---
+        st.sidebar.header("Plots")
+        show_ch2 = st.sidebar.checkbox("Show CH2 plots", True)
+        show_ch3 = st.sidebar.checkbox("Show CH3 plots", True)
+        show_detection = st.sidebar.checkbox("Show detection rate", True)
+
+        if show_ch2:
+            st.subheader("CH2 plots")
+            for key, fig in figures.items():
+                if key.startswith("CH2_") and "detection" not in key:
+                    st.plotly_chart(fig, use_container_width=True)
+        if show_ch3:
+            st.subheader("CH3 plots")
+            for key, fig in figures.items():
+                if key.startswith("CH3_") and "detection" not in key:
+                    st.plotly_chart(fig, use_container_width=True)
+        if show_detection:
+            st.subheader("Detection rate")
+            st.plotly_chart(figures["CH2_detection"], use_container_width=True)
+            st.plotly_chart(figures["CH3_detection"], use_container_width=True)
+
+        if st.sidebar.checkbox("Show multiplex co-detection", False, key="multiplex_pod"):
+            st.subheader("Multiplex co-detection")
+            show_co_detection(job.result["well_pivot"], by=("Loaded",), key="multiplex_pod")
+
+        if st.sidebar.checkbox("Show plate map", False):
+            st.subheader("Plate map")
+            plate_metric = st.selectbox("Plate map metric", METRIC_COLUMNS)
+            labels = layout_grid(job.result["layout_lines"])
+            st.plotly_chart(
+                plate_figure(st.session_state.full_df, plate_metric, *labels.shape, labels=labels),
+                use_container_width=True,
+            )
+
+        st.download_button(
+            "Download interactive HTML report", data=job.result["report_html"],
+            file_name="pod_report.html", mime="text/html",
+        )
 
 # --- MULTI-EXPERIMENT ---
 elif mode=="Multi-experiment":
-    uploaded_file = st.file_uploader(
-        "Upload Excel file",
-        type=["xlsx"]
+    uploaded_files = st.file_uploader(
+        "Upload Excel file(s)",
+        type=["xlsx"],
+        accept_multiple_files=True,
     )
-    if uploaded_file:
+    with st.expander("Replicate QC"):
+        outlier_method = st.selectbox("Outlier test (per Experiment x Channel x Loaded)", OUTLIER_METHODS)
+        exclude_outliers = st.checkbox("Exclude flagged replicates from summaries", False)
+
+    collection = multi_collection()
+    if collection["frames"]:
+        info, clear = st.columns([4, 1])
+        info.caption(
+            f"{len(collection['index'].experiments)} experiment(s) loaded this session; "
+            "uploads add only experiments not seen before."
+        )
+        if clear.button("Clear loaded experiments"):
+            del st.session_state.multi_collection
+            collection = multi_collection()
+
+    if uploaded_files:
         if st.button("Run multi-experiment analysis"):
-            full_df = parse_multi_experiment_excel(uploaded_file)
-            combined_summary = summarize_multi_experiment(df_multi)
-
-            st.success("Multi-experiment summary completed!")
-            st.dataframe(combined_summary)
-
-            # --- Plots ---
-            figures = {}
-            for metric in ["Cq","Ampl.","Slope"]:
-                fig = px.box(
-                    df_multi,
-                    x="Loaded",
-                    y=metric,
-                    color="Experiment_ID",
-                    facet_col="Channel",
-                    points="all",
-                    title=f"{metric} by Loaded across experiments"
-                )
-                figures[f"{metric}_box"] = fig
-            # Detection
-            fig_det = px.bar(
-                combined_summary,
-                x="Loaded",
-                y="Detection_%_",
-                color="Experiment_ID",
-                facet_col="Channel",
-                text="Detection_%_",
-                title="Detection rate across experiments",
-                range_y=[0,100]
+            files = [(f.name, f.getvalue()) for f in uploaded_files]
+            loaded = [digest for digest, _ in collection["index"].experiments.values()]
+            key = job_key("multi", *loaded, *[data for _, data in files], outlier_method, exclude_outliers)
+            get_job_runner().submit(
+                key, multi_job, files, collection, exclude_outliers, outlier_method,
+                stages=["Parsing experiments", "Summarizing", "Comparing experiments", "Building figures"],
             )
-            for i,row in combined_summary.iterrows():
-                fig_det.add_annotation(
-                    x=row["Loaded"],
-                    y=row["Detection_%_"],
-                    text=f"n={int(row['N_replicates'])}",
-                    showarrow=False,
-                    yshift=10
-                )
-            figures["detection"] = fig_det
+            st.session_state.multi_job = key
+            st.query_params["multi_job"] = key
+
+    job = finished_job("multi_job")
+    saved_analyses("multi", "multi_job", job)
+    show_timings_panel(job.result["timings"] if job is not None else None)
+    if job is not None:
+        full_df = job.result["full_df"]
+        combined_summary = job.result["combined_summary"]
+        comparisons = job.result["comparisons"]
+        figures = job.result["figures"]
+        view_df = full_df
+
+        with st.sidebar.expander("Filters", expanded=True):
+            selection, date_range = show_filters(job.result["row_index"], container=st, key="multi_filter")
+        rows = job.result["row_index"].rows(selection, date_range)
+
+        st.success("Multi-experiment summary completed!")
+        show_validation_report(job.result["validation"])
+        duplicates = job.result.get("duplicates")
+        if duplicates is not None and len(duplicates):
+            st.warning(f"{len(duplicates)} duplicate upload(s) or experiment(s) found at ingest; see below.")
+            with st.expander("Duplicates"):
+                st.dataframe(duplicates, hide_index=True)
+        if rows is not None:
+            st.caption(f"Filtered: {len(rows):,} of {len(full_df):,} replicates.")
+            if len(rows):
+                view = filtered_view(job.result, rows)
+                figures = filtered_figures(job, rows, view)
+                view_df, combined_summary, comparisons = view
+            else:
+                figures = {}
+                view_df, combined_summary, comparisons = full_df.iloc[:0], combined_summary.iloc[:0], comparisons.iloc[:0]
+        # Filtered views are new frames on every rerun; only the unfiltered ones are cached
+        st.caption("Select a summary row to see its replicate wells.")
+        selected = show_table(combined_summary, key="combined_summary", cache=rows is None, select=True)
+        show_drilldown(job.result, combined_summary, full_df, selected, SUMMARY_INDEX, "multi")
+        if st.sidebar.checkbox("Show replicate data", False, key="replicates_multi"):
+            st.subheader("Replicate data")
+            show_table(view_df, key="full_df_multi", cache=rows is None)
+
+        st.subheader("Rollups")
+        cube = job.result["cube"]
+        rollup_name = st.selectbox("Summarize by", list(ROLLUP_LEVELS) + ["Custom"])
+        if rollup_name == "Custom":
+            # Any ordered combination of dimensions: summed from the cube's partials when
+            # within its grain, else summarized from the replicates
+            columns = with_derived(full_df.iloc[:0]).columns
+            available = cube.dims + [d for d in DIMENSIONS if d not in cube.dims and d in columns]
+            rollup_dims = st.multiselect("Dimensions (in order)", available, default=["Channel", "Loaded"])
+        else:
+            rollup_dims = ROLLUP_LEVELS[rollup_name]
+        st.dataframe(rollup_summary(
+            cube, full_df, rollup_dims, job.result["exclude_outliers"], job.result.get("outlier_method", "mad"),
+        ))
+
+        show_flagged(job.result)
+
+        # --- Show plots ---
+        st.subheader("Plots")
+        for key, fig in figures.items():
+            if not key.endswith("_pvalues"):
+                st.plotly_chart(fig, use_container_width=True)
 
-            # --- Show plots ---
-            st.subheader("Plots")
-            for key, fig in figures.items():
+        st.subheader("Pairwise comparisons across experiments (Welch t-test, BH corrected)")
+        st.dataframe(comparisons)
+        for key, fig in figures.items():
+            if key.endswith("_pvalues"):
                 st.plotly_chart(fig, use_container_width=True)
 
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        summary.to_excel(writer, sheet_name="Summary", index=False)
-        full_df.to_excel(writer, sheet_name="Full_Data", index=False)
\ No newline at end of file
+        st.subheader("Control trends (Levey-Jennings)")
+        tracker = get_control_tracker()
+        control_labels = st.text_input("Control labels (Condition, Loaded or Sample Name)", ", ".join(CONTROLS))
+        controls = [c.strip() for c in control_labels.split(",") if c.strip()]
+        n_control_wells = len(control_rows(full_df, controls))
+        st.caption(f"{n_control_wells} control well(s) in this data.")
+        if st.button("Add these runs to control trends", disabled=not n_control_wells):
+            added = tracker.add_runs(full_df, controls=controls)
+            if len(added):
+                flagged_runs = added[added["Violations"].str.len() > 0]
+                st.caption(f"{len(added)} new run value(s) added; {len(flagged_runs)} with Westgard violations.")
+                if len(flagged_runs):
+                    st.dataframe(flagged_runs[TREND_KEY + ["Experiment_ID", "Value", "z", "Violations", "Reject"]])
+            else:
+                st.caption("All runs in this file were already tracked.")
+        trend_summary = tracker.summary()
+        if len(trend_summary):
+            st.dataframe(trend_summary)
+            trend_keys = [tuple(k) for k in trend_summary[TREND_KEY].itertuples(index=False)]
+            trend_key = st.selectbox("Control", trend_keys, format_func=" / ".join)
+            last_runs = st.number_input("Runs shown", 10, 5000, 100, step=10)
+            st.plotly_chart(
+                control_chart(tracker.points(trend_key, last=last_runs), title=" / ".join(trend_key)),
+                use_container_width=True,
+            )
+
+        if st.sidebar.checkbox("Show multiplex co-detection", False, key="multiplex_multi"):
+            st.subheader("Multiplex co-detection")
+            show_co_detection(job.result["well_pivot"], by=("Experiment_ID", "Loaded"), key="multiplex_multi")
+
+        # Plate geometry isn't in the multi-experiment export; infer it from the well count
+        st.subheader("Plate map")
+        plate_metric = st.selectbox("Plate map metric", METRIC_COLUMNS)
+        max_well = pd.to_numeric(full_df["Well ID"], errors="coerce").max()
+        if pd.isna(max_well):
+            st.info("No numeric Well IDs in this export; plate map unavailable.")
+        elif len(view_df):
+            n_rows, n_cols = infer_geometry(int(max_well))
+            st.plotly_chart(
+                plate_figure(view_df, plate_metric, n_rows, n_cols, well_col="Well ID", experiment_col="Experiment_ID"),
+                use_container_width=True,
+            )
+
+        st.download_button(
+            "Download interactive HTML report", data=job.result["report_html"],
+            file_name="multi_experiment_report.html", mime="text/html",
+        )
+
+        # One workbook per experiment + combined summary + figures, built in the background
+        st.subheader("Export")
+        export_key = job_key("multi_export", job.key)
+        if st.button("Build export ZIP"):
+            get_job_runner().submit(export_key, export_job, job.result, stages=["Writing workbooks"])
+            st.session_state.multi_export_job = export_key
+        if st.session_state.get("multi_export_job") == export_key:
+            export = finished_job("multi_export_job")
+            if export is not None:
+                st.download_button(
+                    "Download export ZIP", data=export.result,
+                    file_name="multi_experiment_export.zip", mime="application/zip",
+                )
@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from analysis_v6 import apply_layout, summarize_channels
+from formats import load
+
+RESULT_FRAMES = ["full_df", "ch2", "ch3", "flat_ch2", "flat_ch3"]
+# Worker processes come from a forkserver (spawn where there is none): the pools are
+# created from Streamlit's threaded script runner, and forking a threaded process can
+# deadlock on locks another thread held at the time
+MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def tag_results(name, results):
+    # Every output frame is tagged with its source file
+    tagged = {}
+    for key, frame in zip(RESULT_FRAMES, results):
+        frame = frame.copy()
+        frame.insert(0, "Source_File", name)
+        tagged[key] = frame
+    return tagged
+
+
+def analyze_workbook(name, file_bytes, layout_lines, **options):
+    # Read + analyze one pod export
+    _, df = read_workbook(name, file_bytes)
+    results = summarize_channels(apply_layout(df, layout_lines), **options)
+    return name, tag_results(name, results)
+
+
+def read_workbook(name, file_bytes):
+    # Ingest stage only: parse + clean, no layout
+    _, df = load(file_bytes, expect="single_pod")
+    return name, df
+
+
+def read_workbooks(files, max_workers=None, on_done=None):
+    # files: [(name, bytes)] -> {name: cleaned frame}, parsed in worker processes
+    if len(files) == 1:
+        name, df = read_workbook(*files[0])
+        if on_done is not None:
+            on_done(name)
+        return {name: df}
+
+    max_workers = max_workers or min(len(files), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=MP_CONTEXT)
+    frames = {}
+    try:
+        futures = [pool.submit(read_workbook, name, file_bytes) for name, file_bytes in files]
+        for future in as_completed(futures):
+            name, df = future.result()
+            frames[name] = df
+            if on_done is not None:
+                on_done(name)
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    return frames
+
+
+def merge_results(per_file, order):
+    # One long-format frame per result, in upload order
+    return {
+        key: pd.concat([per_file[name][key] for name in order], ignore_index=True)
+        for key in RESULT_FRAMES
+    }
+
+
+def analyze_workbooks(files, layouts, max_workers=None, on_done=None, **options):
+    # files: [(name, bytes)], layouts: {name: layout_lines}; options go to run_analysis
+    # Workbooks are parsed and analyzed in parallel worker processes (read_excel is
+    # pure Python and holds the GIL, so threads would not help). `on_done(name)` is
+    # called as each file finishes and may raise to abort the remaining ones.
+    order = [name for name, _ in files]
+
+    if len(files) == 1:
+        name, file_bytes = files[0]
+        per_file = dict([analyze_workbook(name, file_bytes, layouts[name], **options)])
+        if on_done is not None:
+            on_done(name)
+        return merge_results(per_file, order)
+
+    max_workers = max_workers or min(len(files), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=MP_CONTEXT)
+    per_file = {}
+    try:
+        futures = [
+            pool.submit(analyze_workbook, name, file_bytes, layouts[name], **options)
+            for name, file_bytes in files
+        ]
+        for future in as_completed(futures):
+            name, tagged = future.result()
+            per_file[name] = tagged
+            if on_done is not None:
+                on_done(name)
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    return merge_results(per_file, order)
+
+
+def unique_names(names):
+    # "pod.xlsx", "pod.xlsx" -> "pod.xlsx", "pod (2).xlsx". Each name keeps its first
+    # occurrence; generated names skip every name already taken, original or generated.
+    taken = set(names)
+    first = set()
+    counters = {}
+    out = []
+    for name in names:
+        if name not in first:
+            first.add(name)
+            out.append(name)
+            continue
+        stem, dot, ext = name.rpartition(".")
+        k = counters.get(name, 1)
+        while True:
+            k += 1
+            candidate = f"{stem} ({k}).{ext}" if dot else f"{name} ({k})"
+            if candidate not in taken:
+                break
+        counters[name] = k
+        taken.add(candidate)
+        out.append(candidate)
+    return out
@@ -0,0 +1,95 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# Modules that must stay importable without the plotting/stats stack
+LIGHT_MODULES = ["analysis_v6", "comparisons", "jobs", "instrumentation"]
+HEAVY = ["plotly", "scipy", "openpyxl", "kaleido"]
+
+IMPORT_PROBE = """
+import json, sys, time
+sys.path.insert(0, {here!r})
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+RENDER_PROBE = """
+import json, sys, time
+sys.path.insert(0, {here!r})
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "errors": [str(e.value) for e in at.exception],
+                  "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def run_probe(code):
+    # Fresh interpreter each time so every measurement is a cold start
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=HERE
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "probe failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(code, repeats):
+    runs = [run_probe(code) for _ in range(repeats)]
+    result = dict(runs[-1])
+    result["seconds"] = statistics.median(r["seconds"] for r in runs)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import and first-render benchmark")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--import-budget", type=float, default=1.5, help="seconds per module import")
+    parser.add_argument("--render-budget", type=float, default=4.0, help="seconds to first render of an app")
+    parser.add_argument("--apps", nargs="*", default=["app_v3.py", "app_v4.py"])
+    args = parser.parse_args()
+
+    failures = []
+
+    print(f"{'target':<22}{'median s':>10}{'budget s':>10}  heavy modules loaded")
+    for module in LIGHT_MODULES:
+        res = measure(IMPORT_PROBE.format(here=str(HERE), module=module, heavy=HEAVY), args.repeats)
+        print(f"{'import ' + module:<22}{res['seconds']:>10.3f}{args.import_budget:>10.2f}  {', '.join(res['heavy']) or '-'}")
+        if res["seconds"] > args.import_budget:
+            failures.append(f"import {module} took {res['seconds']:.3f}s")
+        if res["heavy"]:
+            failures.append(f"import {module} pulled in {', '.join(res['heavy'])}")
+
+    # Heavy modules are only reported for apps: some streamlit versions import plotly themselves
+    for app in args.apps:
+        try:
+            res = measure(RENDER_PROBE.format(here=str(HERE), app=str(HERE / app), heavy=HEAVY), args.repeats)
+        except RuntimeError as exc:
+            print(f"{'render ' + app:<22}{'n/a':>10}{args.render_budget:>10.2f}  ({exc})")
+            failures.append(f"render {app} failed: {exc}")
+            continue
+        print(f"{'render ' + app:<22}{res['seconds']:>10.3f}{args.render_budget:>10.2f}  {', '.join(res['heavy']) or '-'}")
+        if res["errors"]:
+            failures.append(f"render {app} raised: {res['errors'][0]}")
+        if res["seconds"] > args.render_budget:
+            failures.append(f"render {app} took {res['seconds']:.3f}s")
+
+    if failures:
+        print("\nOver budget:")
+        for f in failures:
+            print(f"  - {f}")
+        sys.exit(1)
+    print("\nAll within budget.")
+
+
+if __name__ == "__main__":
+    main()
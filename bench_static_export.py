@@ -0,0 +1,100 @@
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from analysis_v6 import run_analysis
+from static_render import render
+from synthetic import make_pod_export
+
+# Static export throughput: builtin renderer (PNG/SVG) vs Kaleido on a few hundred of the
+# standard box / detection plots.
+#
+#   python bench_static_export.py --figures 300 --threads 4
+
+
+def make_figures(n_figures, n_wells=96):
+    # Box + detection plots like app_v3.build_figures, over several synthetic pods
+    import plotly.express as px
+
+    figures = []
+    seed = 0
+    while len(figures) < n_figures:
+        df, layout = make_pod_export(n_wells=n_wells, n_cols=12, seed=seed)
+        _, ch2, ch3, flat_ch2, flat_ch3 = run_analysis(df, layout)
+        for channel, raw, flat in (("CH2", ch2, flat_ch2), ("CH3", ch3, flat_ch3)):
+            for metric in ["Cq", "Ampl.", "Slope"]:
+                fig = px.box(raw, x="Loaded", y=metric, color="Condition", points="all",
+                             title=f"{metric} by Loaded ({channel})")
+                fig.update_layout(showlegend=False)
+                figures.append(fig)
+            fig = px.bar(flat, x="Loaded", y="Detection_%_", color="Condition", range_y=[0, 105],
+                         title=f"Detection rate ({channel})")
+            fig.update_traces(texttemplate="%{y:.1f}%", textposition="inside")
+            figures.append(fig)
+        seed += 1
+    for fig in figures:
+        fig.update_layout(template="plotly_white")
+    return figures[:n_figures]
+
+
+def builtin_png(fig, scale):
+    return render(fig, fmt="png", scale=scale)
+
+
+def builtin_svg(fig, scale):
+    return render(fig, fmt="svg")
+
+
+def kaleido_png(fig, scale):
+    return fig.to_image(format="png", scale=scale)
+
+
+def run(name, fn, figures, scale, threads):
+    t0 = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            sizes = list(pool.map(lambda f: len(fn(f, scale)), figures))
+    else:
+        sizes = [len(fn(f, scale)) for f in figures]
+    elapsed = time.perf_counter() - t0
+    print(f"{name:<14}{len(figures):>8}{elapsed:>10.2f}{len(figures) / elapsed:>10.1f}{statistics.mean(sizes) / 1e3:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static image export throughput")
+    parser.add_argument("--figures", type=int, default=200)
+    parser.add_argument("--scale", type=float, default=2)
+    parser.add_argument("--threads", type=int, default=1, help="builtin renderer threads (Pillow releases the GIL)")
+    parser.add_argument("--skip-kaleido", action="store_true")
+    parser.add_argument("--write", help="also write one sample of each backend into this directory")
+    args = parser.parse_args()
+
+    figures = make_figures(args.figures)
+
+    print(f"{'backend':<14}{'figures':>8}{'seconds':>10}{'fig/s':>10}{'avg kB':>10}")
+    run("builtin png", builtin_png, figures, args.scale, args.threads)
+    run("builtin svg", builtin_svg, figures, args.scale, args.threads)
+    if not args.skip_kaleido:
+        try:
+            # Startup (Chromium launch) is counted separately from steady-state throughput
+            t0 = time.perf_counter()
+            kaleido_png(figures[0], args.scale)
+            print(f"{'kaleido start':<14}{1:>8}{time.perf_counter() - t0:>10.2f}")
+            run("kaleido png", kaleido_png, figures, args.scale, 1)
+        except Exception as exc:
+            reason = " ".join(str(exc).split())[:100]
+            print(f"{'kaleido png':<14}  unavailable: {type(exc).__name__}: {reason}")
+
+    if args.write:
+        out = Path(args.write)
+        out.mkdir(parents=True, exist_ok=True)
+        (out / "builtin.png").write_bytes(builtin_png(figures[-1], args.scale))
+        (out / "builtin.svg").write_bytes(builtin_svg(figures[-1], args.scale))
+        print(f"samples written to {out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+METRICS = ["Cq", "Ampl.", "Slope"]
+
+
+def _group_moments(values, cell, n_cells):
+    # Count / mean / std per cell for every metric column at once (NaNs ignored). Sums are
+    # taken around each cell's first value, so the sum-of-squares variance doesn't cancel
+    # at Cq-sized magnitudes.
+    valid = ~np.isnan(values)
+
+    n = np.empty((n_cells, values.shape[1]))
+    s = np.empty_like(n)
+    ss = np.empty_like(n)
+    ref = np.zeros_like(n)
+    for m in range(values.shape[1]):
+        rows = np.flatnonzero(valid[:, m])[::-1]
+        # Reversed, so the first valid value of each cell is the one that sticks
+        ref[cell[rows], m] = values[rows, m]
+        shifted = np.where(valid[:, m], values[:, m] - ref[cell, m], 0.0)
+        n[:, m] = np.bincount(cell, weights=valid[:, m], minlength=n_cells)
+        s[:, m] = np.bincount(cell, weights=shifted, minlength=n_cells)
+        ss[:, m] = np.bincount(cell, weights=shifted ** 2, minlength=n_cells)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s / n
+        var = (ss - s * mean) / (n - 1)
+    std = np.sqrt(np.clip(var, 0, None))
+    return n, mean + ref, std
+
+
+def adjust_pvalues(p, method="fdr_bh"):
+    # scipy is imported lazily: importing this module should stay cheap
+    from scipy.stats import false_discovery_control
+
+    p = np.asarray(p, dtype=float)
+    out = np.full_like(p, np.nan)
+    ok = ~np.isnan(p)
+    if not ok.any() or method in (None, "none"):
+        return p.copy()
+
+    q = p[ok]
+    m = len(q)
+    if method == "fdr_bh":
+        adj = false_discovery_control(q, method="bh")
+    elif method == "fdr_by":
+        adj = false_discovery_control(q, method="by")
+    elif method == "bonferroni":
+        adj = np.minimum(q * m, 1.0)
+    elif method == "holm":
+        order = np.argsort(q)
+        stepped = np.maximum.accumulate(q[order] * (m - np.arange(m)))
+        adj = np.empty(m)
+        adj[order] = np.minimum(stepped, 1.0)
+    else:
+        raise ValueError(f"Unknown correction method: {method}")
+
+    out[ok] = adj
+    return out
+
+
+def pairwise_tests(
+    df,
+    group_col="Loaded",
+    by=("Channel",),
+    metrics=METRICS,
+    pairs=None,
+    equal_var=False,
+    correction="fdr_bh",
+    alpha=0.05,
+):
+    # Compare every pair of `group_col` values inside each `by` stratum
+    # (e.g. Loaded vs Loaded per Channel, or Experiment vs Experiment per
+    # Channel x Loaded). Moments are computed once per cell and all pairs
+    # are tested in a single vectorized t-test call per metric.
+    from scipy.stats import ttest_ind_from_stats
+
+    by = list(by)
+    metrics = [m for m in metrics if m in df.columns]
+
+    if by:
+        key = df[by[0]] if len(by) == 1 else pd.MultiIndex.from_frame(df[by])
+        strata_codes, strata = pd.factorize(key, sort=True)
+        strata = pd.DataFrame(list(strata) if len(by) > 1 else {by[0]: strata}, columns=by)
+    else:
+        strata_codes, strata = np.zeros(len(df), dtype=int), pd.DataFrame(index=[0])
+    group_codes, groups = pd.factorize(df[group_col], sort=True)
+
+    keep = (strata_codes >= 0) & (group_codes >= 0)
+    n_strata, n_groups = len(strata), len(groups)
+    cell = strata_codes[keep] * n_groups + group_codes[keep]
+    n_cells = n_strata * n_groups
+
+    values = df.loc[keep, metrics].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    n, mean, std = _group_moments(values, cell, n_cells)
+
+    # Which (stratum, group) cells exist at all
+    present = np.bincount(cell, minlength=n_cells).reshape(n_strata, n_groups) > 0
+
+    if pairs is None:
+        ga, gb = np.triu_indices(n_groups, k=1)
+    else:
+        lookup = {g: i for i, g in enumerate(groups)}
+        pairs = [(a, b) for a, b in pairs if a in lookup and b in lookup]
+        ga = np.array([lookup[a] for a, _ in pairs], dtype=int)
+        gb = np.array([lookup[b] for _, b in pairs], dtype=int)
+
+    # Broadcast pairs over strata, drop pairs where one side is missing
+    si = np.repeat(np.arange(n_strata), len(ga))
+    ga = np.tile(ga, n_strata)
+    gb = np.tile(gb, n_strata)
+    both = present[si, ga] & present[si, gb]
+    si, ga, gb = si[both], ga[both], gb[both]
+    ca = si * n_groups + ga
+    cb = si * n_groups + gb
+
+    frames = []
+    for m, metric in enumerate(metrics):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t, p = ttest_ind_from_stats(
+                mean[ca, m], std[ca, m], n[ca, m],
+                mean[cb, m], std[cb, m], n[cb, m],
+                equal_var=equal_var,
+            )
+        res = pd.DataFrame({
+            "Metric": metric,
+            "Group_A": groups[ga],
+            "Group_B": groups[gb],
+            "N_A": n[ca, m].astype(int),
+            "N_B": n[cb, m].astype(int),
+            "Mean_A": mean[ca, m],
+            "Mean_B": mean[cb, m],
+            "Diff": mean[ca, m] - mean[cb, m],
+            "t": np.asarray(t, dtype=float),
+            "p": np.asarray(p, dtype=float),
+        })
+        res = pd.concat([strata.iloc[si].reset_index(drop=True), res], axis=1)
+        frames.append(res)
+
+    if not frames:
+        return pd.DataFrame()
+    results = pd.concat(frames, ignore_index=True)
+
+    # Multiple-testing correction per Channel x metric family
+    family = ["Metric"] + (["Channel"] if "Channel" in by else [])
+    results["p_adj"] = np.nan
+    for _, idx in results.groupby(family, sort=False).indices.items():
+        results.loc[results.index[idx], "p_adj"] = adjust_pvalues(results["p"].to_numpy()[idx], correction)
+    results["Significant"] = results["p_adj"] < alpha
+
+    return results
+
+
+def comparison_matrix(results, metric, value="p_adj", **filters):
+    # Square group x group matrix of one column, for heatmaps
+    sel = results[results["Metric"] == metric]
+    for col, val in filters.items():
+        sel = sel[sel[col] == val]
+
+    labels = pd.unique(pd.concat([sel["Group_A"], sel["Group_B"]]))
+    pos = pd.Index(labels)
+    a = pos.get_indexer(sel["Group_A"])
+    b = pos.get_indexer(sel["Group_B"])
+    arr = np.full((len(pos), len(pos)), np.nan)
+    arr[a, b] = sel[value].to_numpy()
+    arr[b, a] = sel[value].to_numpy()
+    return pd.DataFrame(arr, index=labels, columns=labels)
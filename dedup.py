@@ -0,0 +1,164 @@
+import hashlib
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from formats import parse_multi_block, read_grid
+
+# Ingest-time dedup for multi-experiment uploads. Three levels of content hashes:
+#
+#   file    sha256 of the upload; a file seen before is skipped before it is read
+#   block   one experiment's ID:/Name:/Device: block minus its ID line; the same
+#           Experiment_ID with the same content is skipped before its rows are parsed,
+#           with different content it is a conflict (first one kept, reported)
+#   row     per data row; blocks sharing most rows with an earlier experiment under
+#           another ID (a re-exported run) are reported, not dropped
+#
+# The index is kept across uploads (per session in app_v4, per service in service.py), so
+# an experiment ingested once is skipped in every later upload. Row hashes come from one
+# vectorized pass over the raw grid and block hashes from the row hashes; the kept
+# blocks of a file are then parsed together in one parse_multi_block pass. With a cache
+# (pipeline.StageCache), scanned and parsed files are reused across uploads.
+
+REPORT_COLUMNS = ["File", "Experiment_ID", "Status", "Detail"]
+# Share of a block's rows already seen under another experiment that counts as overlap
+OVERLAP_FRACTION = 0.5
+
+Block = namedtuple("Block", "experiment_id start stop digest row_hashes")
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def split_blocks(grid):
+    # Raw grid -> [Block], one per "ID:" line; rows before the first ID line are ignored
+    first = grid.iloc[:, 0].astype(str).str.strip()
+    starts = np.flatnonzero(first.str.startswith("ID:").to_numpy())
+    stops = np.append(starts[1:], len(grid))
+    row_hashes = pd.util.hash_pandas_object(grid, index=False).to_numpy()
+    is_header = (first == "Sample Name").to_numpy()
+    first = first.to_numpy()
+    has_data = grid.notna().any(axis=1).to_numpy()
+
+    blocks = []
+    for start, stop in zip(starts, stops):
+        experiment_id = first[start][len("ID:"):].strip()
+        header = np.flatnonzero(is_header[start:stop])
+        data_start = start + header[0] + 1 if len(header) else stop
+        data = np.arange(data_start, stop)[has_data[data_start:stop]]
+        digest = hashlib.sha256(row_hashes[start + 1:stop].tobytes()).hexdigest()
+        blocks.append(Block(experiment_id, int(start), int(stop), digest, row_hashes[data]))
+    return blocks
+
+
+def scan_file(data):
+    grid = read_grid(data)
+    return grid, split_blocks(grid)
+
+
+class DedupIndex:
+    def __init__(self, experiments=None):
+        # experiments: {Experiment_ID: (block digest, source)} ingested elsewhere
+        self.files = {}
+        self.experiments = dict(experiments or {})
+        self.contents = {digest: experiment_id for experiment_id, (digest, _) in self.experiments.items()}
+        self.rows = {}
+        self.events = []
+        self.lock = threading.Lock()
+        self._journal = None
+
+    def _add(self, table, key, value):
+        # setdefault that a failed ingest can undo
+        if key not in table:
+            table[key] = value
+            if self._journal is not None:
+                self._journal.append((table, key))
+        return table[key]
+
+    def _event(self, name, experiment_id, status, detail):
+        self.events.append({"File": name, "Experiment_ID": experiment_id, "Status": status, "Detail": detail})
+
+    def seen_file(self, name, digest):
+        if digest in self.files:
+            self._event(name, None, "duplicate file", f"same content as {self.files[digest]}; skipped")
+            return True
+        self._add(self.files, digest, name)
+        return False
+
+    def admit(self, name, block):
+        # True if the block's rows should be parsed and used
+        previous = self.experiments.get(block.experiment_id)
+        if previous is not None:
+            if previous[0] == block.digest:
+                self._event(name, block.experiment_id, "duplicate experiment", f"already loaded from {previous[1]}; skipped")
+            else:
+                self._event(
+                    name, block.experiment_id, "conflict",
+                    f"different content than in {previous[1]}; kept the first, skipped this one",
+                )
+            return False
+        self._add(self.experiments, block.experiment_id, (block.digest, name))
+
+        twin = self._add(self.contents, block.digest, block.experiment_id)
+        if twin != block.experiment_id:
+            self._event(name, block.experiment_id, "copied content", f"same content as {twin}")
+        elif len(block.row_hashes):
+            owners = [self.rows.get(h) for h in block.row_hashes.tolist()]
+            shared = [o for o in owners if o is not None and o != block.experiment_id]
+            if len(shared) >= OVERLAP_FRACTION * len(block.row_hashes):
+                self._event(
+                    name, block.experiment_id, "overlapping rows",
+                    f"{len(shared)} of {len(block.row_hashes)} rows also in {', '.join(dict.fromkeys(shared))}",
+                )
+        for h in block.row_hashes.tolist():
+            self._add(self.rows, h, block.experiment_id)
+        return True
+
+    def report(self):
+        return pd.DataFrame(self.events, columns=REPORT_COLUMNS)
+
+
+def parse_blocks(grid, blocks, keep):
+    # One parse_multi_block pass over the kept blocks (positions into `blocks`)
+    if len(keep) == len(blocks):
+        return parse_multi_block(grid)
+    mask = np.zeros(len(grid), dtype=bool)
+    for i in keep:
+        mask[blocks[i].start:blocks[i].stop] = True
+    return parse_multi_block(grid[mask].reset_index(drop=True))
+
+
+def ingest_multi(files, index=None, cache=None):
+    # files: [(name, bytes)] -> (df_multi, report). Only experiments new to the index, in
+    # upload order; an empty frame when there are none. The report covers this call.
+    index = DedupIndex() if index is None else index
+    frames = []
+    with index.lock:
+        index.events, index._journal = [], []
+        try:
+            for name, data in files:
+                digest = file_digest(data)
+                if index.seen_file(name, digest):
+                    continue
+                grid, blocks = cache.get("multi_scan", digest, lambda: scan_file(data)) if cache else scan_file(data)
+                keep = [i for i, block in enumerate(blocks) if index.admit(name, block)]
+                if not keep:
+                    continue
+
+                def parse(grid=grid, blocks=blocks, keep=keep):
+                    return parse_blocks(grid, blocks, keep)
+
+                key = digest + ":" + ",".join(map(str, keep))
+                frames.append(cache.get("multi_parse", key, parse) if cache else parse())
+        except BaseException:
+            # Nothing from a failed upload counts as seen
+            for table, key in reversed(index._journal):
+                del table[key]
+            raise
+        finally:
+            index._journal = None
+        report = index.report()
+    return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), report
@@ -0,0 +1,77 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from rollup import encode
+
+# Drill-down from summary rows to their replicates. A GroupIndex sorts the replicate rows
+# by group code once (Loaded, or Experiment x Channel x Loaded, ...), so a group's rows are
+# one slice of that order. The index is built the first time someone drills into a table
+# and kept with the result; until then pages carry only the summary tables.
+
+DETAIL_COLUMNS = [
+    "Source_File", "Experiment_ID", "Well_ID", "Well ID", "Sample_Name", "Sample Name", "Channel", "Loaded",
+    "Cq", "Ampl.", "Slope", "Classification", "QC_outlier", "Cq_outlier_score",
+]
+METRICS = ["Cq", "Ampl.", "Slope"]
+
+
+class GroupIndex:
+    def __init__(self, df, keys):
+        self.keys = list(keys)
+        codes, first = encode(df, self.keys)
+        self._order = np.argsort(codes, kind="stable")
+        self._bounds = np.searchsorted(codes[self._order], np.arange(len(first) + 1))
+        groups = df[self.keys].iloc[first].itertuples(index=False, name=None)
+        self._lookup = {group: i for i, group in enumerate(groups)}
+
+    def __len__(self):
+        return len(self._lookup)
+
+    def rows(self, group):
+        # group: tuple of key values -> sorted row positions (empty if unknown)
+        i = self._lookup.get(tuple(group))
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self._order[self._bounds[i]:self._bounds[i + 1]])
+
+
+def group_index(store, name, df, keys):
+    # Built on first use and kept in `store` (a job result or st.session_state) for as
+    # long as `df` is the frame it was built from
+    indexes = store.setdefault("group_indexes", {})
+    cached = indexes.get(name)
+    if cached is None or cached[0]() is not df:
+        cached = indexes[name] = (weakref.ref(df), GroupIndex(df, keys))
+    return cached[1]
+
+
+def replicate_figure(detail, metric="Cq", title=None):
+    import plotly.express as px
+
+    well = next((c for c in ["Well_ID", "Well ID"] if c in detail.columns), None)
+    flagged = "QC_outlier" in detail.columns
+    return px.strip(
+        detail.assign(QC=detail["QC_outlier"].map({True: "flagged", False: "ok"})) if flagged else detail,
+        x="Channel" if "Channel" in detail.columns else None, y=metric,
+        color="QC" if flagged else None, hover_data=[c for c in [well, "Classification"] if c],
+        title=title or f"{metric} per replicate",
+    )
+
+
+def show_replicates(replicates, index, group, key="drilldown"):
+    # Replicate wells of one summary row: table, QC flags and per-replicate values
+    import streamlit as st
+
+    detail = replicates.take(index.rows(group))
+    if "Cq" in detail.columns:
+        # -1 is the export's "no Cq" sentinel, not a value
+        detail = detail.assign(Cq=pd.to_numeric(detail["Cq"], errors="coerce").replace(-1, np.nan))
+    label = " / ".join(str(v) for v in group)
+    st.caption(f"{label}: {len(detail)} replicate(s)")
+    if not len(detail):
+        return
+    st.dataframe(detail[[c for c in DETAIL_COLUMNS if c in detail.columns]], hide_index=True)
+    metric = st.selectbox("Metric", [m for m in METRICS if m in detail.columns], key=f"{key}_metric")
+    st.plotly_chart(replicate_figure(detail, metric, title=f"{metric} per replicate ({label})"), use_container_width=True)
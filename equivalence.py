@@ -0,0 +1,300 @@
+import argparse
+import ast
+import builtins
+import contextlib
+import importlib
+import io
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic import make_pod_export
+
+# Differential test of every single-pod analysis implementation against a reference.
+# Each implementation runs from the same export file (read included in its time), its
+# CH2/CH3 summaries are put into one canonical shape, and every column is compared with
+# the reference within a tolerance.
+#
+#   python equivalence.py                              generated pods + bundled workbook
+#   python equivalence.py export.xlsx --layout scheme.txt --engine mymodule:run_analysis
+#
+# Inputs: synthetic pods (several sizes/seeds), raw exports given on the command line, and
+# processed workbooks with Full_Data + CH2_summary/CH3_summary sheets, whose stored
+# summaries are compared as an extra "workbook" implementation.
+
+REFERENCE = "analysis_v5"
+ENGINES = ["analysis_v6", "pipeline"]
+SAMPLE_WORKBOOK = "multiplex_qpcr_with_layout.xlsx"
+SIZES = [(16, 4), (96, 12), (384, 24)]
+CHANNELS = ["CH2", "CH3"]
+DROP = ["Channel", "Source_File"]
+FAILING = ["diff", "missing"]
+# Same statistic, different spelling across versions (after trailing "_" is stripped)
+ALIASES = {"Detection": "Detection_%"}
+
+
+# ---- implementations: (path, layout_lines) -> {channel: summary frame} ----
+
+def _flats(result):
+    return {"CH2": result[3], "CH3": result[4]}
+
+
+def run_v5(path, layout_lines):
+    from analysis_v5 import run_analysis
+    return _flats(run_analysis(pd.read_excel(path), layout_lines))
+
+
+def run_v6(path, layout_lines):
+    from analysis_v6 import run_analysis
+    return _flats(run_analysis(pd.read_excel(path), layout_lines))
+
+
+def run_pipeline(path, layout_lines):
+    from pipeline import StageCache, analyze_cached
+    name = Path(path).name
+    merged, _ = analyze_cached(StageCache(), [(name, Path(path).read_bytes())], {name: layout_lines})
+    return {"CH2": merged["flat_ch2"], "CH3": merged["flat_ch3"]}
+
+
+def _app_functions(path="app_v4.py", names=("add_replicate_count", "flatten_summary", "run_analysis_single")):
+    # app_v4 is a Streamlit script, so only its imports and analysis functions are compiled
+    tree = ast.parse(Path(path).read_text())
+    body = [
+        n for n in tree.body
+        if isinstance(n, (ast.Import, ast.ImportFrom)) or (isinstance(n, ast.FunctionDef) and n.name in names)
+    ]
+    namespace = {}
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, "exec"), namespace)
+    return namespace
+
+
+def run_app_v4(path, layout_lines):
+    result = _app_functions()["run_analysis_single"](pd.read_excel(path), layout_lines)
+    return {"CH2": result[3], "CH3": result[4]}
+
+
+def _run_script(script, path, layout_lines):
+    # The result_analysis scripts prompt for a path and a pasted layout, then append
+    # sheets to the workbook: answer the prompts and let them write to a scratch copy
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = Path(tmp) / Path(path).name
+        shutil.copy(path, copy)
+        answers = iter([str(copy)] + list(layout_lines) + [""])
+        original = builtins.input
+        builtins.input = lambda prompt="": next(answers)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                namespace = runpy.run_path(script, run_name="__script__")
+        finally:
+            builtins.input = original
+    return {"CH2": namespace["summary_ch2"], "CH3": namespace["summary_ch3"]}
+
+
+def run_result_v3(path, layout_lines):
+    return _run_script("result_analysis_v3.py", path, layout_lines)
+
+
+def run_result_v4(path, layout_lines):
+    return _run_script("result_analysis_v4.py", path, layout_lines)
+
+
+IMPLEMENTATIONS = {
+    "analysis_v5": run_v5,
+    "analysis_v6": run_v6,
+    "pipeline": run_pipeline,
+    "app_v4": run_app_v4,
+    "result_analysis_v3": run_result_v3,
+    "result_analysis_v4": run_result_v4,
+}
+
+
+def engine_from_spec(spec):
+    # "module:function" with the run_analysis signature (df, layout_lines) -> 5-tuple
+    module, _, name = spec.partition(":")
+    fn = getattr(importlib.import_module(module), name or "run_analysis")
+    return lambda path, layout_lines: _flats(fn(pd.read_excel(path), layout_lines))
+
+
+# ---- canonical shape + comparison ----
+
+def canonical(summary):
+    # Flat or MultiIndex summary -> Loaded-indexed frame with normalized column names
+    df = summary.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        # (blank header cells read back from Excel as "Unnamed: ..")
+        df.columns = ["_".join(str(p) for p in col if str(p) and not str(p).startswith("Unnamed")) for col in df.columns]
+    if "Loaded" not in df.columns:
+        df = df.reset_index()
+    df.columns = [ALIASES.get(str(c).strip().rstrip("_"), str(c).strip().rstrip("_")) for c in df.columns]
+    df = df.drop(columns=[c for c in DROP if c in df.columns])
+    df["Loaded"] = df["Loaded"].astype(str)
+    return df.set_index("Loaded").sort_index()
+
+
+def compare(reference, candidate, rtol=1e-9, atol=1e-12):
+    # -> one row per column: status ok / diff / missing / extra, max abs/rel difference.
+    # "extra" (columns the reference doesn't have) is informational, not a failure.
+    rows = []
+    ref_only = reference.index.difference(candidate.index)
+    cand_only = candidate.index.difference(reference.index)
+    if len(ref_only) or len(cand_only):
+        rows.append(("(rows)", "diff", np.nan, np.nan, len(ref_only) + len(cand_only),
+                     f"missing {list(ref_only)[:5]}, extra {list(cand_only)[:5]}"))
+    common = reference.index.intersection(candidate.index)
+
+    for col in reference.columns.union(candidate.columns, sort=False):
+        if col not in candidate.columns:
+            rows.append((col, "missing", np.nan, np.nan, len(common), ""))
+            continue
+        if col not in reference.columns:
+            rows.append((col, "extra", np.nan, np.nan, len(common), ""))
+            continue
+        a = pd.to_numeric(reference.loc[common, col], errors="coerce").to_numpy(dtype=float)
+        b = pd.to_numeric(candidate.loc[common, col], errors="coerce").to_numpy(dtype=float)
+        close = np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+        both = ~np.isnan(a) & ~np.isnan(b)
+        diff = np.abs(a - b)[both]
+        rel = (diff / np.maximum(np.abs(a[both]), atol)) if both.any() else diff
+        mismatches = int((~close).sum())
+        nan_mismatches = int((np.isnan(a) != np.isnan(b)).sum())
+        rows.append((
+            col, "ok" if mismatches == 0 else "diff",
+            float(diff.max()) if len(diff) else 0.0, float(rel.max()) if len(rel) else 0.0,
+            mismatches, f"{nan_mismatches} NaN vs value" if nan_mismatches else "",
+        ))
+    return pd.DataFrame(rows, columns=["Column", "Status", "Max_abs", "Max_rel", "Mismatches", "Note"])
+
+
+# ---- inputs ----
+
+def generated_inputs(tmp, seeds=2, sizes=SIZES):
+    for n_wells, n_cols in sizes:
+        for seed in range(seeds):
+            df, layout = make_pod_export(n_wells=n_wells, n_cols=n_cols, seed=seed)
+            path = Path(tmp) / f"synthetic_{n_wells}w_s{seed}.xlsx"
+            df.to_excel(path, index=False)
+            yield path.stem, path, layout, None
+
+
+def workbook_input(tmp, workbook):
+    # Processed workbook: Full_Data is the input (its Well_ID -> Loaded pairs give a
+    # one-row layout), the stored summary sheets are the golden output
+    sheets = pd.read_excel(workbook, sheet_name=None)
+    full = sheets["Full_Data"]
+    mapping = full.dropna(subset=["Well_ID"]).drop_duplicates("Well_ID").set_index("Well_ID")["Loaded"]
+    wells = np.arange(1, int(mapping.index.max()) + 1)
+    layout = ["\t".join(str(mapping.get(w, "")) for w in wells)]
+    path = Path(tmp) / Path(workbook).name
+    export = full.drop(columns=["Loaded"]).rename(columns={"Sample_Name": "Sample Name", "Well_ID": "Well ID"})
+    export.to_excel(path, index=False)
+    golden = {ch: pd.read_excel(workbook, sheet_name=f"{ch}_summary", header=[0, 1], index_col=0) for ch in CHANNELS}
+    return Path(workbook).stem, path, layout, golden
+
+
+def run(implementations, inputs, reference=REFERENCE, repeat=1, rtol=1e-9, atol=1e-12):
+    diffs, timings = [], []
+    for label, path, layout, golden in inputs:
+        outputs = {}
+        for name, fn in implementations.items():
+            seconds = []
+            try:
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    out = fn(path, layout)
+                    seconds.append(time.perf_counter() - t0)
+            except Exception as exc:
+                timings.append((label, name, np.nan, f"{type(exc).__name__}: {exc}"))
+                continue
+            outputs[name] = out
+            timings.append((label, name, min(seconds), ""))
+        if golden is not None:
+            outputs["workbook"] = golden
+
+        if reference not in outputs:
+            continue
+        for name, out in outputs.items():
+            if name == reference:
+                continue
+            for ch in CHANNELS:
+                table = compare(canonical(outputs[reference][ch]), canonical(out[ch]), rtol=rtol, atol=atol)
+                table.insert(0, "Channel", ch)
+                table.insert(0, "Implementation", name)
+                table.insert(0, "Input", label)
+                diffs.append(table)
+
+    diff = pd.concat(diffs, ignore_index=True) if diffs else pd.DataFrame()
+    timing = pd.DataFrame(timings, columns=["Input", "Implementation", "Seconds", "Error"])
+    return diff, timing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare analysis implementations column by column")
+    parser.add_argument("files", nargs="*", help="raw single-pod exports (need --layout)")
+    parser.add_argument("--layout", help="tab-separated loading scheme for the given files")
+    parser.add_argument("--workbook", action="append", help=f"processed workbook with golden summaries (default {SAMPLE_WORKBOOK})")
+    parser.add_argument("--engine", action="append", default=[], help="extra engine as module:function")
+    parser.add_argument("--only", nargs="+", choices=list(IMPLEMENTATIONS), help="run a subset of the built-in implementations")
+    parser.add_argument("--reference", default=REFERENCE)
+    parser.add_argument("--seeds", type=int, default=2)
+    parser.add_argument("--no-generated", action="store_true")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    parser.add_argument("--atol", type=float, default=1e-12)
+    parser.add_argument("--verbose", action="store_true", help="also list columns that match")
+    parser.add_argument("--out", help="write diffs.csv and timings.csv into this directory")
+    args = parser.parse_args()
+
+    implementations = {name: IMPLEMENTATIONS[name] for name in (args.only or IMPLEMENTATIONS)}
+    implementations.setdefault(args.reference, IMPLEMENTATIONS[args.reference])
+    for spec in args.engine:
+        implementations[spec] = engine_from_spec(spec)
+    engines = [name for name in ENGINES if name in implementations] + args.engine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = [] if args.no_generated else list(generated_inputs(tmp, seeds=args.seeds))
+        if args.files:
+            if not args.layout:
+                parser.error("--layout is required with export files")
+            layout = Path(args.layout).read_text().strip().split("\n")
+            inputs += [(Path(f).stem, Path(f), layout, None) for f in args.files]
+        workbooks = args.workbook or ([SAMPLE_WORKBOOK] if Path(SAMPLE_WORKBOOK).exists() else [])
+        inputs += [workbook_input(tmp, wb) for wb in workbooks]
+
+        diff, timing = run(implementations, inputs, reference=args.reference,
+                           repeat=args.repeat, rtol=args.rtol, atol=args.atol)
+
+    with pd.option_context("display.width", 200, "display.max_rows", 500, "display.max_colwidth", 60):
+        print(f"Reference: {args.reference}   rtol={args.rtol} atol={args.atol}\n")
+        if len(diff):
+            shown = diff if args.verbose else diff[diff["Status"] != "ok"]
+            print(shown.to_string(index=False) if len(shown) else "All columns match.")
+            print("\nPer implementation (columns differing or missing / compared):")
+            grouped = diff.assign(bad=diff["Status"].isin(FAILING)).groupby("Implementation", sort=False)["bad"]
+            print(pd.DataFrame({"differing": grouped.sum(), "compared": grouped.size()}).to_string())
+        print("\nSeconds (read + analysis, best of", args.repeat, "):")
+        print(timing.pivot_table(index="Input", columns="Implementation", values="Seconds", sort=False).round(4).to_string())
+        errors = timing[timing["Error"] != ""]
+        if len(errors):
+            print("\nFailures:")
+            print(errors[["Input", "Implementation", "Error"]].to_string(index=False))
+
+    if args.out:
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        diff.to_csv(out / "diffs.csv", index=False)
+        timing.to_csv(out / "timings.csv", index=False)
+
+    # Only the engines meant to replace the reference gate the exit code
+    failed = len(diff) and (diff["Implementation"].isin(engines) & diff["Status"].isin(FAILING)).any()
+    failed = failed or timing["Implementation"].isin(engines).mul(timing["Error"] != "").any()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from rollup import with_derived
+
+# Row indexes for dashboard filters. Each filter column is factorized once and its rows
+# sorted by code, so the row positions of any value are one slice of that order. A filter
+# starts from the most selective column's slices and narrows those positions through the
+# other columns' codes, so its cost follows the size of the result rather than a boolean
+# scan over the whole replicate table per interaction.
+#
+#   index = RowIndex(df)
+#   rows = index.rows({"Device": ["Pod-2"], "Condition": ["FluA", "MG"]})
+#   df.take(rows)
+
+FILTER_COLUMNS = ["Experiment_ID", "Device", "Condition", "Channel", "Loaded"]
+DATE_COLUMN = "Run_Date"
+
+
+class RowIndex:
+    def __init__(self, df, columns=FILTER_COLUMNS, date_col=DATE_COLUMN):
+        df = with_derived(df)
+        self.n_rows = len(df)
+        self.columns = [c for c in columns if c in df.columns]
+        self.codes, self.values, self._order, self._bounds = {}, {}, {}, {}
+        for col in self.columns:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            order = np.argsort(codes, kind="stable")
+            # Rows without a value (code -1) sort first and belong to no slice
+            self._bounds[col] = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.codes[col], self.values[col], self._order[col] = codes, list(uniques), order
+
+        self.date_col = date_col if date_col in df.columns and df[date_col].notna().any() else None
+        if self.date_col is not None:
+            self.dates = pd.to_datetime(df[date_col], errors="coerce").to_numpy()
+            valid = np.flatnonzero(~np.isnat(self.dates))
+            self._date_order = valid[np.argsort(self.dates[valid], kind="stable")]
+            self._sorted_dates = self.dates[self._date_order]
+
+    def date_span(self):
+        return (self._sorted_dates[0], self._sorted_dates[-1]) if self.date_col is not None else None
+
+    def _codes(self, col, values):
+        lookup = {v: i for i, v in enumerate(self.values[col])}
+        return [lookup[v] for v in values if v in lookup]
+
+    def _slices(self, col, codes):
+        order, bounds = self._order[col], self._bounds[col]
+        parts = [order[bounds[c]:bounds[c + 1]] for c in codes]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def positions(self, col, values):
+        # Sorted row positions holding any of the values
+        return self._slices(col, self._codes(col, values))
+
+    def rows(self, selection, date_range=None):
+        # selection: {column: values}; an empty or missing entry means no constraint.
+        # Returns sorted row positions, or None when nothing is filtered.
+        constraints = {}
+        for col, chosen in selection.items():
+            if chosen and col in self.values and set(chosen) != set(self.values[col]):
+                codes = self._codes(col, chosen)
+                bounds = self._bounds[col]
+                constraints[col] = (codes, int(sum(bounds[c + 1] - bounds[c] for c in codes)))
+        if date_range is not None and self.date_col is not None:
+            start, end = np.datetime64(date_range[0]), np.datetime64(date_range[1])
+            lo = np.searchsorted(self._sorted_dates, start, side="left")
+            hi = np.searchsorted(self._sorted_dates, end, side="right")
+        else:
+            date_range = None
+        if not constraints and date_range is None:
+            return None
+
+        # Start from the smallest candidate set, then narrow it by the other constraints
+        col = min(constraints, key=lambda c: constraints[c][1]) if constraints else None
+        if date_range is not None and (col is None or hi - lo <= constraints[col][1]):
+            rows = np.sort(self._date_order[lo:hi])
+        else:
+            rows = self._slices(col, constraints.pop(col)[0])
+            if date_range is not None:
+                rows = rows[(self.dates[rows] >= start) & (self.dates[rows] <= end)]
+        for col, (codes, _) in constraints.items():
+            allowed = np.zeros(len(self.values[col]) + 1, dtype=bool)
+            allowed[codes] = True
+            # code -1 (no value) lands on the extra last slot, which stays False
+            rows = rows[allowed[self.codes[col][rows]]]
+        return rows
+
+    def distinct(self, col, rows=None):
+        # Values of col present among the given rows (all values when rows is None)
+        if rows is None:
+            return list(self.values[col])
+        codes = np.unique(self.codes[col][rows])
+        return [self.values[col][c] for c in codes if c >= 0]
+
+
+def show_filters(index, container=None, key="filters"):
+    # Sidebar widgets for a RowIndex -> (selection, date_range)
+    import streamlit as st
+
+    container = container or st.sidebar
+    selection = {}
+    for col in index.columns:
+        if len(index.values[col]) > 1:
+            selection[col] = container.multiselect(col, index.values[col], key=f"{key}_{col}")
+    date_range = None
+    if index.date_col is not None:
+        lo, hi = (pd.Timestamp(d).date() for d in index.date_span())
+        if lo < hi:
+            picked = container.date_input("Run date", (lo, hi), min_value=lo, max_value=hi, key=f"{key}_date")
+            if len(picked) == 2 and tuple(picked) != (lo, hi):
+                date_range = (pd.Timestamp(picked[0]), pd.Timestamp(picked[1]) + pd.Timedelta(days=1) - pd.Timedelta(1))
+    return selection, date_range
@@ -0,0 +1,198 @@
+import importlib.util
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# One ingest entry point for every export shape we receive. A workbook is read once as a
+# raw cell grid; the format is sniffed from its first rows and the grid is handed to that
+# format's parser, which slices it and converts columns to their types directly (no
+# second read_excel, no generic header search).
+#
+#   single_pod    one sheet, header row "Sample Name | Well ID | Channel | ... | Cq"
+#   multi_block   repeated "ID:" / "Name:" / "Device:" (optional "Date:") blocks, each with its own header
+#   pasted_9line  text copied from the instrument website, 9 lines per well/channel
+
+SNIFF_ROWS = 20
+NUMERIC = ["Cq", "Ampl.", "Slope"]
+POD_REQUIRED = ["Sample Name", "Well ID", "Channel", "Cq", "Classification"]
+# Added by _typed when a numeric cell does not convert: which of NUMERIC failed in that row
+NON_NUMERIC = "Non_Numeric"
+PASTED_COLUMNS = ["Sample Name", "Well ID", "Channel", "Assay", "Cq", "Ampl.", "Slope", "Block", "Classification"]
+
+# python-calamine (Rust) reads xlsx several times faster than openpyxl; used when installed
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+class FormatError(ValueError):
+    pass
+
+
+def read_grid(source):
+    # Whole first sheet as strings/numbers, no header interpretation
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    return pd.read_excel(source, header=None, engine=EXCEL_ENGINE)
+
+
+def _cells(head):
+    return head.iloc[:, 0].astype(str).str.strip()
+
+
+def _header_row(grid, rows=None):
+    first = grid.iloc[:rows, 0] if rows else grid.iloc[:, 0]
+    hits = np.flatnonzero(first.astype(str).str.strip().to_numpy() == "Sample Name")
+    return int(hits[0]) if len(hits) else None
+
+
+def _typed(df, well_col=None):
+    # Grid cells arrive as object columns; give the frame the dtypes read_excel would.
+    # Coercion turns text like "n/a" into NaN, so the failures are recorded in
+    # NON_NUMERIC ("Cq, Slope") for validation's numeric rules.
+    df = df.infer_objects()
+    failed = pd.Series("", index=df.index, dtype=object)
+    for col in NUMERIC + ([well_col] if well_col else []):
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors="coerce")
+            if col in NUMERIC:
+                bad = values.isna() & df[col].notna()
+                failed[bad] = failed[bad] + np.where(failed[bad] == "", "", ", ") + col
+            df[col] = values
+    if (failed != "").any():
+        df[NON_NUMERIC] = failed.where(failed != "")
+    return df
+
+
+def _check_columns(columns, required, fmt):
+    missing = [c for c in required if c not in columns]
+    if missing:
+        raise FormatError(f"{fmt}: missing column(s) {', '.join(missing)}")
+
+
+# ---- single pod ----
+
+def is_single_pod(head):
+    row = _header_row(head)
+    return row is not None and "Cq" in set(head.iloc[row].astype(str).str.strip())
+
+
+def parse_single_pod(grid):
+    # -> analysis_v6 column names (Sample_Name, Well_ID, ...), Well/Sample filled down
+    row = _header_row(grid, SNIFF_ROWS)
+    header = grid.iloc[row].astype(str).str.strip()
+    _check_columns(set(header), POD_REQUIRED, "single_pod")
+
+    df = grid.iloc[row + 1:].reset_index(drop=True)
+    df.columns = list(header.str.replace(" ", "_"))
+    df = _typed(df, well_col="Well_ID")
+    df["Sample_Name"] = df["Sample_Name"].ffill()
+    df["Well_ID"] = df["Well_ID"].ffill()
+    return df
+
+
+# ---- multi-experiment blocks ----
+
+def is_multi_block(head):
+    return _cells(head).str.startswith("ID:").any()
+
+
+def parse_multi_block(grid):
+    # All blocks are parsed in one pass: block number from a cumsum over "ID:" rows,
+    # metadata forward-filled per block, data rows are those after each block's header
+    first = grid.iloc[:, 0].astype(str).str.strip()
+    is_id = first.str.startswith("ID:").to_numpy()
+    if not is_id.any():
+        raise FormatError("multi_block: no 'ID:' rows found")
+    block = np.cumsum(is_id)
+
+    def meta(prefix):
+        values = first.where(first.str.startswith(prefix)).str.replace(prefix, "", n=1).str.strip()
+        return values.groupby(block).transform("first")
+
+    is_header = (first == "Sample Name").to_numpy()
+    headers = grid[is_header]
+    if headers.empty:
+        raise FormatError("multi_block: no 'Sample Name' header row found in any experiment block")
+    header = headers.iloc[0].astype(str).str.strip()
+    if (headers.astype(str).apply(lambda c: c.str.strip()).to_numpy() != header.to_numpy()).any():
+        raise FormatError("multi_block: experiment blocks have different column headers")
+    _check_columns(set(header), POD_REQUIRED, "multi_block")
+
+    after_header = pd.Series(is_header).groupby(block).cummax().to_numpy() & ~is_header
+    data = after_header & (block > 0) & grid.notna().any(axis=1).to_numpy()
+
+    df = grid[data].copy()
+    df.columns = list(header)
+    df["Experiment_ID"] = meta("ID:")[data].to_numpy()
+    df["Experiment_Name"] = meta("Name:")[data].to_numpy()
+    df["Device"] = meta("Device:")[data].to_numpy()
+    # Optional "Date:" line per block (run date, used by the dashboard filters)
+    dates = meta("Date:")[data]
+    if dates.notna().any():
+        df["Run_Date"] = pd.to_datetime(dates.to_numpy(), errors="coerce")
+    df = df.reset_index(drop=True)
+
+    # Fill down within each experiment only
+    for col in ["Sample Name", "Well ID"]:
+        df[col] = df.groupby("Experiment_ID", sort=False)[col].ffill()
+    df = _typed(df, well_col="Well ID")
+    df["Detected"] = df["Classification"] == "POSITIVE"
+    return df
+
+
+# ---- pasted 9-line text ----
+
+def is_pasted_9line(lines):
+    return len(lines) >= 9 and lines[2] in ("CH2", "CH3")
+
+
+def parse_pasted_9line(text):
+    lines = np.array([line.strip() for line in text.splitlines() if line.strip()], dtype=object)
+    # A trailing partial block is kept and padded, like the original list-of-blocks frame
+    lines = np.concatenate([lines, np.full(-len(lines) % 9, None, dtype=object)])
+    df = pd.DataFrame(lines.reshape(-1, 9), columns=PASTED_COLUMNS)
+    df = _typed(df)
+
+    # CH3 rows inherit sample name + well ID from the CH2 row before them
+    ch3 = df["Channel"] == "CH3"
+    for col in ["Sample Name", "Well ID"]:
+        df[col] = df[col].mask(ch3).ffill()
+    return df
+
+
+FORMATS = {
+    "single_pod": (is_single_pod, parse_single_pod),
+    "multi_block": (is_multi_block, parse_multi_block),
+}
+TEXT_FORMATS = {
+    "pasted_9line": (is_pasted_9line, parse_pasted_9line),
+}
+
+
+def sniff(grid):
+    head = grid.head(SNIFF_ROWS)
+    # Multi-block files also contain "Sample Name" header rows, so they are checked first
+    for name in ["multi_block", "single_pod"]:
+        if FORMATS[name][0](head):
+            return name
+    raise FormatError("Unrecognized export: no 'ID:' block and no 'Sample Name' header in the first rows")
+
+
+def load(source, expect=None):
+    # bytes / path / file object (xlsx) or str (pasted text) -> (format name, DataFrame)
+    if isinstance(source, str) and "\n" in source:
+        lines = [line.strip() for line in source.splitlines() if line.strip()][:SNIFF_ROWS]
+        for name, (detect, parse) in TEXT_FORMATS.items():
+            if detect(lines):
+                fmt, df = name, parse(source)
+                break
+        else:
+            raise FormatError("Unrecognized pasted text")
+    else:
+        grid = read_grid(source)
+        fmt = sniff(grid)
+        df = FORMATS[fmt][1](grid)
+
+    if expect is not None and fmt != expect:
+        raise FormatError(f"Expected a {expect} export, got {fmt}")
+    return fmt, df
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from metrics import observe_run, observe_stage
+
+STAGE_LOG = os.environ.get("STAGE_LOG", "logs/stage_timings.jsonl")
+# Peak-memory tracing slows the traced code down; opt in per recorder or with STAGE_TRACE_MEMORY=1.
+# Without it a stage records its resident-set growth (rss_mb) instead, where the OS reports it.
+TRACE_MEMORY = os.environ.get("STAGE_TRACE_MEMORY", "") == "1"
+
+# tracemalloc is process-wide: only trace while at least one stage is open,
+# and leave it alone if something else started it.
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+# Peaks seen so far by each open stage. tracemalloc has one peak per process, so entering
+# a stage folds the current peak into every open one before resetting it.
+_open_peaks = []
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _enter_peak():
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in _open_peaks:
+            frame[0] = max(frame[0], peak)
+        tracemalloc.reset_peak()
+        frame = [0]
+        _open_peaks.append(frame)
+    return frame
+
+
+def _exit_peak(frame):
+    with _tracing_lock:
+        _open_peaks.remove(frame)
+        return max(frame[0], tracemalloc.get_traced_memory()[1])
+
+
+def _rss():
+    # Current resident set size in bytes, None where /proc is not available
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+class StageRecorder:
+    # Records wall time, row counts and peak Python allocation (or RSS growth) per
+    # pipeline stage. Stages may nest; `depth` is 0 for top-level ones. Stages are appended
+    # to `records`, to the process metrics, and, if a log path is set, to a JSON-lines file.
+
+    def __init__(self, run_id=None, log_path=STAGE_LOG, trace_memory=TRACE_MEMORY, **context):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.log_path = Path(log_path) if log_path else None
+        self.trace_memory = trace_memory
+        self.context = context
+        self.records = []
+        self._depth = 0
+        observe_run(context)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        rec = {"run_id": self.run_id, "stage": name, "rows": rows, "depth": self._depth}
+        self._depth += 1
+        if self.trace_memory:
+            # Peaks are process-wide, so concurrent jobs inflate each other's numbers
+            _start_tracing()
+            peak = _enter_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        else:
+            rss = _rss()
+
+        t0 = time.perf_counter()
+        failed = False
+        try:
+            yield rec
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            rec["seconds"] = round(time.perf_counter() - t0, 6)
+            self._depth -= 1
+            if self.trace_memory:
+                rec["peak_mb"] = round((_exit_peak(peak) - base) / 2**20, 3)
+                _stop_tracing()
+            elif rss is not None:
+                rec["rss_mb"] = round((_rss() - rss) / 2**20, 3)
+            rec["timestamp"] = time.time()
+            rec.update(self.context)
+            self.records.append(rec)
+            self._write(rec)
+            observe_stage(rec, error=failed)
+
+    def _write(self, rec):
+        if self.log_path is None:
+            return
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(rec, default=str) + "\n")
+        except OSError:
+            # Timing logs must never break an analysis
+            pass
+
+    def to_frame(self):
+        cols = ["stage", "seconds", "rows", "peak_mb", "rss_mb"]
+        frame = pd.DataFrame(self.records)
+        if not len(frame):
+            return pd.DataFrame(columns=cols)
+        # Nested stages are indented under the stage that contains them
+        frame["stage"] = frame["depth"].map(lambda d: "  " * (d - 1) + "└ " if d else "") + frame["stage"]
+        return frame[[c for c in cols if c in frame.columns]]
+
+    @property
+    def total_seconds(self):
+        # Nested stages are already inside their parent's time
+        return sum(r["seconds"] for r in self.records if r["depth"] == 0)
+
+
+def show_timings_panel(recorder, container=None):
+    # Collapsible sidebar panel with one row per stage
+    import streamlit as st
+
+    container = container or st.sidebar
+    with container.expander("Performance", expanded=False):
+        if recorder is None or not recorder.records:
+            st.caption("No timings recorded yet.")
+            return
+        st.caption(f"Run {recorder.run_id}: {recorder.total_seconds:.2f} s total")
+        st.dataframe(recorder.to_frame(), hide_index=True)
@@ -0,0 +1,123 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import JOB_SECONDS
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key, stages):
+        self.key = key
+        self.stages = list(stages)
+        self.stage = None
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def progress(self):
+        # Fraction of stages completed (0..1)
+        if self.status == DONE:
+            return 1.0
+        if self.stage is None or not self.stages:
+            return 0.0
+        return self.stages.index(self.stage) / len(self.stages)
+
+    @property
+    def active(self):
+        return self.status in (PENDING, RUNNING)
+
+    def enter(self, stage):
+        # Called by the job function at each stage boundary; raises once cancelled
+        if self._cancel.is_set():
+            raise JobCancelled(stage)
+        if stage not in self.stages:
+            self.stages.append(stage)
+        self.stage = stage
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+class JobRunner:
+    # Runs analyses on a worker pool outside the Streamlit script thread.
+    # Jobs are keyed by their inputs so a refreshed browser tab can attach
+    # to work that is still running (or already done) instead of redoing it.
+
+    def __init__(self, max_workers=2, keep=32):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.keep = keep
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, stages=(), **kwargs):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status in (PENDING, RUNNING, DONE):
+                return job
+
+            job = Job(key, stages)
+            self._jobs[key] = job
+            self._evict()
+            job.future = self.pool.submit(self._run, job, fn, args, kwargs)
+            return job
+
+    def get(self, key):
+        return self._jobs.get(key)
+
+    def cancel(self, key):
+        job = self._jobs.get(key)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job.status = CANCELLED
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as exc:
+            job.error = f"{exc}\n{traceback.format_exc()}"
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            JOB_SECONDS.observe(job.finished - job.started, status=job.status)
+
+    def counts(self):
+        counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED, CANCELLED)}
+        for job in list(self._jobs.values()):
+            counts[job.status] += 1
+        return counts
+
+    def _evict(self):
+        # Drop the oldest finished jobs so results don't pile up in memory
+        finished = [k for k, j in self._jobs.items() if not j.active]
+        for key in finished[: max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[key]
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlencode
+
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+
+from synthetic import make_multi_export, make_pod_export, to_xlsx_bytes
+
+# Stand-in LIMS client: pushes exports at the analysis service and reports latency.
+#
+#   python service.py --port 8765 &
+#   python load_client.py --requests 200 --concurrency 16 --unique 20
+
+
+def build_payloads(args):
+    # A real export is sent as-is (after the first request every call is a cache hit);
+    # synthetic mode cycles `unique` distinct workbooks over all requests
+    if args.file:
+        layout = Path(args.layout).read_text().strip() if args.layout else ""
+        return [(Path(args.file).read_bytes(), layout)]
+
+    payloads = []
+    for i in range(args.unique):
+        if args.mode == "multi":
+            payloads.append((to_xlsx_bytes(make_multi_export(args.experiments, args.wells, seed=i), header=False), ""))
+        else:
+            df, layout = make_pod_export(n_wells=args.wells, seed=i)
+            payloads.append((to_xlsx_bytes(df), "\n".join(layout)))
+    return payloads
+
+
+async def worker(client, queue, url, mode, fmt, results):
+    while True:
+        item = await queue.get()
+        if item is None:
+            queue.task_done()
+            return
+        body, layout = item
+        params = {"format": fmt}
+        if mode == "pod":
+            params["layout"] = layout
+        request = HTTPRequest(
+            f"{url}/analyze{'/multi' if mode == 'multi' else ''}?{urlencode(params)}",
+            method="POST",
+            body=body,
+            request_timeout=600,
+        )
+        t0 = time.perf_counter()
+        response = await client.fetch(request, raise_error=False)
+        results.append((response.code, time.perf_counter() - t0, response.headers.get("X-Cache", "")))
+        queue.task_done()
+
+
+async def run(args):
+    payloads = build_payloads(args)
+    client = AsyncHTTPClient(max_clients=args.concurrency)
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(payloads[i % len(payloads)])
+    for _ in range(args.concurrency):
+        queue.put_nowait(None)
+
+    results = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*[
+        worker(client, queue, args.url, args.mode, args.format, results) for _ in range(args.concurrency)
+    ])
+    wall = time.perf_counter() - t0
+
+    ok = sorted(lat for code, lat, _ in results if code == 200)
+    codes = Counter(code for code, _, _ in results)
+    cache = Counter(c for code, _, c in results if code == 200)
+
+    def pct(p):
+        return ok[min(len(ok) - 1, int(p / 100 * len(ok)))] if ok else float("nan")
+
+    print(f"requests     {len(results)} in {wall:.2f} s ({len(results) / wall:.1f} req/s)")
+    print(f"status       {dict(codes)}")
+    print(f"cache        {dict(cache)}")
+    if ok:
+        print(f"latency ms   p50={pct(50) * 1e3:.1f}  p95={pct(95) * 1e3:.1f}  p99={pct(99) * 1e3:.1f}  "
+              f"mean={statistics.mean(ok) * 1e3:.1f}  max={ok[-1] * 1e3:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the local analysis service")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--mode", choices=["pod", "multi"], default="pod")
+    parser.add_argument("--format", choices=["json", "bundle"], default="json")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--unique", type=int, default=10, help="distinct workbooks to cycle through")
+    parser.add_argument("--wells", type=int, default=96)
+    parser.add_argument("--experiments", type=int, default=5)
+    parser.add_argument("--file", help="real export to send instead of synthetic data")
+    parser.add_argument("--layout", help="layout text file for --file in pod mode")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import os
+import sys
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# Process-wide operational metrics in Prometheus text format. Stage timings come from
+# StageRecorder, cache hits from StageCache, job durations from JobRunner; gauges that are
+# cheaper to read than to maintain (queue depth, cache size, session memory) are filled in
+# by callbacks at scrape time.
+#
+#   METRICS_PORT=9464 streamlit run app_v4.py   ->   curl localhost:9464/metrics
+#
+# METRICS_PORT=0 disables the HTTP listener; the service exposes the same registry on
+# its own /metrics route.
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(2**10 * 4**i for i in range(11))  # 1 KiB .. 1 GiB
+SESSION_TTL = 3600
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self.values.items())
+        if not items and not self.labelnames and self.kind != "histogram":
+            items = [((), 0)]
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def clear(self):
+        with self._lock:
+            self.values.clear()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [np.zeros(len(self.buckets) + 1, dtype=np.int64), 0.0]
+            state[0][np.searchsorted(self.buckets, value)] += 1
+            state[1] += value
+
+    def _samples(self, key, value):
+        counts, total = value
+        cumulative = np.cumsum(counts)
+        lines = [
+            f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(float(le)))])} {int(c)}"
+            for le, c in zip(self.buckets + (float("inf"),), cumulative)
+        ]
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(float(total))}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {int(cumulative[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.callbacks = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, help, labelnames, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, help, labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=SECONDS_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def register_callback(self, fn):
+        # fn() is called before every scrape; return False to unregister
+        with self._lock:
+            self.callbacks.append(fn)
+
+    def render(self):
+        with self._lock:
+            callbacks = list(self.callbacks)
+        for fn in callbacks:
+            try:
+                keep = fn()
+            except Exception:
+                # A broken collector must not take the endpoint down
+                keep = True
+            if keep is False:
+                with self._lock:
+                    self.callbacks.remove(fn)
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("qpcr_stage_seconds", "Wall time per pipeline stage", ["app", "stage"])
+STAGE_ROWS = REGISTRY.counter("qpcr_stage_rows_total", "Rows processed per pipeline stage", ["app", "stage"])
+STAGE_PEAK = REGISTRY.histogram(
+    "qpcr_stage_peak_bytes", "Peak Python allocation per pipeline stage", ["app", "stage"], buckets=BYTES_BUCKETS
+)
+STAGE_ERRORS = REGISTRY.counter("qpcr_stage_errors_total", "Pipeline stages that raised", ["app", "stage"])
+EXPORT_SECONDS = REGISTRY.histogram("qpcr_export_seconds", "Static image export time per run", ["renderer"])
+EXPORT_IMAGES = REGISTRY.counter("qpcr_export_images_total", "Images written by static export", ["renderer"])
+RUNS = REGISTRY.counter("qpcr_runs_total", "Analysis runs started", ["app", "mode"])
+UPLOAD_BYTES = REGISTRY.histogram("qpcr_upload_bytes", "Uploaded workbook size per run", ["app"], buckets=BYTES_BUCKETS)
+CACHE_REQUESTS = REGISTRY.counter("qpcr_cache_requests_total", "Cache lookups", ["cache", "stage", "result"])
+CACHE_ENTRIES = REGISTRY.gauge("qpcr_cache_entries", "Entries held in a cache", ["cache"])
+JOB_SECONDS = REGISTRY.histogram("qpcr_job_seconds", "Background job run time", ["status"])
+JOBS = REGISTRY.gauge("qpcr_jobs", "Background jobs by status (pending = queue depth)", ["app", "status"])
+SESSIONS = REGISTRY.gauge("qpcr_sessions", "Sessions seen in the last hour")
+SESSION_BYTES = REGISTRY.gauge("qpcr_session_state_bytes", "Estimated memory held in session state", ["agg"])
+
+
+def observe_stage(rec, error=False):
+    # Called by StageRecorder for every finished stage
+    app, stage = rec.get("app", ""), rec["stage"]
+    STAGE_SECONDS.observe(rec["seconds"], app=app, stage=stage)
+    if rec.get("rows"):
+        STAGE_ROWS.inc(rec["rows"], app=app, stage=stage)
+    if rec.get("peak_mb") is not None:
+        STAGE_PEAK.observe(rec["peak_mb"] * 2**20, app=app, stage=stage)
+    if error:
+        STAGE_ERRORS.inc(app=app, stage=stage)
+    if rec.get("renderer"):
+        EXPORT_SECONDS.observe(rec["seconds"], renderer=rec["renderer"])
+        EXPORT_IMAGES.inc(rec.get("rows") or 0, renderer=rec["renderer"])
+
+
+def observe_run(context):
+    RUNS.inc(app=context.get("app", ""), mode=context.get("mode", ""))
+    if context.get("upload_bytes") is not None:
+        UPLOAD_BYTES.observe(context["upload_bytes"], app=context.get("app", ""))
+
+
+def track_cache(name, entries):
+    # entries: zero-argument callable returning the current entry count
+    REGISTRY.register_callback(lambda: CACHE_ENTRIES.set(entries(), cache=name))
+
+
+def track_jobs(runner, app):
+    ref = weakref.ref(runner)
+
+    def collect():
+        runner = ref()
+        if runner is None:
+            return False
+        counts = runner.counts()
+        for status, n in counts.items():
+            JOBS.set(n, app=app, status=status)
+    REGISTRY.register_callback(collect)
+
+
+# ---- session memory ----
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_sizes = {}
+
+
+def nbytes(obj, _depth=0):
+    # Rough deep size; DataFrames/arrays via their buffers, containers recursively.
+    # Results are memoized per live object so reruns don't rescan unchanged frames.
+    cached = _sizes.get(id(obj))
+    if cached is not None and cached[0]() is obj:
+        return cached[1]
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        size = int(obj.memory_usage(deep=True).sum()) if isinstance(obj, pd.DataFrame) else int(obj.memory_usage(deep=True))
+    elif isinstance(obj, np.ndarray):
+        size = obj.nbytes
+    elif isinstance(obj, (bytes, bytearray, str)):
+        return len(obj)
+    elif _depth > 8:
+        return sys.getsizeof(obj)
+    elif isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(nbytes(v, _depth + 1) for v in obj.values())
+    elif isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(nbytes(v, _depth + 1) for v in obj)
+    elif hasattr(obj, "to_plotly_json"):
+        size = nbytes(obj.to_plotly_json(), _depth + 1)
+    else:
+        return sys.getsizeof(obj)
+
+    try:
+        _sizes[id(obj)] = (weakref.ref(obj, lambda _, k=id(obj): _sizes.pop(k, None)), size)
+    except TypeError:
+        pass
+    return size
+
+
+def track_session(session_id, state):
+    # state: mapping of what the session holds (st.session_state, job results)
+    size = sum(nbytes(v) for v in list(state.values()))
+    with _sessions_lock:
+        _sessions[session_id] = (time.time(), size)
+    return size
+
+
+def _collect_sessions():
+    cutoff = time.time() - SESSION_TTL
+    with _sessions_lock:
+        for sid in [s for s, (seen, _) in _sessions.items() if seen < cutoff]:
+            del _sessions[sid]
+        sizes = [size for _, size in _sessions.values()]
+    SESSIONS.set(len(sizes))
+    SESSION_BYTES.set(sum(sizes), agg="sum")
+    SESSION_BYTES.set(max(sizes, default=0), agg="max")
+
+
+REGISTRY.register_callback(_collect_sessions)
+
+
+def track_streamlit_session(*extra):
+    # Call from a Streamlit script: accounts session_state plus any extra objects
+    # (e.g. job results held outside session_state) to the current session
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    state = {k: st.session_state[k] for k in st.session_state.keys()}
+    state.update({f"_extra{i}": obj for i, obj in enumerate(extra) if obj is not None})
+    return track_session(ctx.session_id, state)
+
+
+# ---- HTTP endpoint ----
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=METRICS_PORT, host=METRICS_HOST):
+    # Starts the listener once per process; later calls are no-ops. Returns the server,
+    # or None if disabled or the port is taken (e.g. by another app process).
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError:
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
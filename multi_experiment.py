@@ -0,0 +1,63 @@
+import pandas as pd
+
+from formats import parse_multi_block, read_grid
+from qc import flag_outliers
+from rollup import RollupCube, resolve, summarize
+
+
+def parse_multi_experiment_excel(uploaded_file):
+    # ID:/Name:/Device: blocks -> one frame with Experiment_ID/Experiment_Name/Device
+    return parse_multi_block(read_grid(uploaded_file))
+
+
+# Base grain of the cube: coarse enough that it compresses the replicates (Experiment_Name
+# and Concentration follow from Experiment_ID and Loaded). Finer groupings (Sample_Name,
+# Assay, Source_File) are summarized from the replicates on demand.
+BASE_GRAIN = ("Experiment_ID", "Experiment_Name", "Device", "Channel", "Loaded", "Concentration", "Condition")
+# Rollups offered in app_v4; the first one is the per-experiment summary table
+SUMMARY_LEVEL = ("Experiment_ID", "Experiment_Name", "Channel", "Loaded")
+ROLLUP_LEVELS = {
+    "Experiment x Channel x Loaded": SUMMARY_LEVEL,
+    "Device x Channel x Loaded": ("Device", "Channel", "Loaded"),
+    "Condition x Channel (all concentrations)": ("Condition", "Channel"),
+    "Loaded x Channel (all experiments)": ("Channel", "Loaded"),
+    "Channel (overall)": ("Channel",),
+}
+
+
+def _included(df, exclude_outliers=False, outlier_method="mad"):
+    if exclude_outliers:
+        if "QC_outlier" not in df.columns:
+            df = flag_outliers(df, group_cols=["Experiment_ID", "Channel", "Loaded"], method=outlier_method)
+        df = df[~df["QC_outlier"]]
+    return df
+
+
+def build_cube(df, exclude_outliers=False, outlier_method="mad"):
+    return RollupCube(_included(df, exclude_outliers, outlier_method), levels=ROLLUP_LEVELS.values(), dims=BASE_GRAIN)
+
+
+def rollup_summary(cube, df, dims, exclude_outliers=False, outlier_method="mad"):
+    # From the cube when dims are within its grain, else one pass over the replicates
+    if all(d in cube.dims for d in resolve(dims)):
+        return cube.summary(dims)
+    return summarize(_included(df, exclude_outliers, outlier_method), dims)
+
+
+def summary_from_cube(cube):
+    summary = cube.summary(SUMMARY_LEVEL)
+    summary = summary[summary["Loaded"].notna()].reset_index(drop=True)
+    numeric_cols = ["Cq", "Ampl.", "Slope"]
+    return pd.DataFrame({
+        "Loaded": summary["Loaded"],
+        **{f"{m}_{stat}": summary[f"{m}_{stat}"] for m in numeric_cols for stat in ("mean", "std")},
+        "Experiment_ID": summary["Experiment_ID"],
+        "Experiment_Name": summary["Experiment_Name"],
+        "Channel": summary["Channel"],
+        "Detection_%_": summary["Detection_%"],
+        "N_replicates": summary["Cq_n"],
+    })
+
+
+def summarize_multi_experiment(df, exclude_outliers=False, outlier_method="mad"):
+    return summary_from_cube(build_cube(df, exclude_outliers, outlier_method))
@@ -0,0 +1,132 @@
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+
+import pandas as pd
+
+from batch import MP_CONTEXT, unique_names
+
+# Multi-experiment export bundle (one ZIP):
+#
+#   summary.xlsx                    combined Summary, Comparisons, Validation
+#   experiments/<Experiment_ID>.xlsx  that experiment's Summary + Full_Data
+#   plots/<figure>.png              (.html when no static renderer can draw it)
+#
+# Workbooks and images are built in worker processes (openpyxl and the renderers are pure
+# Python and hold the GIL) and written into the ZIP as each one finishes. At most a few
+# tasks per worker are in flight, so hundreds of experiments don't pickle the whole
+# table up front and the wall time follows the core count rather than the experiment count.
+
+IN_FLIGHT_PER_WORKER = 2
+
+
+def workbook_bytes(sheets):
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=name, index=False)
+    return buffer.getvalue()
+
+
+def workbook_entry(arcname, sheets):
+    return arcname, workbook_bytes(sheets)
+
+
+def figure_entry(name, fig_json, renderer="kaleido", scale=2):
+    # Worker side: figure JSON -> (arcname, bytes). The builtin renderer is only used for
+    # figures it accepts (no facets, like the faceted multi-experiment plots).
+    import plotly.io as pio
+
+    from static_render import UnsupportedFigure, render
+
+    fig = pio.from_json(fig_json)
+    fig.update_layout(template="plotly_white")
+
+    def builtin():
+        try:
+            return render(fig, fmt="png", scale=scale)
+        except UnsupportedFigure:
+            return None
+
+    def kaleido():
+        try:
+            return fig.to_image(format="png", scale=scale)
+        except Exception:
+            # Kaleido missing or without a browser
+            return None
+
+    for draw in ((builtin, kaleido) if renderer == "builtin" else (kaleido, builtin)):
+        data = draw()
+        if data is not None:
+            return f"plots/{name}.png", data
+    return f"plots/{name}.html", fig.to_html(include_plotlyjs="cdn").encode()
+
+
+def _file_stem(value):
+    return re.sub(r"[^\w.-]+", "_", str(value)).strip("._") or "experiment"
+
+
+def export_tasks(df_multi, combined_summary, comparisons, figures, validation=None, renderer="kaleido"):
+    # (fn, args) per ZIP entry; experiment slices are taken lazily, one group at a time
+    sheets = {"Summary": combined_summary, "Comparisons": comparisons}
+    if validation is not None:
+        sheets["Validation"] = validation
+    yield workbook_entry, ("summary.xlsx", sheets)
+
+    rows = df_multi.groupby("Experiment_ID", sort=False).indices
+    summary_rows = combined_summary.groupby("Experiment_ID", sort=False).indices
+    stems = unique_names([f"{_file_stem(exp)}.xlsx" for exp in rows])
+    for exp, stem in zip(rows, stems):
+        yield workbook_entry, (f"experiments/{stem}", {
+            "Summary": combined_summary.take(summary_rows.get(exp, [])),
+            "Full_Data": df_multi.take(rows[exp]),
+        })
+
+    for name, fig in figures.items():
+        yield figure_entry, (name, fig.to_json(), renderer)
+
+
+def _results(tasks, max_workers):
+    # Yields task results in completion order
+    if max_workers <= 1:
+        for fn, args in tasks:
+            yield fn(*args)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=MP_CONTEXT)
+    pending = set()
+    try:
+        for fn, args in tasks:
+            pending.add(pool.submit(fn, *args))
+            if len(pending) >= max_workers * IN_FLIGHT_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+
+def export_multi(df_multi, combined_summary, comparisons, figures, validation=None,
+                 renderer="kaleido", max_workers=None, on_done=None):
+    # -> ZIP bytes. `on_done(arcname)` is called as each entry is written and may raise
+    # to abort the remaining ones.
+    n_experiments = df_multi["Experiment_ID"].nunique()
+    max_workers = max_workers or min(n_experiments + len(figures) + 1, os.cpu_count() or 1)
+    tasks = export_tasks(df_multi, combined_summary, comparisons, figures, validation, renderer)
+
+    buffer = BytesIO()
+    # Entries are xlsx / png, already compressed
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zipf:
+        for arcname, data in _results(tasks, max_workers):
+            zipf.writestr(arcname, data)
+            if on_done is not None:
+                on_done(arcname)
+    return buffer.getvalue()
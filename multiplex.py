@@ -0,0 +1,162 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from platemap import metric_values
+
+# Multiplex wells side by side: the export has one row per well x channel, the pivot has
+# one row per well (per experiment) with every channel's metrics as columns. Rows are
+# placed by integer codes (experiment x well, channel) in one scatter per metric, so the
+# cost is the same for duplex and 6-plex and there is no merge on string keys.
+#
+#   Well_ID  Loaded  CH2_Cq  CH2_Positive  CH3_Cq  CH3_Positive  ...
+
+METRICS = ["Cq", "Ampl.", "Slope", "Classification"]
+# Well-level columns carried over from the first row of each well
+WELL_COLUMNS = ["Sample_Name", "Sample Name", "Loaded", "Condition", "Concentration", "Experiment_Name", "Device"]
+
+
+def well_pivot(df, well_col="Well_ID", channel_col="Channel", experiment_col=None, metrics=METRICS):
+    wells = pd.to_numeric(df[well_col], errors="coerce").to_numpy(dtype=float)
+    ok = ~np.isnan(wells) & df[channel_col].notna().to_numpy()
+    df = df[ok]
+    wells = wells[ok]
+
+    ch_codes, channels = pd.factorize(df[channel_col], sort=True)
+    if experiment_col is not None:
+        exp_codes, experiments = pd.factorize(df[experiment_col], sort=False)
+    else:
+        exp_codes, experiments = np.zeros(len(df), dtype=np.int64), None
+
+    # (experiment, well) -> row code; first occurrence gives the well-level columns
+    well_key = exp_codes.astype(np.int64) * (int(wells.max()) + 1 if len(wells) else 1) + wells.astype(np.int64)
+    keys, first, row = np.unique(well_key, return_index=True, return_inverse=True)
+    n_rows, n_ch = len(keys), len(channels)
+
+    out = {}
+    if experiment_col is not None:
+        out[experiment_col] = np.asarray(experiments)[exp_codes[first]]
+    out[well_col] = wells[first]
+    for col in WELL_COLUMNS:
+        if col in df.columns and col not in out:
+            out[col] = df[col].to_numpy()[first]
+
+    cell = row * n_ch + ch_codes
+    for metric in metrics:
+        if metric not in df.columns:
+            continue
+        if metric == "Classification":
+            grid = np.full(n_rows * n_ch, None, dtype=object)
+            grid[cell] = df[metric].to_numpy()
+            positive = np.zeros(n_rows * n_ch, dtype=bool)
+            positive[cell] = metric_values(df, metric) == 1
+            grids = {"Classification": grid, "Positive": positive}
+        else:
+            grid = np.full(n_rows * n_ch, np.nan)
+            grid[cell] = metric_values(df, metric)
+            grids = {metric: grid}
+        for name, grid in grids.items():
+            grid = grid.reshape(n_rows, n_ch)
+            for j, channel in enumerate(channels):
+                out[f"{channel}_{name}"] = grid[:, j]
+
+    pivot = pd.DataFrame(out)
+    pivot.attrs["channels"] = list(channels)
+    return pivot
+
+
+def pivot_channels(pivot):
+    return pivot.attrs.get("channels") or [c[: -len("_Positive")] for c in pivot.columns if c.endswith("_Positive")]
+
+
+def _grouped_counts(pivot, by, flags):
+    # flags: {name: bool array} -> per-group counts, one bincount per flag
+    if by:
+        codes = pivot.groupby(list(by), sort=True, dropna=False).ngroup().to_numpy()
+        groups = pivot[list(by)].iloc[np.unique(codes, return_index=True)[1]].reset_index(drop=True)
+    else:
+        codes = np.zeros(len(pivot), dtype=np.int64)
+        groups = pd.DataFrame(index=[0])
+    n_groups = len(groups)
+    groups["N_wells"] = np.bincount(codes, minlength=n_groups)
+    for name, flag in flags.items():
+        groups[name] = np.bincount(codes, weights=flag.astype(float), minlength=n_groups).astype(int)
+    return groups
+
+
+def co_detection(pivot, by=("Loaded",), channels=None):
+    # Per group: wells positive in all / any / none of the channels, plus each channel's
+    # own detection. Percentages are of the wells in the group.
+    channels = channels or pivot_channels(pivot)
+    positive = np.column_stack([pivot[f"{ch}_Positive"].to_numpy(dtype=bool) for ch in channels])
+    n_pos = positive.sum(axis=1)
+    flags = {f"{ch}_positive": positive[:, j] for j, ch in enumerate(channels)}
+    flags.update({
+        "All_positive": n_pos == len(channels),
+        "Any_positive": n_pos > 0,
+        "None_positive": n_pos == 0,
+    })
+    summary = _grouped_counts(pivot, by, flags)
+    for name in flags:
+        summary[f"{name}_%"] = 100 * summary[name] / summary["N_wells"]
+    return summary
+
+
+def pair_co_detection(pivot, by=("Loaded",), channels=None):
+    # Every channel pair: both / either / neither / only-one positive, long format
+    channels = channels or pivot_channels(pivot)
+    frames = []
+    for a, b in combinations(channels, 2):
+        pa, pb = pivot[f"{a}_Positive"].to_numpy(dtype=bool), pivot[f"{b}_Positive"].to_numpy(dtype=bool)
+        summary = _grouped_counts(pivot, by, {
+            "Both": pa & pb, "Either": pa | pb, "Neither": ~(pa | pb), "Only_A": pa & ~pb, "Only_B": pb & ~pa,
+        })
+        summary.insert(0, "Channel_B", b)
+        summary.insert(0, "Channel_A", a)
+        frames.append(summary)
+    if not frames:
+        return pd.DataFrame()
+    out = pd.concat(frames, ignore_index=True)
+    for name in ["Both", "Either", "Neither"]:
+        out[f"{name}_%"] = 100 * out[name] / out["N_wells"]
+    return out
+
+
+def channel_scatter(pivot, x="CH2", y="CH3", metric="Cq", color="Loaded", title=None):
+    # One point per well: channel x against channel y, with the identity line
+    import plotly.express as px
+
+    data = pivot.dropna(subset=[f"{x}_{metric}", f"{y}_{metric}"])
+    hover = [c for c in ["Sample_Name", "Sample Name", "Well_ID", "Well ID", "Source_File", "Experiment_ID"] if c in data.columns]
+    fig = px.scatter(
+        data, x=f"{x}_{metric}", y=f"{y}_{metric}",
+        color=color if color in data.columns else None, hover_data=hover,
+        title=title or f"{metric}: {x} vs {y}",
+    )
+    values = data[[f"{x}_{metric}", f"{y}_{metric}"]].to_numpy()
+    if len(values):
+        lo, hi = float(np.nanmin(values)), float(np.nanmax(values))
+        fig.add_shape(type="line", x0=lo, y0=lo, x1=hi, y1=hi, line=dict(color="#999999", dash="dot"))
+    fig.update_layout(xaxis_title=f"{x} {metric}", yaxis_title=f"{y} {metric}")
+    return fig
+
+
+def show_co_detection(pivot, by=("Loaded",), key="multiplex"):
+    # Co-detection tables and a channel-vs-channel scatter for the Streamlit apps
+    import streamlit as st
+
+    channels = pivot_channels(pivot)
+    if len(channels) < 2:
+        st.caption("Only one channel in this data; nothing to compare.")
+        return
+    st.dataframe(co_detection(pivot, by=by, channels=channels), hide_index=True)
+    if len(channels) > 2:
+        st.caption("Per channel pair")
+        st.dataframe(pair_co_detection(pivot, by=by, channels=channels), hide_index=True)
+
+    cols = st.columns(3)
+    x = cols[0].selectbox("X channel", channels, index=0, key=f"{key}_x")
+    y = cols[1].selectbox("Y channel", channels, index=1, key=f"{key}_y")
+    metric = cols[2].selectbox("Metric", [m for m in METRICS if m != "Classification"], key=f"{key}_metric")
+    st.plotly_chart(channel_scatter(pivot, x=x, y=y, metric=metric), use_container_width=True)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# Standard plate geometries (wells -> rows x columns); pods use the pasted layout instead
+GEOMETRIES = {16: (4, 4), 24: (4, 6), 48: (6, 8), 96: (8, 12), 384: (16, 24), 1536: (32, 48)}
+
+METRIC_COLUMNS = ["Cq", "Ampl.", "Slope", "Classification"]
+
+
+def infer_geometry(n_wells):
+    # Smallest standard plate that holds n_wells, else a near-square grid
+    for size, shape in sorted(GEOMETRIES.items()):
+        if n_wells <= size:
+            return shape
+    n_cols = int(np.ceil(np.sqrt(n_wells * 1.5)))
+    return int(np.ceil(n_wells / n_cols)), n_cols
+
+
+def layout_grid(layout_lines):
+    # Pasted pod layout -> (rows x cols) array of Loaded labels
+    layout = [row.split("\t") for row in layout_lines]
+    n_cols = max(len(row) for row in layout)
+    return np.array([row + [""] * (n_cols - len(row)) for row in layout], dtype=object)
+
+
+def row_labels(n_rows):
+    # A..Z, then AA, AB, ... like 1536-well plates
+    letters = [chr(ord("A") + i) for i in range(26)]
+    return [letters[i] if i < 26 else letters[i // 26 - 1] + letters[i % 26] for i in range(n_rows)]
+
+
+def metric_values(df, metric):
+    if metric == "Classification":
+        cls = df["Classification"].astype(str).str.upper()
+        return np.where(df["Classification"].isna(), np.nan, (cls == "POSITIVE").astype(float))
+    values = pd.to_numeric(df[metric], errors="coerce").to_numpy(dtype=float)
+    if metric == "Cq":
+        values = np.where(values == -1, np.nan, values)
+    return values
+
+
+def plate_array(df, metric, n_rows, n_cols, well_col="Well_ID", channel_col="Channel", experiment_col=None):
+    # Scatter per-well values into an (experiments x channels x rows x cols) array in one
+    # fancy-indexing assignment. Well IDs are 1-based and numbered row-major, like the layout.
+    wells = pd.to_numeric(df[well_col], errors="coerce").to_numpy(dtype=float)
+    ch_codes, channels = pd.factorize(df[channel_col], sort=True)
+    if experiment_col is not None:
+        exp_codes, experiments = pd.factorize(df[experiment_col], sort=True)
+    else:
+        exp_codes, experiments = np.zeros(len(df), dtype=int), pd.Index([None])
+
+    values = metric_values(df, metric)
+    n_wells = n_rows * n_cols
+    ok = (~np.isnan(wells)) & (wells >= 1) & (wells <= n_wells) & (ch_codes >= 0) & (exp_codes >= 0)
+
+    well_idx = wells[ok].astype(int) - 1
+    flat = (exp_codes[ok] * len(channels) + ch_codes[ok]) * n_wells + well_idx
+
+    grid = np.full(len(experiments) * len(channels) * n_wells, np.nan)
+    grid[flat] = values[ok]
+    return grid.reshape(len(experiments), len(channels), n_rows, n_cols), list(channels), list(experiments)
+
+
+def plate_figure(df, metric, n_rows, n_cols, labels=None, well_col="Well_ID", experiment_col=None, title=None):
+    # One heatmap per Channel (facet); experiments become animation frames
+    import plotly.express as px
+
+    grid, channels, experiments = plate_array(
+        df, metric, n_rows, n_cols, well_col=well_col, experiment_col=experiment_col
+    )
+    x = [str(c + 1) for c in range(n_cols)]
+    y = row_labels(n_rows)
+
+    kwargs = {"facet_col": 1, "facet_col_wrap": 2} if experiment_col else {"facet_col": 0, "facet_col_wrap": 2}
+    if experiment_col:
+        kwargs["animation_frame"] = 0
+        data = grid
+    else:
+        data = grid[0]
+
+    is_cls = metric == "Classification"
+    fig = px.imshow(
+        data,
+        x=x,
+        y=y,
+        aspect="equal" if max(n_rows, n_cols) <= 48 else "auto",
+        color_continuous_scale=["#d9d9d9", "#d62728"] if is_cls else "Viridis_r" if metric == "Cq" else "Viridis",
+        zmin=0 if is_cls else None,
+        zmax=1 if is_cls else None,
+        title=title or f"{metric} plate map",
+        **kwargs,
+    )
+
+    # Facet titles "facet_col=0" -> channel names
+    for ann in fig.layout.annotations:
+        idx = int(ann.text.split("=")[-1])
+        ann.text = channels[idx]
+
+    if experiment_col:
+        for frame, exp in zip(fig.frames, experiments):
+            frame.name = str(exp)
+        if fig.layout.sliders:
+            for step, exp in zip(fig.layout.sliders[0].steps, experiments):
+                step.label = str(exp)
+
+    if labels is not None:
+        # Show the loaded sample per well on hover
+        text = np.asarray(labels, dtype=object)[:n_rows, :n_cols]
+        traces = list(fig.data) + [t for frame in fig.frames for t in frame.data]
+        for trace in traces:
+            trace.text = text
+            trace.hovertemplate = "Well %{y}%{x}<br>Loaded: %{text}<br>" + metric + ": %{z}<extra></extra>"
+
+    return fig
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+# Replicate outlier detection per Loaded group. Every method runs as one grouped,
+# vectorized pass over the whole frame (no per-group Python loop).
+
+METHODS = ["mad", "grubbs", "dixon"]
+
+# Dixon's critical values, 95 % confidence, by group size: r10 for 3-7 replicates, r11
+# (gap over the range without the opposite extreme) for 8-10 (Rorabacher 1991)
+DIXON_Q95 = {3: 0.970, 4: 0.829, 5: 0.710, 6: 0.625, 7: 0.568, 8: 0.615, 9: 0.570, 10: 0.534}
+DIXON_R11_FROM = 8
+
+
+def _group_codes(df, group_cols):
+    codes = df.groupby(list(group_cols), sort=False, dropna=False).ngroup().to_numpy()
+    return codes, codes.max() + 1 if len(codes) else 0
+
+
+def _mad_scores(x, codes, n_groups, threshold):
+    s = pd.Series(x)
+    med = s.groupby(codes).transform("median").to_numpy()
+    dev = np.abs(x - med)
+    mad = pd.Series(dev).groupby(codes).transform("median").to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = 0.6745 * (x - med) / mad
+    # MAD of 0 (most replicates identical): anything off the median is an outlier
+    score = np.where((mad == 0) & (dev == 0), 0.0, score)
+    return score, np.abs(score) > threshold
+
+
+def _grubbs_scores(x, codes, n_groups, alpha):
+    from scipy.stats import t as t_dist
+
+    s = pd.Series(x)
+    g = s.groupby(codes)
+    n = g.transform("count").to_numpy()
+    mean = g.transform("mean").to_numpy()
+    std = g.transform("std").to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        G = np.abs(x - mean) / std
+        # Single-outlier Grubbs: only the most extreme replicate per group is tested
+        g_max = pd.Series(G).groupby(codes).transform("max").to_numpy()
+        t = t_dist.ppf(1 - alpha / (2 * n), n - 2)
+        g_crit = (n - 1) / np.sqrt(n) * np.sqrt(t ** 2 / (n - 2 + t ** 2))
+    flag = (n >= 3) & (G == g_max) & (G > g_crit)
+    return G, flag
+
+
+def _dixon_scores(x, codes, n_groups):
+    valid = ~np.isnan(x)
+    idx = np.flatnonzero(valid)
+    order = idx[np.lexsort((x[idx], codes[idx]))]
+    xs, cs = x[order], codes[order]
+
+    n = np.bincount(cs, minlength=n_groups)
+    start = np.concatenate([[0], np.cumsum(n)[:-1]])
+    end = start + n - 1
+    usable = (n >= 3) & (n <= 10)
+
+    lo, hi = start[cs], end[cs]
+    next_lo, next_hi = np.minimum(lo + 1, hi), np.maximum(hi - 1, lo)
+    r11 = n[cs] >= DIXON_R11_FROM
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # r10 divides by the full range; r11 leaves out the extreme at the other end
+        lo_span = np.where(r11, xs[next_hi], xs[hi]) - xs[lo]
+        hi_span = xs[hi] - np.where(r11, xs[next_lo], xs[lo])
+        pos = np.arange(len(order))
+        q = np.zeros(len(order))
+        is_lo = pos == lo
+        is_hi = pos == hi
+        q[is_lo] = ((xs[next_lo] - xs[lo]) / lo_span)[is_lo]
+        q[is_hi] = ((xs[hi] - xs[next_hi]) / hi_span)[is_hi]
+    q = np.nan_to_num(q)
+
+    crit = np.full(max(n.max(initial=0), 10) + 1, np.inf)
+    crit[list(DIXON_Q95)] = list(DIXON_Q95.values())
+    flag_sorted = usable[cs] & (q > crit[n[cs]])
+
+    score = np.full(len(x), np.nan)
+    flag = np.zeros(len(x), dtype=bool)
+    score[order] = q
+    flag[order] = flag_sorted
+    return score, flag
+
+
+def flag_outliers(df, group_cols=("Loaded",), metrics=("Cq",), method="mad", threshold=3.5, alpha=0.05):
+    # Adds <metric>_outlier_score / <metric>_outlier per metric and a combined QC_outlier
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method: {method}")
+
+    out = df.copy()
+    codes, n_groups = _group_codes(out, group_cols)
+    any_flag = np.zeros(len(out), dtype=bool)
+
+    for metric in metrics:
+        x = pd.to_numeric(out[metric], errors="coerce").to_numpy(dtype=float)
+        if metric == "Cq":
+            x = np.where(x == -1, np.nan, x)
+
+        if method == "mad":
+            score, flag = _mad_scores(x, codes, n_groups, threshold)
+        elif method == "grubbs":
+            score, flag = _grubbs_scores(x, codes, n_groups, alpha)
+        else:
+            score, flag = _dixon_scores(x, codes, n_groups)
+
+        flag = flag & ~np.isnan(x)
+        out[f"{metric}_outlier_score"] = score
+        out[f"{metric}_outlier"] = flag
+        any_flag |= flag
+
+    out["QC_outlier"] = any_flag
+    return out
+
+
+ID_COLUMNS = ["Source_File", "Experiment_ID", "Channel", "Loaded", "Well_ID", "Well ID", "Sample_Name", "Sample Name"]
+
+
+def dropped_wells(df, metrics=("Cq",)):
+    # Report of flagged replicates, for display next to the summaries
+    if "QC_outlier" not in df.columns:
+        return pd.DataFrame()
+    cols = [c for c in ID_COLUMNS if c in df.columns]
+    for m in metrics:
+        cols += [m, f"{m}_outlier_score"]
+    return df.loc[df["QC_outlier"], cols].reset_index(drop=True)
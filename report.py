@@ -0,0 +1,90 @@
+import base64
+import gzip
+import html
+import time
+
+# Offline interactive report: one HTML file, plotly.js embedded exactly once, all figure
+# JSON gzip'd together into one base64 blob that the page inflates with the browser's
+# DecompressionStream. Charts are drawn as they scroll into view, so a report with many
+# figures still opens quickly. No Kaleido/Chromium is involved.
+
+_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: system-ui, sans-serif; margin: 0 auto; max-width: 1200px; padding: 1rem 2rem; color: #222; }}
+nav a {{ margin-right: 1rem; }}
+.figure {{ min-height: 450px; margin-bottom: 2rem; }}
+.table {{ overflow-x: auto; max-height: 600px; margin-bottom: 2rem; }}
+table {{ border-collapse: collapse; font-size: 0.85rem; }}
+th, td {{ border: 1px solid #ddd; padding: 2px 6px; text-align: right; white-space: nowrap; }}
+th {{ background: #f4f4f4; position: sticky; top: 0; }}
+</style>
+<script>{plotly_js}</script>
+</head>
+<body>
+<h1>{title}</h1>
+<p>{subtitle}</p>
+<nav>{nav}</nav>
+{body}
+<script>
+(async function () {{
+  const bytes = Uint8Array.from(atob("{payload}"), c => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+  const figures = JSON.parse(await new Response(stream).text());
+  const draw = el => {{
+    const fig = figures[+el.dataset.index];
+    Plotly.newPlot(el, {{data: fig.data, layout: fig.layout, frames: fig.frames || [], config: {{responsive: true}}}});
+  }};
+  const observer = new IntersectionObserver(entries => entries.forEach(entry => {{
+    if (entry.isIntersecting) {{ observer.unobserve(entry.target); draw(entry.target); }}
+  }}), {{rootMargin: "400px"}});
+  document.querySelectorAll(".figure").forEach(el => observer.observe(el));
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+def figure_payload(figures):
+    # {name: fig} -> base64(gzip(JSON array)); compressing all figures together lets
+    # gzip share the repeated template/layout boilerplate between them
+    import plotly.io as pio
+
+    blob = "[" + ",".join(pio.to_json(fig, validate=False) for fig in figures.values()) + "]"
+    return base64.b64encode(gzip.compress(blob.encode(), compresslevel=6)).decode("ascii")
+
+
+def _anchor(prefix, name):
+    return prefix + "-" + "".join(c if c.isalnum() else "-" for c in str(name))
+
+
+def html_report(figures, tables=None, title="qPCR analysis report", subtitle=None, float_format="{:.3f}"):
+    # figures: {name: plotly figure}; tables: {name: DataFrame}. Returns the page as str.
+    from plotly.offline import get_plotlyjs
+
+    tables = tables or {}
+    nav, body = [], []
+
+    for name, df in tables.items():
+        anchor = _anchor("table", name)
+        nav.append(f'<a href="#{anchor}">{html.escape(name)}</a>')
+        table = df.to_html(index=False, na_rep="", float_format=float_format.format, border=0)
+        body.append(f'<h2 id="{anchor}">{html.escape(name)}</h2>\n<div class="table">{table}</div>')
+
+    for i, name in enumerate(figures):
+        anchor = _anchor("figure", name)
+        nav.append(f'<a href="#{anchor}">{html.escape(name)}</a>')
+        body.append(f'<h2 id="{anchor}">{html.escape(name)}</h2>\n<div class="figure" data-index="{i}"></div>')
+
+    return _PAGE.format(
+        title=html.escape(title),
+        subtitle=html.escape(subtitle or time.strftime("Generated %Y-%m-%d %H:%M")),
+        plotly_js=get_plotlyjs(),
+        nav="\n".join(nav),
+        body="\n".join(body),
+        payload=figure_payload(figures),
+    )
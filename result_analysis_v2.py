@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from formats import parse_pasted_9line
 
 def get_multiline_input(prompt=""):
     print(prompt)
@@ -28,31 +29,8 @@ def parse_pasted_qpcr(raw_text):
         print(f"⚠️ Warning: {len(lines)} lines found, not divisible by 9 (block size).")
         print("   The parser will proceed, but results may be misaligned.\n")
 
-    # Expected 9-column block
-    columns = [
-        "Sample Name",
-        "Well ID",
-        "Channel",
-        "Assay",
-        "Cq",
-        "Ampl.",
-        "Slope",
-        "Block",
-        "Classification"
-    ]
-
-    blocks = [lines[i:i+9] for i in range(0, len(lines), 9)]
-    df = pd.DataFrame(blocks, columns=columns)
-
-    # Convert numeric
-    for col in ["Cq", "Ampl.", "Slope"]:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # CH3 inherits sample name + well ID from preceding CH2
-    for i in range(len(df)):
-        if df.loc[i, "Channel"] == "CH3":
-            df.loc[i, "Sample Name"] = df.loc[i-1, "Sample Name"]
-            df.loc[i, "Well ID"] = df.loc[i-1, "Well ID"]
+    # 9-line blocks -> typed frame; CH3 inherits sample name + well ID from preceding CH2
+    df = parse_pasted_9line(raw_text)
 
     # Detection calculations
     df["Detection_bool"] = df["Classification"].str.upper() == "POSITIVE"
@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-from openpyxl import load_workbook
 
 # ---------------------------------------------------------
 # 1. Load Excel file
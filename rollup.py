@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+# Rollup cube over replicate data. One grouped pass builds mergeable partial aggregates
+# (count, sum, sum of squares per measure, plus row and POSITIVE counts) at the finest
+# grain; every coarser level is a plain sum of those partials, so serving a rollup never
+# touches the replicates again. Sums are taken around a per-measure shift (the overall
+# mean) to keep the sum-of-squares variance numerically stable.
+#
+# Grouping is by integer codes: each dimension is factorized once, the codes are combined
+# into one group code (mixed radix), and all partials are summed in one groupby on that
+# code. Any ordered list of dimensions costs the same single pass.
+
+DIMENSIONS = [
+    "Experiment_ID", "Experiment_Name", "Device", "Source_File", "Channel", "Assay",
+    "Sample_Name", "Loaded", "Concentration", "Condition",
+]
+MEASURES = ["Cq", "Ampl.", "Slope"]
+# Short names accepted wherever a list of dimensions is
+ALIASES = {"Experiment": "Experiment_ID", "Sample": "Sample_Name", "Sample Name": "Sample_Name"}
+
+
+def with_derived(df):
+    # Concentration / Condition come from "concentration_condition" Loaded labels;
+    # multi-experiment exports spell the sample column "Sample Name"
+    if "Sample Name" in df.columns and "Sample_Name" not in df.columns:
+        df = df.assign(Sample_Name=df["Sample Name"])
+    if "Loaded" not in df.columns or ("Concentration" in df.columns and "Condition" in df.columns):
+        return df
+    # Split the distinct labels only, then broadcast by code
+    codes, labels = pd.factorize(df["Loaded"], use_na_sentinel=False)
+    parts = pd.Series(labels.astype(str)).str.split("_")
+    return df.assign(
+        Concentration=parts.str[0].to_numpy()[codes], Condition=parts.str[1].to_numpy()[codes]
+    )
+
+
+def resolve(dims):
+    return tuple(ALIASES.get(d, d) for d in dims)
+
+
+def encode(df, dims):
+    # Ordered dims -> (group code per row, first row of each group). Codes follow the
+    # sort order of the dimension values (NaN last), like groupby(sort=True, dropna=False).
+    codes = np.zeros(len(df), dtype=np.int64)
+    for d in dims:
+        dim_codes, uniques = pd.factorize(df[d], sort=True, use_na_sentinel=False)
+        radix = max(len(uniques), 1)
+        if int(codes.max(initial=0)) + 1 > np.iinfo(np.int64).max // radix:
+            # Too many combinations for one int64: compact the codes seen so far
+            codes = np.unique(codes, return_inverse=True)[1].astype(np.int64)
+        codes = codes * radix + dim_codes
+    if not dims:
+        return codes, np.zeros(min(len(df), 1), dtype=np.int64)
+    _, first, codes = np.unique(codes, return_index=True, return_inverse=True)
+    return codes.astype(np.int64).reshape(-1), first
+
+
+def _group_sums(df, dims, columns):
+    # columns: {name: numeric array} -> one row per group of dims with the summed columns
+    # (grouping on the single code keeps pandas' compensated summation, which the
+    # sum-of-squares variance needs when a group's values are all equal)
+    codes, first = encode(df, dims)
+    out = df[list(dims)].iloc[first].reset_index(drop=True)
+    sums = pd.DataFrame(columns).groupby(codes, sort=True).sum()
+    for name in columns:
+        out[name] = sums[name].to_numpy()
+    return out
+
+
+def _partial_columns(measures):
+    cols = []
+    for m in measures:
+        cols += [f"{m}_n", f"{m}_sum", f"{m}_sumsq"]
+    return cols + ["N_rows", "Positives"]
+
+
+def partials(df, dims, measures=MEASURES, shifts=None):
+    shifts = shifts or {}
+    work = {}
+    for m in measures:
+        x = pd.to_numeric(df[m], errors="coerce").to_numpy(dtype=float) - shifts.get(m, 0.0)
+        valid = ~np.isnan(x)
+        x = np.where(valid, x, 0.0)
+        work[f"{m}_n"] = valid.astype(np.int64)
+        work[f"{m}_sum"] = x
+        work[f"{m}_sumsq"] = x * x
+    work["N_rows"] = np.ones(len(df), dtype=np.int64)
+    work["Positives"] = (df["Classification"] == "POSITIVE").to_numpy().astype(np.int64)
+    return _group_sums(df, dims, work)
+
+
+def _rollup(base, dims, measures):
+    return _group_sums(base, dims, {c: base[c].to_numpy() for c in _partial_columns(measures)})
+
+
+def finalize(partial, dims, measures=MEASURES, shifts=None):
+    # Partials -> mean / std (ddof=1, like pandas) / n per measure + detection %
+    shifts = shifts or {}
+    out = partial[list(dims)].copy()
+    for m in measures:
+        n = partial[f"{m}_n"].to_numpy(dtype=float)
+        s = partial[f"{m}_sum"].to_numpy()
+        ss = partial[f"{m}_sumsq"].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = s / n
+            var = np.maximum(ss - s * mean, 0.0) / (n - 1)
+        out[f"{m}_mean"] = np.where(n > 0, mean + shifts.get(m, 0.0), np.nan)
+        out[f"{m}_std"] = np.where(n > 1, np.sqrt(var), np.nan)
+        out[f"{m}_n"] = partial[f"{m}_n"].to_numpy()
+    out["N_rows"] = partial["N_rows"].to_numpy()
+    out["Positives"] = partial["Positives"].to_numpy()
+    out["Detection_%"] = 100 * out["Positives"] / out["N_rows"]
+    return out
+
+
+class RollupCube:
+    def __init__(self, df, levels=(), measures=MEASURES, dims=None):
+        # dims: base grain (default: every known dimension present in df); levels may
+        # group by any ordered subset of it
+        df = with_derived(df)
+        self.measures = [m for m in measures if m in df.columns]
+        self.dims = [d for d in (resolve(dims) if dims else DIMENSIONS) if d in df.columns]
+        self.shifts = {}
+        for m in self.measures:
+            mean = pd.to_numeric(df[m], errors="coerce").mean()
+            self.shifts[m] = 0.0 if pd.isna(mean) else float(mean)
+        self.base = partials(df, self.dims, self.measures, self.shifts)
+        self.levels = {}
+        for level in levels:
+            self.materialize(level)
+
+    def _check(self, dims):
+        dims = resolve(dims)
+        missing = [d for d in dims if d not in self.dims]
+        if missing:
+            raise KeyError(f"Not a cube dimension: {missing}")
+        return tuple(dims)
+
+    def materialize(self, dims):
+        dims = self._check(dims)
+        if dims not in self.levels:
+            self.levels[dims] = _rollup(self.base, dims, self.measures)
+        return self.levels[dims]
+
+    def partial(self, dims):
+        # Materialized level if present, else summed from the base partials on the fly
+        dims = self._check(dims)
+        return self.levels[dims] if dims in self.levels else _rollup(self.base, dims, self.measures)
+
+    def summary(self, dims):
+        return finalize(self.partial(dims), dims, self.measures, self.shifts)
+
+    def merge(self, other):
+        # Combine two cubes (e.g. a new export appended to an archive); partials are
+        # re-centred onto this cube's shifts, then summed at the shared base grain
+        if self.dims != other.dims or self.measures != other.measures:
+            raise ValueError("Cubes have different dimensions or measures")
+        moved = other.base.copy()
+        for m in self.measures:
+            d = other.shifts[m] - self.shifts[m]
+            n, s = moved[f"{m}_n"], moved[f"{m}_sum"]
+            moved[f"{m}_sumsq"] = moved[f"{m}_sumsq"] + 2 * d * s + n * d * d
+            moved[f"{m}_sum"] = s + n * d
+
+        merged = object.__new__(RollupCube)
+        merged.measures, merged.dims, merged.shifts = self.measures, self.dims, dict(self.shifts)
+        merged.base = _rollup(pd.concat([self.base, moved], ignore_index=True), self.dims, self.measures)
+        merged.levels = {}
+        for level in self.levels:
+            merged.materialize(level)
+        return merged
+
+
+def summarize(df, dims, measures=MEASURES):
+    # One-off summary by an arbitrary ordered list of dimensions, straight from the
+    # replicates (no cube): mean / std / n per measure, N_rows, Positives, Detection_%
+    df = with_derived(df)
+    dims = resolve(dims)
+    missing = [d for d in dims if d not in df.columns]
+    if missing:
+        raise KeyError(f"Not a column: {missing}")
+    measures = [m for m in measures if m in df.columns]
+    shifts = {}
+    for m in measures:
+        mean = pd.to_numeric(df[m], errors="coerce").mean()
+        shifts[m] = 0.0 if pd.isna(mean) else float(mean)
+    return finalize(partials(df, dims, measures, shifts), dims, measures, shifts)
@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+import zipfile
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import orjson
+import pandas as pd
+import tornado.web
+from tornado.ioloop import IOLoop
+from tornado.log import app_log
+
+from analysis_v6 import run_analysis
+from dedup import DedupIndex, ingest_multi
+from formats import load
+from metrics import CACHE_ENTRIES, CACHE_REQUESTS, CONTENT_TYPE, REGISTRY
+from multi_experiment import summarize_multi_experiment
+from validation import validate_multi, validate_pod
+
+# Headless HTTP wrapper around the analysis pipeline for LIMS integration.
+#
+#   POST /analyze        single-pod export; layout as form field / query arg "layout"
+#   POST /analyze/multi  multi-experiment export (ID:/Name:/Device: blocks)
+#   GET  /health         queue depth, cache size
+#   GET  /metrics        Prometheus text: request latency, cache hits, queue depth
+#
+# The workbook is sent either as the raw request body or as multipart field "file".
+# ?format=json (default) returns summary JSON, ?format=bundle a ZIP with the
+# summary tables, full data and the validation report as XLSX. JSON responses carry the
+# validation report (one record per violated rule) under "validation". Repeated or
+# conflicting experiments within a multi-experiment upload are listed under "duplicates"
+# (bundle: Duplicates sheet), so the same request always gets the same answer. Dedup across
+# requests is opt-in: with ?session=<name>, experiments ingested by earlier requests of that
+# session are skipped too (the session's state is part of the cache key, and its requests
+# run one at a time). An upload with nothing new is rejected (422). Unreadable or malformed
+# uploads get 422, internal failures 500.
+
+
+REQUEST_SECONDS = REGISTRY.histogram("qpcr_request_seconds", "Service request latency", ["endpoint", "status", "cache"])
+QUEUE_DEPTH = REGISTRY.gauge("qpcr_service_queue_depth", "Requests running or waiting in the worker pool")
+REJECTED = REGISTRY.counter("qpcr_service_rejected_total", "Requests rejected with 503 (queue full)")
+# Raised by load / parsing / analysis for bad uploads (FormatError is a ValueError) -> 422;
+# anything else is an internal error -> 500
+INPUT_ERRORS = (ValueError, KeyError, zipfile.BadZipFile)
+
+
+def _records(df):
+    return df.to_dict(orient="records")
+
+
+def _bundle(sheets):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+        xlsx = BytesIO()
+        with pd.ExcelWriter(xlsx, engine="openpyxl") as writer:
+            for name, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=name, index=False)
+        zipf.writestr("qPCR_analysis.xlsx", xlsx.getvalue())
+        for name, frame in sheets.items():
+            zipf.writestr(f"{name}.csv", frame.to_csv(index=False))
+    return buffer.getvalue()
+
+
+def analyze_pod(file_bytes, layout_lines, fmt):
+    # Runs in a worker process; returns the encoded response body
+    _, df = load(file_bytes, expect="single_pod")
+    full_df, ch2, ch3, flat_ch2, flat_ch3 = run_analysis(df, layout_lines)
+    validation = validate_pod(full_df)
+    if fmt == "bundle":
+        return _bundle({"CH2_summary": flat_ch2, "CH3_summary": flat_ch3, "Full_Data": full_df, "Validation": validation})
+    return orjson.dumps(
+        {
+            "kind": "pod",
+            "rows": len(full_df),
+            "summary": {"CH2": _records(flat_ch2), "CH3": _records(flat_ch3)},
+            "validation": _records(validation),
+        },
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        default=str,
+    )
+
+
+def analyze_multi(file_bytes, fmt, known=None, name="upload"):
+    # known: {Experiment_ID: (block digest, source)} already ingested by the session, if any.
+    # Runs in a worker process -> (body, newly ingested experiments)
+    index = DedupIndex(experiments=known)
+    df_multi, duplicates = ingest_multi([(name, file_bytes)], index=index)
+    if df_multi.empty:
+        raise ValueError("No new experiments in this upload")
+    ingested = {k: v for k, v in index.experiments.items() if k not in (known or {})}
+    validation = validate_multi(df_multi)
+    combined_summary = summarize_multi_experiment(df_multi)
+    if fmt == "bundle":
+        return _bundle({
+            "Summary": combined_summary, "Full_Data": df_multi, "Validation": validation, "Duplicates": duplicates,
+        }), ingested
+    return orjson.dumps(
+        {
+            "kind": "multi",
+            "rows": len(df_multi),
+            "experiments": sorted(df_multi["Experiment_ID"].unique().tolist()),
+            "summary": _records(combined_summary),
+            "validation": _records(validation),
+            "duplicates": _records(duplicates),
+        },
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        default=str,
+    ), ingested
+
+
+class QueueFull(Exception):
+    pass
+
+
+# A dedup session: experiments ingested so far and the lock its requests take turns on
+Session = namedtuple("Session", "dedup lock")
+
+
+class AnalysisService:
+    # Bounded worker pool + admission control + content-hash result cache.
+    # Identical requests that arrive while one is running share its future.
+
+    def __init__(self, workers=None, max_queue=16, cache_size=128, max_sessions=1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.max_queue = max_queue
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        # Dedup sessions (?session=), least recently used dropped first; only IDs and block
+        # digests are kept here, workers get a copy and report back what they added
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        REGISTRY.register_callback(self._collect)
+
+    def _collect(self):
+        QUEUE_DEPTH.set(self.depth)
+        CACHE_ENTRIES.set(len(self.cache), cache="service")
+
+    @property
+    def depth(self):
+        return len(self.inflight)
+
+    def session(self, name):
+        if name in self.sessions:
+            self.sessions.move_to_end(name)
+        else:
+            self.sessions[name] = Session(DedupIndex(), asyncio.Lock())
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        return self.sessions[name]
+
+    async def run(self, key, fn, *args):
+        kind = fn.__name__
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="service", stage=kind, result="hit")
+            return self.cache[key], True
+
+        if key in self.inflight:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="service", stage=kind, result="hit")
+            return await asyncio.shield(self.inflight[key]), True
+
+        # Backpressure: at most `workers` running plus `max_queue` waiting
+        if self.depth >= self.workers + self.max_queue:
+            self.rejected += 1
+            REJECTED.inc()
+            raise QueueFull()
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="service", stage=kind, result="miss")
+        future = asyncio.ensure_future(IOLoop.current().run_in_executor(self.pool, fn, *args))
+        self.inflight[key] = future
+        try:
+            body = await future
+        finally:
+            self.inflight.pop(key, None)
+
+        self.cache[key] = body
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return body, False
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": self.depth,
+            "max_queue": self.max_queue,
+            "cache_entries": len(self.cache),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "rejected": self.rejected,
+            "dedup_sessions": len(self.sessions),
+            "experiments_ingested": sum(len(s.dedup.experiments) for s in self.sessions.values()),
+        }
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    @property
+    def service(self):
+        return self.settings["service"]
+
+    def upload(self):
+        files = self.request.files.get("file")
+        body = files[0]["body"] if files else self.request.body
+        if not body:
+            raise tornado.web.HTTPError(400, reason="Empty upload")
+        return body
+
+    def output_format(self):
+        fmt = self.get_argument("format", "json")
+        if fmt not in ("json", "bundle"):
+            raise tornado.web.HTTPError(400, reason="format must be json or bundle")
+        return fmt
+
+    async def respond(self, key, fn, *args, fmt="json", on_result=None):
+        # on_result: maps the (possibly cached) worker result to the response body
+        t0 = time.perf_counter()
+        endpoint = self.request.path
+        try:
+            body, cached = await self.service.run(key, fn, *args)
+            if on_result is not None:
+                body = on_result(body)
+        except QueueFull:
+            self.set_status(503)
+            self.set_header("Retry-After", "1")
+            self.finish({"error": "queue full", "queue_depth": self.service.depth})
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint=endpoint, status=503, cache="")
+            return
+        except INPUT_ERRORS as exc:
+            # The upload couldn't be read or analyzed as sent
+            self.set_status(422)
+            self.finish({"error": f"{type(exc).__name__}: {exc}"})
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint=endpoint, status=422, cache="")
+            return
+        except Exception as exc:
+            # Broken worker pool or a bug: not the client's fault
+            app_log.error("%s failed", fn.__name__, exc_info=exc)
+            self.set_status(500)
+            self.finish({"error": f"internal error: {type(exc).__name__}"})
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint=endpoint, status=500, cache="")
+            return
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - t0, endpoint=endpoint, status=200, cache="hit" if cached else "miss"
+        )
+
+        self.set_header("X-Content-Hash", key)
+        self.set_header("X-Cache", "hit" if cached else "miss")
+        self.set_header("X-Elapsed", f"{time.perf_counter() - t0:.4f}")
+        if fmt == "bundle":
+            self.set_header("Content-Type", "application/zip")
+            self.set_header("Content-Disposition", "attachment; filename=qPCR_results.zip")
+        else:
+            self.set_header("Content-Type", "application/json")
+        self.finish(body)
+
+
+class PodHandler(BaseHandler):
+    async def post(self):
+        body = self.upload()
+        layout = self.get_argument("layout", "").strip()
+        if not layout:
+            raise tornado.web.HTTPError(400, reason="Missing layout")
+        fmt = self.output_format()
+        key = hashlib.sha256(b"pod\0" + fmt.encode() + b"\0" + layout.encode() + b"\0" + body).hexdigest()
+        await self.respond(key, analyze_pod, body, layout.splitlines(), fmt, fmt=fmt)
+
+
+class MultiHandler(BaseHandler):
+    async def post(self):
+        body = self.upload()
+        fmt = self.output_format()
+        name = self.get_argument("session", "").strip()
+        if not name:
+            key = hashlib.sha256(b"multi\0" + fmt.encode() + b"\0" + body).hexdigest()
+            await self.respond(key, analyze_multi, body, fmt, None, f"upload {key[:12]}", fmt=fmt,
+                               on_result=lambda result: result[0])
+            return
+
+        session = self.service.session(name)
+
+        def ingested(result):
+            for experiment_id, entry in result[1].items():
+                session.dedup.experiments.setdefault(experiment_id, entry)
+            return result[0]
+
+        # One request per session at a time, keyed by what the session has ingested so far
+        async with session.lock:
+            known = dict(session.dedup.experiments)
+            state = orjson.dumps(sorted(known.items()))
+            key = hashlib.sha256(
+                b"multi\0" + fmt.encode() + b"\0" + name.encode() + b"\0" + state + b"\0" + body
+            ).hexdigest()
+            await self.respond(key, analyze_multi, body, fmt, known, f"upload {key[:12]}", fmt=fmt,
+                               on_result=ingested)
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.finish(self.service.stats())
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header("Content-Type", CONTENT_TYPE)
+        self.finish(REGISTRY.render())
+
+
+def make_app(service):
+    return tornado.web.Application(
+        [
+            (r"/analyze", PodHandler),
+            (r"/analyze/multi", MultiHandler),
+            (r"/health", HealthHandler),
+            (r"/metrics", MetricsHandler),
+        ],
+        service=service,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless qPCR analysis service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--cache-size", type=int, default=128)
+    parser.add_argument("--max-sessions", type=int, default=1024, help="dedup sessions kept (?session=)")
+    args = parser.parse_args()
+
+    service = AnalysisService(
+        workers=args.workers, max_queue=args.max_queue, cache_size=args.cache_size, max_sessions=args.max_sessions,
+    )
+    app = make_app(service)
+    app.listen(args.port, address=args.host, max_body_size=200 * 2**20)
+    print(f"Analysis service on http://{args.host}:{args.port} ({service.workers} workers)")
+    IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import json
+import time
+from collections.abc import Mapping
+from io import BytesIO
+from pathlib import Path
+
+
+# Saved analyses: processed frames, figure specs and small metadata (layouts, QC options)
+# in one file. Every part is a zstd Parquet segment; a JSON manifest at the front records
+# where each segment lives, so opening a snapshot memory-maps the file and decodes only
+# the segments that are asked for. Figures are rebuilt from their JSON on first access.
+#
+#   MAGIC | manifest length (8 bytes LE) | manifest JSON | segment | segment | ...
+
+MAGIC = b"QPCRSNAP1\n"
+EXTENSION = ".qpcr"
+COMPRESSION = "zstd"
+FIGURES = "__figures__"
+
+
+def _arrow_table(df):
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns (numbers and text in one column) are stored as text
+        mixed = {c: df[c].astype("string") for c in df.columns if df[c].dtype == object}
+        return pa.Table.from_pandas(df.assign(**mixed))
+
+
+def _segment(table):
+    import pyarrow.parquet as pq
+
+    sink = BytesIO()
+    pq.write_table(table, sink, compression=COMPRESSION)
+    return sink.getvalue()
+
+
+def save_snapshot(frames, figures=None, meta=None):
+    # frames: {name: DataFrame}; figures: {name: plotly Figure}; meta: JSON-serializable
+    # dict -> snapshot file contents (bytes)
+    import pyarrow as pa
+
+    segments = {name: _segment(_arrow_table(df)) for name, df in frames.items() if df is not None}
+    if figures:
+        segments[FIGURES] = _segment(pa.table({
+            "name": list(figures), "json": [fig.to_json() for fig in figures.values()],
+        }))
+
+    offset, index = 0, {}
+    for name, data in segments.items():
+        index[name] = [offset, len(data)]
+        offset += len(data)
+    manifest = json.dumps({"created": time.time(), "segments": index, "meta": meta or {}}).encode()
+
+    out = BytesIO()
+    out.write(MAGIC)
+    out.write(len(manifest).to_bytes(8, "little"))
+    out.write(manifest)
+    for data in segments.values():
+        out.write(data)
+    return out.getvalue()
+
+
+def write_snapshot(path, *args, **kwargs):
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(save_snapshot(*args, **kwargs))
+    tmp.replace(path)
+    return path
+
+
+class _Figures(Mapping):
+    # Figure JSON is parsed into plotly objects only when a figure is used
+    def __init__(self, table):
+        self._json = dict(zip(table.column("name").to_pylist(), table.column("json").to_pylist())) if table else {}
+        self._figures = {}
+
+    def __getitem__(self, name):
+        if name not in self._figures:
+            import plotly.io as pio
+            self._figures[name] = pio.from_json(self._json[name])
+        return self._figures[name]
+
+    def __iter__(self):
+        return iter(self._json)
+
+    def __len__(self):
+        return len(self._json)
+
+
+class Snapshot:
+    def __init__(self, source):
+        # source: path (memory-mapped) or bytes-like (e.g. an uploaded file's contents)
+        import pyarrow as pa
+
+        if isinstance(source, (str, Path)):
+            self.buffer = pa.memory_map(str(source), "r").read_buffer()
+        else:
+            self.buffer = pa.py_buffer(source)
+        if self.buffer.size < len(MAGIC) + 8 or self.buffer.slice(0, len(MAGIC)).to_pybytes() != MAGIC:
+            raise ValueError("Not a saved analysis file")
+        size = int.from_bytes(self.buffer.slice(len(MAGIC), 8).to_pybytes(), "little")
+        start = len(MAGIC) + 8
+        manifest = json.loads(self.buffer.slice(start, size).to_pybytes())
+        self.created = manifest["created"]
+        self.meta = manifest["meta"]
+        self._data_start = start + size
+        self._segments = manifest["segments"]
+        self._frames = {}
+        self._figures = None
+
+    def _table(self, name):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        offset, length = self._segments[name]
+        return pq.read_table(pa.BufferReader(self.buffer.slice(self._data_start + offset, length)))
+
+    @property
+    def names(self):
+        return [n for n in self._segments if n != FIGURES]
+
+    def frame(self, name):
+        if name not in self._frames:
+            self._frames[name] = self._table(name).to_pandas()
+        return self._frames[name]
+
+    def frames(self):
+        return {name: self.frame(name) for name in self.names}
+
+    @property
+    def figures(self):
+        if self._figures is None:
+            self._figures = _Figures(self._table(FIGURES) if FIGURES in self._segments else None)
+        return self._figures
+
+
+def open_snapshot(source):
+    return Snapshot(source)
@@ -0,0 +1,390 @@
+import base64
+import html
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# In-process PNG/SVG renderer for the standard summary plots (box, bar, text/marker
+# scatter on one categorical x axis). It reads the plotly figure objects the apps already
+# build, so it is a drop-in for fig.write_image without Kaleido or Chromium. PNG output
+# needs Pillow; SVG is plain text. Figures with other trace types raise
+# UnsupportedFigure so callers can fall back to Kaleido, as do subplots / facets (more
+# than one x or y axis) and annotations other than plain text at data coordinates.
+
+RENDERERS = ["builtin", "kaleido"]
+
+WIDTH, HEIGHT = 700, 500
+PALETTE = ["#636efa", "#EF553B", "#00cc96", "#ab63fa", "#FFA15A", "#19d3f3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52"]
+GRID = "#ebf0f8"
+AXIS = "#444444"
+FONT = 12
+
+
+class UnsupportedFigure(ValueError):
+    pass
+
+
+def _rgb(color):
+    color = str(color).strip()
+    if color.startswith("#"):
+        h = color[1:]
+        if len(h) == 3:
+            h = "".join(c * 2 for c in h)
+        return tuple(int(h[i:i + 2], 16) for i in (0, 2, 4))
+    if color.startswith("rgb"):
+        parts = color[color.index("(") + 1:color.index(")")].split(",")
+        return tuple(int(float(p)) for p in parts[:3])
+    from PIL import ImageColor
+    return ImageColor.getrgb(color)[:3]
+
+
+def _tint(color, amount):
+    # Blend toward white (box fills are drawn opaque)
+    r, g, b = _rgb(color)
+    return "#%02x%02x%02x" % tuple(int(c + (255 - c) * amount) for c in (r, g, b))
+
+
+def _nice_ticks(lo, hi, n=6):
+    if not np.isfinite(lo) or not np.isfinite(hi) or hi <= lo:
+        return [lo]
+    raw = (hi - lo) / n
+    mag = 10 ** math.floor(math.log10(raw))
+    step = min((m * mag for m in (1, 2, 2.5, 5, 10) if m * mag >= raw), default=10 * mag)
+    start = math.ceil(lo / step) * step
+    return [round(start + i * step, 10) for i in range(int((hi - start) / step + 1e-9) + 1)]
+
+
+def _fmt_tick(v):
+    return f"{v:g}"
+
+
+def _apply_template(template, y, text=None):
+    # Enough of plotly's texttemplate for "%{y:.1f}%" / "%{text}" labels
+    if not template:
+        return "" if text is None else str(text)
+    out = template
+    while "%{" in out:
+        start = out.index("%{")
+        end = out.index("}", start)
+        field, _, spec = out[start + 2:end].partition(":")
+        value = y if field == "y" else text if field == "text" else ""
+        try:
+            rendered = format(value, spec) if spec else str(value)
+        except (TypeError, ValueError):
+            rendered = str(value)
+        out = out[:start] + rendered + out[end + 1:]
+    return out
+
+
+class SvgCanvas:
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.parts = [f'<rect width="{width}" height="{height}" fill="white"/>']
+
+    def rect(self, x0, y0, x1, y1, fill=None, stroke=None, width=1):
+        x, y = min(x0, x1), min(y0, y1)
+        self.parts.append(
+            f'<rect x="{x:.1f}" y="{y:.1f}" width="{abs(x1 - x0):.1f}" height="{abs(y1 - y0):.1f}" '
+            f'fill="{fill or "none"}" stroke="{stroke or "none"}" stroke-width="{width}"/>'
+        )
+
+    def line(self, points, color, width=1):
+        pts = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+        self.parts.append(f'<polyline points="{pts}" fill="none" stroke="{color}" stroke-width="{width}"/>')
+
+    def circles(self, xs, ys, r, fill):
+        self.parts.extend(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{r}" fill="{fill}"/>' for x, y in zip(xs, ys))
+
+    def text(self, x, y, s, size=FONT, color=AXIS, anchor="mm", rotate=0):
+        h = {"l": "start", "m": "middle", "r": "end"}[anchor[0]]
+        v = {"t": "hanging", "m": "central", "b": "alphabetic"}[anchor[1]]
+        rot = f' transform="rotate({rotate} {x:.1f} {y:.1f})"' if rotate else ""
+        self.parts.append(
+            f'<text x="{x:.1f}" y="{y:.1f}" font-family="Arial, sans-serif" font-size="{size}" fill="{color}" '
+            f'text-anchor="{h}" dominant-baseline="{v}"{rot}>{html.escape(str(s))}</text>'
+        )
+
+    def to_bytes(self):
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+            f'viewBox="0 0 {self.width} {self.height}">' + "".join(self.parts) + "</svg>"
+        ).encode()
+
+
+@lru_cache(maxsize=32)
+def _font(size):
+    from PIL import ImageFont
+    return ImageFont.load_default(size=size)
+
+
+class PngCanvas:
+    def __init__(self, width, height, scale=1):
+        from PIL import Image, ImageDraw
+
+        self.scale = scale
+        self.image = Image.new("RGB", (int(width * scale), int(height * scale)), "white")
+        self.draw = ImageDraw.Draw(self.image)
+
+    def rect(self, x0, y0, x1, y1, fill=None, stroke=None, width=1):
+        s = self.scale
+        box = [min(x0, x1) * s, min(y0, y1) * s, max(x0, x1) * s, max(y0, y1) * s]
+        self.draw.rectangle(box, fill=fill, outline=stroke, width=max(1, round(width * s)) if stroke else 0)
+
+    def line(self, points, color, width=1):
+        s = self.scale
+        self.draw.line([(x * s, y * s) for x, y in points], fill=color, width=max(1, round(width * s)))
+
+    def circles(self, xs, ys, r, fill):
+        s = self.scale
+        for x, y in zip(xs, ys):
+            self.draw.ellipse([(x - r) * s, (y - r) * s, (x + r) * s, (y + r) * s], fill=fill)
+
+    def text(self, x, y, s, size=FONT, color=AXIS, anchor="mm", rotate=0):
+        font = _font(max(1, round(size * self.scale)))
+        if not rotate:
+            self.draw.text((x * self.scale, y * self.scale), str(s), fill=color, font=font, anchor=anchor)
+            return
+        from PIL import Image, ImageDraw
+
+        left, top, right, bottom = font.getbbox(str(s))
+        tile = Image.new("RGBA", (right - left + 2, bottom - top + 2), (255, 255, 255, 0))
+        ImageDraw.Draw(tile).text((-left + 1, -top + 1), str(s), fill=color, font=font)
+        tile = tile.rotate(-rotate, expand=True)
+        self.image.paste(tile, (int(x * self.scale - tile.width / 2), int(y * self.scale - tile.height / 2)), tile)
+
+    def to_bytes(self):
+        from io import BytesIO
+
+        buf = BytesIO()
+        self.image.save(buf, format="PNG", compress_level=1)
+        return buf.getvalue()
+
+
+def _categories(fig):
+    xaxis = fig.layout.xaxis
+    if xaxis.categoryorder == "array" and xaxis.categoryarray is not None:
+        cats = [str(c) for c in xaxis.categoryarray]
+    else:
+        cats = []
+    seen = set(cats)
+    for trace in fig.data:
+        for x in [] if trace.x is None else trace.x:
+            if str(x) not in seen:
+                seen.add(str(x))
+                cats.append(str(x))
+    return cats
+
+
+def _box_stats(y):
+    # Plotly's defaults: linear quartiles, whiskers to the furthest point within 1.5 IQR
+    q1, med, q3 = np.percentile(y, [25, 50, 75])
+    iqr = q3 - q1
+    inside = y[(y >= q1 - 1.5 * iqr) & (y <= q3 + 1.5 * iqr)]
+    return q1, med, q3, inside.min(), inside.max()
+
+
+def _typed_array(value):
+    # Figures rebuilt from JSON or unpickled (saved analyses, worker processes) carry
+    # numeric arrays as plotly's base64 typed-array dicts
+    if isinstance(value, dict) and "bdata" in value:
+        data = np.frombuffer(base64.b64decode(value["bdata"]), dtype=value["dtype"])
+        shape = value.get("shape")
+        return data.reshape([int(n) for n in str(shape).split(",")]) if shape else data
+    return value
+
+
+def _check(fig):
+    # Raises UnsupportedFigure for anything render() would draw wrongly
+    for trace in fig.data:
+        if trace.type not in ("box", "bar", "scatter") or getattr(trace, "orientation", None) == "h":
+            raise UnsupportedFigure(f"Trace type {trace.type!r} is not supported by the builtin renderer")
+        if trace.xaxis not in (None, "x") or trace.yaxis not in (None, "y"):
+            raise UnsupportedFigure("Subplots / facets are not supported by the builtin renderer")
+    axes = [k for k in fig.layout.to_plotly_json() if k.startswith(("xaxis", "yaxis"))]
+    if any(k not in ("xaxis", "yaxis") for k in axes):
+        raise UnsupportedFigure("Subplots / facets are not supported by the builtin renderer")
+    for note in fig.layout.annotations:
+        if note.xref not in (None, "x") or note.yref not in (None, "y") or note.showarrow is not False:
+            raise UnsupportedFigure("Only text annotations at data coordinates are supported by the builtin renderer")
+
+
+def render(fig, fmt="png", width=WIDTH, height=HEIGHT, scale=1):
+    _check(fig)
+    typed = [(i, attr) for i, trace in enumerate(fig.data) for attr in ("x", "y", "text") if isinstance(trace[attr], dict)]
+    if typed:
+        # Decoded on a copy; the caller's figure is left as it was
+        import plotly.graph_objects as go
+
+        fig = go.Figure(fig)
+        for i, attr in typed:
+            fig.data[i][attr] = _typed_array(fig.data[i][attr])
+
+    canvas = PngCanvas(width, height, scale) if fmt == "png" else SvgCanvas(width, height)
+    layout = fig.layout
+    cats = _categories(fig)
+    index = {c: i for i, c in enumerate(cats)}
+
+    named = [t for t in fig.data if t.name and t.showlegend is not False]
+    show_legend = layout.showlegend is not False and len(named) > 1
+    left, right, top, bottom = 70, width - (150 if show_legend else 30), 60, height - 80
+
+    # ---- y range ----
+    if layout.yaxis.range is not None:
+        y_lo, y_hi = layout.yaxis.range
+    else:
+        ys = [np.asarray(t.y, dtype=float) for t in fig.data if t.y is not None]
+        bars = [t for t in fig.data if t.type == "bar" and t.y is not None]
+        if bars:
+            ys.append(np.array([0.0]))
+        if bars and layout.barmode in ("relative", "stack"):
+            totals = {}
+            for t in bars:
+                for x, y in zip(t.x, np.asarray(t.y, dtype=float)):
+                    totals[str(x)] = totals.get(str(x), 0.0) + np.nan_to_num(y)
+            ys.append(np.array(list(totals.values())))
+        allv = np.concatenate(ys) if ys else np.array([0.0, 1.0])
+        allv = allv[np.isfinite(allv)]
+        y_lo, y_hi = (allv.min(), allv.max()) if len(allv) else (0.0, 1.0)
+        pad = (y_hi - y_lo) * 0.05 or 1.0
+        y_lo, y_hi = y_lo - pad, y_hi + pad
+
+    def py(v):
+        return bottom - (np.asarray(v, dtype=float) - y_lo) / (y_hi - y_lo) * (bottom - top)
+
+    band = (right - left) / max(len(cats), 1)
+
+    def px_(cat):
+        return left + (index[str(cat)] + 0.5) * band
+
+    # ---- grid + axes ----
+    for tick in _nice_ticks(y_lo, y_hi):
+        y = float(py(tick))
+        canvas.line([(left, y), (right, y)], GRID)
+        canvas.text(left - 6, y, _fmt_tick(tick), anchor="rm")
+    canvas.line([(left, bottom), (right, bottom)], AXIS)
+    rotate = 45 if band < 60 else 0
+    for cat in cats:
+        label = cat if len(cat) <= 18 else cat[:17] + "…"
+        if rotate:
+            canvas.text(px_(cat) - 10, bottom + 24, label, anchor="mm", rotate=rotate)
+        else:
+            canvas.text(px_(cat), bottom + 14, label, anchor="mm")
+
+    title = layout.title.text if layout.title and layout.title.text else ""
+    canvas.text(left, 28, title, size=17, anchor="lm")
+    x_title = layout.xaxis.title.text if layout.xaxis.title and layout.xaxis.title.text else ""
+    y_title = layout.yaxis.title.text if layout.yaxis.title and layout.yaxis.title.text else ""
+    canvas.text((left + right) / 2, height - 18, x_title, size=14)
+    canvas.text(22, (top + bottom) / 2, y_title, size=14, rotate=-90)
+
+    # ---- slots for grouped boxes/bars ----
+    grouped = [
+        t for t in fig.data
+        if (t.type == "box" and layout.boxmode == "group") or (t.type == "bar" and layout.barmode == "group")
+    ]
+    groups = list(dict.fromkeys((t.offsetgroup or t.name or str(i)) for i, t in enumerate(grouped)))
+    n_slots = max(len(groups), 1)
+
+    def slot(trace, i):
+        if trace not in grouped:
+            return 0.0, band * 0.8
+        k = groups.index(trace.offsetgroup or trace.name or str(i))
+        w = band * 0.8 / n_slots
+        return -band * 0.4 + (k + 0.5) * w, w
+
+    rng = np.random.default_rng(0)
+    stack = {}
+    legend = []
+    for i, trace in enumerate(fig.data):
+        color = trace.marker.color if isinstance(trace.marker.color, str) else PALETTE[i % len(PALETTE)]
+        if trace.name and trace.showlegend is not False:
+            legend.append((trace.name, color))
+        xs = [] if trace.x is None else [str(x) for x in trace.x]
+        ys = np.asarray([] if trace.y is None else trace.y, dtype=float)
+        offset, w = slot(trace, i)
+
+        if trace.type == "box":
+            for cat in dict.fromkeys(xs):
+                y = ys[[x == cat for x in xs]]
+                y = y[np.isfinite(y)]
+                if not len(y):
+                    continue
+                cx = px_(cat) + offset
+                q1, med, q3, lo, hi = _box_stats(y)
+                half = w * 0.35
+                canvas.line([(cx, float(py(lo))), (cx, float(py(q1)))], color)
+                canvas.line([(cx, float(py(q3))), (cx, float(py(hi)))], color)
+                canvas.rect(cx - half, float(py(q3)), cx + half, float(py(q1)), fill=_tint(color, 0.6), stroke=color)
+                canvas.line([(cx - half, float(py(med))), (cx + half, float(py(med)))], color, width=2)
+                if trace.boxpoints in ("all", "suspectedoutliers", "outliers", None):
+                    pts = y if trace.boxpoints == "all" else y[(y < lo) | (y > hi)]
+                    jitter = rng.uniform(-half * 0.6, half * 0.6, len(pts))
+                    canvas.circles(cx - half * 1.6 + jitter, py(pts), 2.5, color)
+
+        elif trace.type == "bar":
+            for cat, y, text in zip(xs, ys, trace.text if trace.text is not None else [None] * len(xs)):
+                if not np.isfinite(y):
+                    continue
+                cx = px_(cat) + offset
+                base = stack.get(cat, 0.0) if layout.barmode in ("relative", "stack") else 0.0
+                if layout.barmode in ("relative", "stack"):
+                    stack[cat] = base + y
+                y0, y1 = float(py(base)), float(py(base + y))
+                canvas.rect(cx - w / 2, y1, cx + w / 2, y0, fill=color)
+                label = _apply_template(trace.texttemplate, y, text) if trace.texttemplate or text is not None else ""
+                if label:
+                    size = trace.textfont.size or FONT
+                    if trace.textposition == "inside" and abs(y0 - y1) > size:
+                        canvas.text(cx, (y0 + y1) / 2, label, size=size, color="white")
+                    else:
+                        canvas.text(cx, y1 - 4, label, size=size, anchor="mb")
+
+        else:
+            keep = [k for k, x in enumerate(xs) if x in index and k < len(ys) and np.isfinite(ys[k])]
+            pts_x = np.array([px_(xs[k]) for k in keep])
+            pts_y = py(ys[keep]) if keep else np.array([])
+            mode = trace.mode or "markers"
+            if "lines" in mode and len(keep) > 1:
+                canvas.line(list(zip(pts_x, pts_y)), color, width=2)
+            if "markers" in mode:
+                canvas.circles(pts_x, pts_y, 3, color)
+            if "text" in mode and trace.text is not None:
+                size = trace.textfont.size or FONT
+                text_color = trace.textfont.color or AXIS
+                for k, x, y in zip(keep, pts_x, pts_y):
+                    above = trace.textposition is None or str(trace.textposition).startswith("top")
+                    canvas.text(x, y - 6 if above else y, trace.text[k], size=size, color=text_color,
+                                anchor="mb" if above else "mm")
+
+    # Text annotations at data coordinates (the "n=" labels above bars)
+    for note in layout.annotations:
+        if note.text is None or str(note.x) not in index or note.y is None:
+            continue
+        y = float(py(float(note.y))) - (note.yshift or 0)
+        canvas.text(px_(note.x) + (note.xshift or 0), y, note.text, size=note.font.size or FONT)
+
+    if show_legend:
+        for k, (name, color) in enumerate(dict.fromkeys(legend)):
+            y = top + 10 + k * 20
+            canvas.rect(right + 20, y - 6, right + 32, y + 6, fill=color)
+            canvas.text(right + 40, y, name if len(name) <= 16 else name[:15] + "…", anchor="lm")
+
+    return canvas.to_bytes()
+
+
+def write_image(fig, path, renderer="builtin", scale=1, width=WIDTH, height=HEIGHT):
+    # fig.write_image replacement; the format follows the file suffix like Kaleido's
+    # (heatmaps and other unsupported figures go through Kaleido either way)
+    path = str(path)
+    fmt = "svg" if path.endswith(".svg") else "png"
+    if renderer == "builtin":
+        try:
+            data = render(fig, fmt=fmt, width=width, height=height, scale=scale)
+        except UnsupportedFigure:
+            pass
+        else:
+            with open(path, "wb") as fh:
+                fh.write(data)
+            return
+    fig.write_image(path, scale=scale, width=width, height=height)
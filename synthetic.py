@@ -0,0 +1,73 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Stand-in instrument exports for load tests, benchmarks and equivalence checks
+
+CONDITIONS = ["100_FluA", "10_FluA", "100_MG", "10_MG"]
+CHANNELS = [("CH2", "B-Actin"), ("CH3", "AIV-M")]
+COLUMNS = [
+    "Sample Name", "Well ID", "Channel", "Assay", "Cq", "Ampl.", "Slope",
+    "Block02_Phase06_Cycle00_GREEN", "Classification",
+]
+
+
+def make_layout(n_wells=16, n_cols=4, conditions=CONDITIONS, replicates=2):
+    # Row-major pod layout, `replicates` neighbouring wells per condition
+    n_rows = -(-n_wells // n_cols)
+    cells = [conditions[(i // replicates) % len(conditions)] for i in range(n_rows * n_cols)]
+    return ["\t".join(cells[r * n_cols:(r + 1) * n_cols]) for r in range(n_rows)]
+
+
+def make_pod_export(n_wells=16, n_cols=4, seed=0, positive_rate=0.7, conditions=CONDITIONS):
+    # One row per well x channel; Sample Name / Well ID only on the first channel row,
+    # like the instrument export
+    rng = np.random.default_rng(seed)
+    n_ch = len(CHANNELS)
+    n = n_wells * n_ch
+
+    wells = np.repeat(np.arange(1, n_wells + 1), n_ch)
+    first = np.tile(np.arange(n_ch) == 0, n_wells)
+    positive = rng.random(n) < positive_rate
+    cq = np.where(positive, rng.normal(32, 1.2, n).round(2), -1.0)
+
+    df = pd.DataFrame({
+        "Sample Name": np.where(first, [f"Sample {w}" for w in wells], None),
+        "Well ID": np.where(first, wells, np.nan),
+        "Channel": np.tile([c for c, _ in CHANNELS], n_wells),
+        "Assay": np.tile([a for _, a in CHANNELS], n_wells),
+        "Cq": cq,
+        "Ampl.": np.where(positive, rng.normal(55, 12, n), rng.normal(2, 1, n)).round(2),
+        "Slope": np.where(positive, rng.normal(6.5, 1.5, n), rng.normal(0.2, 0.1, n)).round(2),
+        "Block02_Phase06_Cycle00_GREEN": "Click Repeat Analysis To See",
+        "Classification": np.where(positive, "POSITIVE", "NEGATIVE"),
+    }, columns=COLUMNS)
+    return df, make_layout(n_wells, n_cols, conditions)
+
+
+def make_multi_export(n_experiments=3, n_wells=16, n_devices=2, seed=0):
+    # ID:/Name:/Device: blocks, each followed by its own header row and well rows.
+    # Returned frame is meant to be written with header=False.
+    blocks = []
+    for e in range(n_experiments):
+        df, layout = make_pod_export(n_wells=n_wells, seed=seed + e)
+        cells = [c for row in layout for c in row.split("\t")]
+        df["Loaded"] = np.repeat(cells[:n_wells], len(CHANNELS))
+
+        meta = pd.DataFrame([
+            [f"ID: EXP{e:04d}"],
+            [f"Name: Run {e}"],
+            [f"Device: DEV{e % n_devices}"],
+            [None],
+        ])
+        blocks.append(meta)
+        blocks.append(pd.DataFrame([df.columns.tolist()]))
+        blocks.append(pd.DataFrame(df.to_numpy()))
+    return pd.concat(blocks, ignore_index=True)
+
+
+def to_xlsx_bytes(df, header=True):
+    buffer = BytesIO()
+    df.to_excel(buffer, index=False, header=header)
+    return buffer.getvalue()
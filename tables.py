@@ -0,0 +1,59 @@
+import math
+import weakref
+
+# Table display for the Streamlit apps. st.dataframe converts a pandas frame to Arrow on
+# every rerun; result frames are converted once here and the pyarrow Table is reused for
+# as long as the frame is alive (result frames are never modified in place). Tables
+# beyond LARGE_TABLE_ROWS are paged: only the visible slice -- a zero-copy Table.slice --
+# is sent to the browser.
+
+PAGE_SIZE = 1000
+LARGE_TABLE_ROWS = 5000
+
+_tables = {}
+
+
+def _to_arrow(df):
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns (numbers and text in one column) are shown as text
+        mixed = {c: df[c].astype("string") for c in df.columns if df[c].dtype == object}
+        return pa.Table.from_pandas(df.assign(**mixed), preserve_index=False)
+
+
+def arrow_table(df):
+    # DataFrame -> pyarrow Table, converted once per live frame
+    cached = _tables.get(id(df))
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+    table = _to_arrow(df)
+    _tables[id(df)] = (weakref.ref(df, lambda _, k=id(df): _tables.pop(k, None)), table)
+    return table
+
+
+def show_table(df, key, container=None, cache=True, page_size=PAGE_SIZE, select=False, **kwargs):
+    # st.dataframe replacement. cache=False for frames rebuilt on every rerun (filtered
+    # views): large ones then convert only the visible page. select=True makes rows
+    # clickable; returns the selected row positions in df.
+    import streamlit as st
+
+    container = container or st
+    if select:
+        kwargs.update(on_select="rerun", selection_mode="single-row", key=f"{key}_table")
+    n_rows = len(df)
+    if n_rows <= LARGE_TABLE_ROWS:
+        start = 0
+        event = container.dataframe(arrow_table(df) if cache else df, hide_index=True, **kwargs)
+    else:
+        n_pages = math.ceil(n_rows / page_size)
+        left, right = container.columns([1, 4])
+        page = left.number_input("Page", 1, n_pages, 1, key=f"{key}_page")
+        start = (page - 1) * page_size
+        stop = min(start + page_size, n_rows)
+        right.caption(f"Rows {start + 1:,}–{stop:,} of {n_rows:,} ({n_pages:,} pages)")
+        window = arrow_table(df).slice(start, stop - start) if cache else _to_arrow(df.iloc[start:stop])
+        event = container.dataframe(window, hide_index=True, **kwargs)
+    return [start + r for r in event.selection.rows] if select else []
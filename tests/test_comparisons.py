@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ttest_ind
+
+from comparisons import adjust_pvalues, comparison_matrix, pairwise_tests
+
+
+def _replicates(seed=0, base=30.0, spread=1.0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for channel in ["CH2", "CH3"]:
+        for k, loaded in enumerate(["A", "B", "C"]):
+            for _ in range(6):
+                rows.append({"Channel": channel, "Loaded": loaded, "Cq": base + k * spread + rng.normal(0, spread)})
+    return pd.DataFrame(rows)
+
+
+def test_welch_matches_scipy():
+    df = _replicates()
+    res = pairwise_tests(df, metrics=["Cq"])
+    assert len(res) == 6
+    for row in res.itertuples():
+        sel = df[df["Channel"] == row.Channel]
+        t, p = ttest_ind(sel.loc[sel["Loaded"] == row.Group_A, "Cq"], sel.loc[sel["Loaded"] == row.Group_B, "Cq"],
+                         equal_var=False)
+        assert row.t == pytest.approx(t) and row.p == pytest.approx(p)
+
+
+def test_moments_are_stable_at_large_offsets():
+    # Sums are shifted by each cell's first value: no cancellation around 1e6
+    df = _replicates(base=1e6, spread=1e-3)
+    res = pairwise_tests(df, metrics=["Cq"])
+    for row in res.itertuples():
+        sel = df[(df["Channel"] == row.Channel)]
+        t, _ = ttest_ind(sel.loc[sel["Loaded"] == row.Group_A, "Cq"], sel.loc[sel["Loaded"] == row.Group_B, "Cq"],
+                         equal_var=False)
+        assert row.t == pytest.approx(t, rel=1e-6)
+
+
+def test_adjust_pvalues():
+    p = np.array([0.01, 0.04, np.nan, 0.03, 0.2])
+    bh = adjust_pvalues(p)
+    # Benjamini-Hochberg by hand: sorted p * m / rank, then a running minimum from the top
+    np.testing.assert_allclose(bh[[0, 3, 1, 4]], [0.04, 0.0533333, 0.0533333, 0.2], rtol=1e-5)
+    assert np.isnan(bh[2])
+    np.testing.assert_allclose(adjust_pvalues(p, "bonferroni")[[0, 4]], [0.04, 0.8])
+    np.testing.assert_allclose(adjust_pvalues(p, "holm")[[0, 3, 1, 4]], [0.04, 0.09, 0.09, 0.2])
+    with pytest.raises(ValueError):
+        adjust_pvalues(p, "nope")
+
+
+def test_comparison_matrix_is_symmetric():
+    res = pairwise_tests(_replicates(), metrics=["Cq"])
+    matrix = comparison_matrix(res, "Cq", Channel="CH2")
+    assert list(matrix.index) == ["A", "B", "C"]
+    np.testing.assert_array_equal(matrix.to_numpy(), matrix.to_numpy().T)
@@ -0,0 +1,55 @@
+import pytest
+
+from dedup import DedupIndex, ingest_multi
+from synthetic import make_multi_export, to_xlsx_bytes
+
+
+def _file(n_experiments=2, seed=0, rename=None):
+    grid = make_multi_export(n_experiments=n_experiments, seed=seed)
+    if rename:
+        grid.iloc[:, 0] = grid.iloc[:, 0].replace(rename)
+    return to_xlsx_bytes(grid, header=False)
+
+
+def _statuses(report):
+    return sorted(zip(report["Experiment_ID"].fillna(""), report["Status"]))
+
+
+def test_duplicate_file_and_experiments_within_one_call():
+    df, report = ingest_multi([("a.xlsx", _file(2)), ("copy.xlsx", _file(2)), ("b.xlsx", _file(3))])
+    assert sorted(df["Experiment_ID"].unique()) == ["EXP0000", "EXP0001", "EXP0002"]
+    assert _statuses(report) == [
+        ("", "duplicate file"), ("EXP0000", "duplicate experiment"), ("EXP0001", "duplicate experiment"),
+    ]
+
+
+def test_index_carries_over_between_calls():
+    index = DedupIndex()
+    ingest_multi([("a.xlsx", _file(2))], index=index)
+    df, report = ingest_multi([("b.xlsx", _file(3))], index=index)
+    assert df["Experiment_ID"].unique().tolist() == ["EXP0002"]
+    assert len(report) == 2
+
+    df, report = ingest_multi([("a.xlsx", _file(2))], index=index)
+    assert df.empty and report["Status"].tolist() == ["duplicate file"]
+
+
+def test_conflict_and_copied_content():
+    index = DedupIndex()
+    ingest_multi([("a.xlsx", _file(1))], index=index)
+    # Same ID, other content: the first one is kept
+    df, report = ingest_multi([("b.xlsx", _file(1, seed=7))], index=index)
+    assert df.empty and _statuses(report) == [("EXP0000", "conflict")]
+    # Same content under another ID: kept, but reported
+    df, report = ingest_multi([("c.xlsx", _file(1, rename={"ID: EXP0000": "ID: RERUN"}))], index=index)
+    assert df["Experiment_ID"].unique().tolist() == ["RERUN"]
+    assert _statuses(report) == [("RERUN", "copied content")]
+
+
+def test_failed_ingest_leaves_index_unchanged():
+    index = DedupIndex()
+    with pytest.raises(Exception):
+        ingest_multi([("a.xlsx", _file(2)), ("broken.xlsx", b"not a workbook")], index=index)
+    assert not index.files and not index.experiments and not index.rows
+    df, report = ingest_multi([("a.xlsx", _file(2))], index=index)
+    assert df["Experiment_ID"].nunique() == 2 and report.empty
@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from formats import FormatError, parse_multi_block
+from synthetic import make_multi_export
+
+
+def test_multi_block_without_header_row():
+    grid = pd.DataFrame([["ID: 1"], ["Name: run"], ["Device: D1"], ["A1"]])
+    with pytest.raises(FormatError, match="Sample Name"):
+        parse_multi_block(grid)
+
+
+def test_multi_block_fills_down_within_experiments():
+    grid = make_multi_export(n_experiments=2)
+    grid.columns = range(grid.shape[1])
+    df = parse_multi_block(grid)
+    assert df["Experiment_ID"].nunique() == 2
+    assert df["Well ID"].notna().all()
+    assert df["Cq"].dtype.kind == "f"
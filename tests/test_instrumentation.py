@@ -0,0 +1,41 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from instrumentation import StageRecorder
+
+
+def test_total_counts_top_level_stages_only():
+    timings = StageRecorder(log_path=None)
+    with timings.stage("outer"):
+        with timings.stage("inner"):
+            time.sleep(0.01)
+    with timings.stage("second"):
+        pass
+    outer, second = timings.records[1], timings.records[2]
+    assert [r["depth"] for r in timings.records] == [1, 0, 0]
+    assert timings.total_seconds == outer["seconds"] + second["seconds"]
+    assert timings.to_frame()["stage"].tolist() == ["└ inner", "outer", "second"]
+
+
+@pytest.mark.skipif(not Path("/proc/self/statm").exists(), reason="RSS is read from /proc")
+def test_memory_is_reported_without_tracing():
+    timings = StageRecorder(log_path=None)
+    with timings.stage("alloc"):
+        data = np.ones(5_000_000)
+    frame = timings.to_frame()
+    assert "peak_mb" not in frame.columns
+    assert frame["rss_mb"].iloc[0] > 20
+    del data
+
+
+def test_traced_peak_covers_nested_stages():
+    timings = StageRecorder(log_path=None, trace_memory=True)
+    with timings.stage("outer"):
+        with timings.stage("inner"):
+            data = np.ones(5_000_000)
+            del data
+    inner, outer = timings.records
+    assert inner["peak_mb"] > 35 and outer["peak_mb"] >= inner["peak_mb"]
@@ -0,0 +1,26 @@
+import multi_experiment
+from formats import parse_multi_block
+from multi_experiment import build_cube, rollup_summary
+from synthetic import make_multi_export
+
+
+def _replicates():
+    grid = make_multi_export(n_experiments=3)
+    grid.columns = range(grid.shape[1])
+    return parse_multi_block(grid)
+
+
+def test_rollup_outside_cube_grain_uses_outlier_method(monkeypatch):
+    df = _replicates()
+    methods = []
+    flag = multi_experiment.flag_outliers
+
+    def spy(df, *args, method="mad", **kwargs):
+        methods.append(method)
+        return flag(df, *args, method=method, **kwargs)
+
+    monkeypatch.setattr(multi_experiment, "flag_outliers", spy)
+    cube = build_cube(df, exclude_outliers=True, outlier_method="grubbs")
+    out = rollup_summary(cube, df, ("Sample Name", "Channel"), exclude_outliers=True, outlier_method="grubbs")
+    assert methods == ["grubbs", "grubbs"]
+    assert len(out) and out["Cq_n"].sum() <= len(df)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qc import METHODS, dropped_wells, flag_outliers
+
+
+def _groups(values):
+    # {Loaded: [Cq, ...]} -> replicate rows
+    return pd.DataFrame(
+        [{"Loaded": loaded, "Well_ID": i, "Cq": cq} for loaded, cqs in values.items() for i, cq in enumerate(cqs)]
+    )
+
+
+def test_dixon_r10_small_groups():
+    out = flag_outliers(_groups({"a": [30.0, 30.1, 30.2, 30.3, 33.0]}), method="dixon")
+    assert out["Cq_outlier"].tolist() == [False] * 4 + [True]
+    assert out["Cq_outlier_score"].iloc[-1] == pytest.approx(2.7 / 3.0)
+
+
+def test_dixon_r11_large_groups():
+    # r11 = gap / range without the opposite extreme
+    low = [25.0, 30.0, 30.1, 30.2, 30.3, 30.4, 30.5, 30.6]
+    out = flag_outliers(_groups({"a": low + [32.0]}), method="dixon")
+    assert out["Cq_outlier_score"].iloc[-1] == pytest.approx(1.4 / 2.0)
+    assert out["Cq_outlier_score"].iloc[0] == pytest.approx(5.0 / 5.6)
+    assert out["Cq_outlier"].tolist() == [True] + [False] * 7 + [True]
+
+
+def test_methods_ignore_no_cq_sentinel_and_small_groups():
+    df = _groups({"a": [30.0, 30.1, 30.2, 30.1, -1.0, 36.0], "b": [30.0, 40.0]})
+    for method in METHODS:
+        out = flag_outliers(df, method=method)
+        assert out.loc[out["Loaded"] == "a", "Cq_outlier"].tolist() == [False] * 5 + [True], method
+        assert not out.loc[out["Loaded"] == "b", "QC_outlier"].any(), method
+
+
+def test_dropped_wells_lists_flagged_rows():
+    out = flag_outliers(_groups({"a": [30.0, 30.1, 30.2, 30.1, 36.0]}))
+    report = dropped_wells(out)
+    assert report[["Loaded", "Well_ID", "Cq"]].values.tolist() == [["a", 4, 36.0]]
+    assert np.isfinite(report["Cq_outlier_score"]).all()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollup import RollupCube, summarize
+
+DIMS = ["Experiment_ID", "Channel", "Loaded"]
+
+
+def _replicates(n=600, seed=0, offset=0.0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Experiment_ID": rng.choice(["E1", "E2", "E3"], n),
+        "Channel": rng.choice(["CH2", "CH3"], n),
+        "Loaded": rng.choice(["10_A", "100_A", "10_B", "100_B"], n),
+        "Cq": rng.normal(30 + offset, 1.5, n),
+        "Ampl.": rng.normal(50, 10, n),
+        "Slope": rng.normal(6, 1, n),
+        "Classification": rng.choice(["POSITIVE", "NEGATIVE"], n),
+    })
+    df.loc[rng.random(n) < 0.1, "Cq"] = np.nan
+    return df
+
+
+def _reference(df, dims):
+    g = df.groupby(dims, sort=True)
+    return pd.DataFrame({
+        "Cq_mean": g["Cq"].mean(), "Cq_std": g["Cq"].std(), "Cq_n": g["Cq"].count(),
+        "N_rows": g.size(),
+        "Detection_%": 100 * g["Classification"].apply(lambda c: (c == "POSITIVE").mean()),
+    }).reset_index()
+
+
+def _compare(out, ref):
+    out = out.sort_values(list(ref.columns[:-5])).reset_index(drop=True)
+    for col in ["Cq_mean", "Cq_std", "Detection_%"]:
+        np.testing.assert_allclose(out[col], ref[col], rtol=1e-9, atol=1e-12)
+    assert out["Cq_n"].tolist() == ref["Cq_n"].tolist()
+    assert out["N_rows"].tolist() == ref["N_rows"].tolist()
+
+
+@pytest.mark.parametrize("dims", [DIMS, ["Channel", "Loaded"], ["Channel"], ["Loaded", "Experiment_ID"]])
+def test_cube_levels_match_groupby(dims):
+    df = _replicates()
+    cube = RollupCube(df, levels=[["Channel"]], dims=DIMS)
+    _compare(cube.summary(dims), _reference(df, dims))
+    _compare(summarize(df, dims), _reference(df, dims))
+
+
+def test_unknown_dimension():
+    with pytest.raises(KeyError):
+        RollupCube(_replicates(), dims=DIMS).summary(["Device"])
+
+
+def test_merge_recentres_shifts():
+    a, b = _replicates(seed=1), _replicates(seed=2, offset=5.0)
+    merged = RollupCube(a, dims=DIMS).merge(RollupCube(b, dims=DIMS))
+    _compare(merged.summary(DIMS), _reference(pd.concat([a, b], ignore_index=True), DIMS))
+
+
+def test_std_is_stable_for_tightly_clustered_values():
+    rng = np.random.default_rng(3)
+    df = _replicates(n=2000).assign(Cq=lambda d: 1e4 + rng.normal(0, 1e-4, len(d)))
+    out = RollupCube(df, dims=DIMS).summary(DIMS).sort_values(DIMS).reset_index(drop=True)
+    ref = _reference(df, DIMS)
+    np.testing.assert_allclose(out["Cq_std"], ref["Cq_std"], rtol=1e-6)
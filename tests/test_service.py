@@ -0,0 +1,68 @@
+import json
+from urllib.parse import urlencode
+
+import pandas as pd
+from tornado.testing import AsyncHTTPTestCase
+
+from service import AnalysisService, make_app
+from synthetic import make_multi_export, make_pod_export, to_xlsx_bytes
+
+
+def _multi(n_experiments=2, seed=0):
+    return to_xlsx_bytes(make_multi_export(n_experiments=n_experiments, seed=seed), header=False)
+
+
+class ServiceTest(AsyncHTTPTestCase):
+    def get_app(self):
+        self.service = AnalysisService(workers=1)
+        return make_app(self.service)
+
+    def tearDown(self):
+        super().tearDown()
+        self.service.pool.shutdown()
+
+    def post(self, path, body, **args):
+        return self.fetch(path + ("?" + urlencode(args) if args else ""), method="POST", body=body)
+
+    def test_pod(self):
+        df, layout = make_pod_export()
+        r = self.post("/analyze", to_xlsx_bytes(df), layout="\n".join(layout))
+        assert r.code == 200
+        data = json.loads(r.body)
+        assert data["kind"] == "pod" and data["rows"] == len(df)
+        assert self.post("/analyze", to_xlsx_bytes(df)).code == 400
+
+    def test_bad_upload_is_422(self):
+        r = self.post("/analyze/multi", b"not a workbook")
+        assert r.code == 422
+        assert "error" in json.loads(r.body)
+
+    def test_multi_without_session_is_repeatable(self):
+        body = _multi()
+        first = self.post("/analyze/multi", body)
+        second = self.post("/analyze/multi", body)
+        assert first.code == second.code == 200
+        assert second.headers["X-Cache"] == "hit"
+        assert json.loads(first.body)["experiments"] == json.loads(second.body)["experiments"]
+        assert json.loads(self.fetch("/health").body)["experiments_ingested"] == 0
+
+    def test_multi_session_skips_ingested_experiments(self):
+        body = _multi(2)
+        assert self.post("/analyze/multi", body, session="a").code == 200
+        assert self.post("/analyze/multi", body, session="a").code == 422
+
+        # A larger export of the same runs: only its new experiment is analyzed
+        r = self.post("/analyze/multi", _multi(3), session="a")
+        data = json.loads(r.body)
+        assert r.code == 200 and len(data["experiments"]) == 1
+        assert pd.DataFrame(data["duplicates"])["Status"].eq("duplicate experiment").sum() == 2
+
+        # Other sessions and session-less requests are unaffected
+        assert self.post("/analyze/multi", body, session="b").code == 200
+        assert self.post("/analyze/multi", body).code == 200
+        health = json.loads(self.fetch("/health").body)
+        assert health["dedup_sessions"] == 2 and health["experiments_ingested"] == 5
+
+    def test_metrics(self):
+        r = self.fetch("/metrics")
+        assert r.code == 200 and b"qpcr_service_queue_depth" in r.body
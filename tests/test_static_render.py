@@ -0,0 +1,31 @@
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import pytest
+
+from static_render import UnsupportedFigure, render
+
+
+def _figure():
+    fig = go.Figure(go.Bar(x=["a", "b", "c"], y=np.array([1.0, 2.5, 4.0]), text=["1", "2.5", "4"]))
+    fig.add_trace(go.Box(x=["a"] * 5 + ["b"] * 5, y=np.arange(10.0), name="replicates"))
+    return fig
+
+
+def test_typed_arrays_render_like_plain_ones():
+    fig = _figure()
+    restored = pio.from_json(fig.to_json())
+    assert isinstance(restored.data[0].y, dict)
+    assert render(restored, fmt="svg") == render(fig, fmt="svg")
+
+
+def test_render_leaves_the_figure_unchanged():
+    restored = pio.from_json(_figure().to_json())
+    before = [dict(trace["y"]) for trace in restored.data]
+    render(restored, fmt="svg")
+    assert [trace["y"] for trace in restored.data] == before
+
+
+def test_heatmap_is_unsupported():
+    with pytest.raises(UnsupportedFigure):
+        render(go.Figure(go.Heatmap(z=[[1, 2], [3, 4]])), fmt="svg")
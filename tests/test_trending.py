@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from trending import ControlTracker, run_values, westgard
+
+
+def _controls(experiments, cq=30.0, dates=None):
+    rows = []
+    for i, exp in enumerate(experiments):
+        for rep in range(2):
+            rows.append({"Experiment_ID": exp, "Device": "D1", "Loaded": "0_NTC", "Channel": "CH2",
+                         "Cq": cq + i + rep * 0.1, "Classification": "POSITIVE"})
+    df = pd.DataFrame(rows)
+    if dates is not None:
+        df["Run_Date"] = df["Experiment_ID"].map(dict(zip(experiments, pd.to_datetime(dates))))
+    return df
+
+
+@pytest.mark.parametrize("recent, hits", [
+    ([0.5], []),
+    ([2.5], ["1_2s"]),
+    ([-3.5], ["1_2s", "1_3s"]),
+    ([2.1, 2.2], ["1_2s", "2_2s"]),
+    ([-2.1, 2.2], ["1_2s", "R_4s"]),
+    ([1.5, 1.2, 1.1, 1.3], ["4_1s"]),
+    ([1.5, 1.2, -1.1, 1.3], []),
+    ([0.2] * 10, ["10_x"]),
+    ([0.2] * 9 + [-0.1], []),
+])
+def test_westgard_rules(recent, hits):
+    assert westgard(recent) == hits
+
+
+def test_rejected_runs_stay_out_of_the_limits(tmp_path):
+    tracker = ControlTracker(tmp_path, min_baseline=3)
+    tracker.add_runs(_controls([f"run{i}" for i in range(4)], cq=30.0).assign(Cq=lambda d: 30 + d.index % 4 * 0.1))
+    before = tracker.limits(("D1", "NTC", "CH2"))
+    added = tracker.add_runs(_controls(["bad"], cq=45.0))
+    assert added["Reject"].tolist() == [True] and "1_3s" in added["Violations"][0]
+    assert tracker.limits(("D1", "NTC", "CH2")) == before
+    # Already tracked runs are skipped
+    assert tracker.add_runs(_controls(["bad"], cq=45.0)).empty
+
+
+def test_runs_follow_upload_order_without_dates():
+    runs = run_values(_controls(["exp-10", "exp-2", "exp-1"]))
+    assert runs["Experiment_ID"].tolist() == ["exp-10", "exp-2", "exp-1"]
+
+
+def test_runs_follow_run_date():
+    df = _controls(["b", "a", "c"], dates=["2024-03-01", "2024-01-01", "2024-02-01"])
+    assert run_values(df)["Experiment_ID"].tolist() == ["a", "c", "b"]
+
+
+def test_points_by_key_and_tail(tmp_path):
+    tracker = ControlTracker(tmp_path, min_baseline=2)
+    tracker.add_runs(_controls([f"run{i}" for i in range(6)]))
+    key = ("D1", "NTC", "CH2")
+    assert tracker.points(key)["Experiment_ID"].tolist() == [f"run{i}" for i in range(6)]
+    assert tracker.points(key, last=2)["Experiment_ID"].tolist() == ["run4", "run5"]
+    assert tracker.points(("D9", "NTC", "CH2")).empty
+
+    # A second tracker (another process) appends; the first one picks it up
+    ControlTracker(tmp_path, min_baseline=2).add_runs(_controls(["run6"]))
+    assert tracker.points(key, last=1)["Experiment_ID"].tolist() == ["run6"]
+    assert len(tracker.points()) == 7
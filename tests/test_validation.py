@@ -0,0 +1,76 @@
+import pandas as pd
+
+from analysis_v6 import apply_layout
+from formats import NON_NUMERIC, load
+from synthetic import make_multi_export, make_pod_export, to_xlsx_bytes
+from validation import has_errors, validate_multi, validate_pod
+
+
+def _failed(report, rule):
+    return report[report["Rule"] == rule].set_index("Column")["Rows"].to_dict()
+
+
+def test_clean_pod_export_passes():
+    df, layout = make_pod_export()
+    fmt, loaded = load(to_xlsx_bytes(df))
+    assert fmt == "single_pod"
+    assert NON_NUMERIC not in loaded.columns
+    assert not has_errors(validate_pod(apply_layout(loaded, layout)))
+
+
+def test_non_numeric_cq_is_reported_after_load():
+    df, layout = make_pod_export()
+    df = df.astype({"Cq": object, "Slope": object})
+    df.loc[[1, 5], "Cq"] = ["abc", "--"]
+    df.loc[5, "Slope"] = "?"
+    fmt, loaded = load(to_xlsx_bytes(df))
+    assert loaded["Cq"].dtype.kind == "f"
+    assert loaded[NON_NUMERIC].dropna().to_dict() == {1: "Cq", 5: "Cq, Slope"}
+
+    report = validate_pod(apply_layout(loaded, layout))
+    assert has_errors(report)
+    assert _failed(report, "cq_numeric") == {"Cq": 2}
+    assert _failed(report, "numeric_ampl_slope") == {"Slope": 1}
+
+
+def test_non_numeric_cq_in_multi_block_export():
+    df = make_multi_export(n_experiments=2).astype(object)
+    data = df.index[df.iloc[:, 0].eq("Sample Name").shift(fill_value=False)]
+    df.iloc[data[0], df.iloc[data[0] - 1].tolist().index("Cq")] = "undetermined"
+    fmt, loaded = load(to_xlsx_bytes(df, header=False))
+    assert fmt == "multi_block"
+    assert _failed(validate_multi(loaded), "cq_numeric") == {"Cq": 1}
+
+
+def test_rules_on_a_typed_frame():
+    df, layout = make_pod_export(n_wells=8)
+    df = apply_layout(load(to_xlsx_bytes(df))[1], layout)
+    df.loc[0, "Channel"] = "CH9"
+    df.loc[1, "Cq"] = 75.0
+    df.loc[2, ["Classification", "Cq"]] = ["POSITIVE", -1.0]
+    df.loc[3, "Slope"] = -1.0
+    df.loc[4, "Classification"] = "MAYBE"
+    df.loc[5, "Loaded"] = None
+    df = pd.concat([df, df.iloc[[6]]], ignore_index=True)
+
+    report = validate_pod(df)
+    failed = {(r.Rule, r.Column): r.Rows for r in report.itertuples()}
+    assert failed == {
+        ("channel_known", "Channel"): 1,
+        ("cq_range", "Cq"): 1,
+        ("positive_without_cq", "Cq"): 1,
+        ("sentinel_outside_cq", "Slope"): 1,
+        ("classification_known", "Classification"): 1,
+        ("loaded_mapped", "Loaded"): 1,
+        ("duplicate_well_channel", "Well_ID, Channel"): 2,
+    }
+    # Errors sort first
+    assert report["Severity"].tolist()[0] == "error" and has_errors(report)
+    assert not has_errors(validate_pod(df, channels=["CH9"]).query("Rule != 'loaded_mapped'"))
+
+
+def test_missing_column_is_an_error():
+    df, layout = make_pod_export(n_wells=4)
+    df = apply_layout(load(to_xlsx_bytes(df))[1], layout).drop(columns="Classification")
+    report = validate_pod(df)
+    assert "Missing column(s): Classification" in report["Description"].tolist()
@@ -0,0 +1,276 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from rollup import RollupCube, with_derived
+
+# Levey-Jennings trending of control wells across runs. Each Device x Condition x Channel
+# keeps Welford running statistics (n, mean, M2) of its per-run means plus the last few
+# z-scores the Westgard rules look at, so adding a run costs O(new rows) no matter how much
+# history is stored. Every point is judged against the limits from the runs before it,
+# then folded in unless a rejection rule fired.
+#
+# The JSON-lines points file is the only store: a point carries everything needed to
+# replay the statistics, so an add appends its new points and nothing is rewritten. The
+# file is read once at start-up; after that, under an exclusive file lock, each add first
+# folds in the points other processes appended since, then appends its own. Only the byte
+# offset of each point is kept in memory (per control key), so charting the last N runs of
+# a key seeks to N lines instead of rereading the file.
+
+TREND_DIR = os.environ.get("TREND_DIR", "trends")
+TREND_KEY = ["Device", "Condition", "Channel"]
+TREND_LEVEL = ("Experiment_ID", "Device", "Condition", "Channel")
+# Wells whose Condition, Loaded or Sample_Name is one of these labels (case-insensitive)
+# are controls; nothing else is trended
+CONTROLS = [
+    c.strip() for c in os.environ.get("TREND_CONTROLS", "NTC,NC,PC,NEG,POS,CTRL,Negative control,Positive control")
+    .split(",") if c.strip()
+]
+
+# Westgard rules: name -> (number of most recent z-scores needed, reject?)
+RULES = {
+    "1_2s": (1, False),
+    "1_3s": (1, True),
+    "2_2s": (2, True),
+    "R_4s": (2, True),
+    "4_1s": (4, True),
+    "10_x": (10, True),
+}
+HISTORY = max(n for n, _ in RULES.values())
+
+
+def westgard(recent):
+    # recent: z-scores, oldest first, current last -> list of violated rule names
+    z = recent[-1]
+    hits = []
+    if abs(z) > 2:
+        hits.append("1_2s")
+    if abs(z) > 3:
+        hits.append("1_3s")
+    if len(recent) >= 2:
+        a, b = recent[-2], recent[-1]
+        if (a > 2 and b > 2) or (a < -2 and b < -2):
+            hits.append("2_2s")
+        if (a > 2 and b < -2) or (a < -2 and b > 2):
+            hits.append("R_4s")
+    if len(recent) >= 4 and (all(v > 1 for v in recent[-4:]) or all(v < -1 for v in recent[-4:])):
+        hits.append("4_1s")
+    if len(recent) >= 10 and (all(v > 0 for v in recent[-10:]) or all(v < 0 for v in recent[-10:])):
+        hits.append("10_x")
+    return hits
+
+
+def control_rows(df, controls=CONTROLS):
+    # Control wells only, with Condition set to the control label each one matched
+    df = with_derived(df)
+    labels = {c.lower() for c in controls}
+    matched = pd.Series(None, index=df.index, dtype=object)
+    for col in ["Condition", "Loaded", "Sample_Name"]:
+        if col in df.columns:
+            values = df[col].astype(str).str.strip()
+            matched = matched.mask(matched.isna() & values.str.lower().isin(labels), values)
+    keep = matched.notna()
+    return df[keep].assign(Condition=matched[keep])
+
+
+def run_values(df, metric="Cq"):
+    # One value per run and control key: the mean of that run's replicates. Runs come in
+    # Run_Date order when the export has dates, else in the order they appear in df
+    # (upload / block order); the cube itself sorts Experiment_ID as text.
+    values = pd.to_numeric(df[metric], errors="coerce")
+    if metric == "Cq":
+        values = values.where(values != -1)
+    cube = RollupCube(df.assign(**{metric: values}), measures=[metric], dims=TREND_LEVEL)
+    runs = cube.summary(TREND_LEVEL)
+    runs = runs[runs[f"{metric}_n"] > 0]
+
+    experiments = df["Experiment_ID"]
+    order = {"_seen": pd.Index(pd.unique(experiments)).get_indexer(runs["Experiment_ID"])}
+    if "Run_Date" in df.columns:
+        dates = pd.to_datetime(df["Run_Date"], errors="coerce").groupby(experiments, sort=False, dropna=False).min()
+        order = {"_date": dates.reindex(runs["Experiment_ID"]).to_numpy(), **order}
+    runs = runs.assign(**order).sort_values(list(order), kind="stable", na_position="last")
+    return runs[list(TREND_LEVEL) + [f"{metric}_mean", f"{metric}_n"]].rename(
+        columns={f"{metric}_mean": "Value", f"{metric}_n": "N"}
+    ).reset_index(drop=True)
+
+
+class ControlTracker:
+    def __init__(self, path=TREND_DIR, metric="Cq", min_baseline=5, controls=CONTROLS):
+        self.path = Path(path)
+        self.controls = list(controls)
+        self.metric = metric
+        self.min_baseline = min_baseline
+        self.points_file = self.path / f"{metric}_points.jsonl"
+        self.lock_file = self.path / f"{metric}.lock"
+        self._lock = threading.Lock()
+        self.keys = {}
+        self.runs = set()
+        self.offsets = {}
+        self._offset = 0
+        with self._lock:
+            self._catch_up()
+
+    @contextmanager
+    def _locked(self):
+        # Thread lock + exclusive lock on the lock file, shared with other processes
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_file, "a") as fh:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _fold(self, s, point):
+        # Replays one stored point into the running statistics of its key
+        if not math.isnan(point["z"]):
+            s["recent"] = (s["recent"] + [point["z"]])[-HISTORY:]
+        if point["Reject"]:
+            # Rejected runs are charted but kept out of the limits
+            return
+        # Welford update
+        s["n"] += 1
+        delta = point["Value"] - s["mean"]
+        s["mean"] += delta / s["n"]
+        s["m2"] += delta * (point["Value"] - s["mean"])
+
+    def _catch_up(self):
+        # Folds in points appended (by any process) since the last read
+        if not self.points_file.exists():
+            return
+        with open(self.points_file, "rb") as fh:
+            fh.seek(self._offset)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break  # a write still in progress
+                p = json.loads(line)
+                key = (p["Device"], p["Condition"], p["Channel"])
+                self.offsets.setdefault(key, []).append(self._offset)
+                self._offset += len(line)
+                self.runs.add((p["Experiment_ID"], *key))
+                self._fold(self.keys.setdefault(key, {"n": 0, "mean": 0.0, "m2": 0.0, "recent": []}), p)
+
+    def limits(self, key):
+        s = self.keys.get(tuple(key))
+        if not s or s["n"] < 2:
+            return float("nan"), float("nan")
+        return s["mean"], math.sqrt(s["m2"] / (s["n"] - 1))
+
+    def add_runs(self, df, controls=None):
+        # df: replicate rows with Experiment_ID/Device/Condition (or Loaded)/Channel; only
+        # control wells (controls, default self.controls) are added. Runs seen before
+        # (same Experiment_ID on the same Device) are skipped.
+        runs = run_values(control_rows(df, self.controls if controls is None else controls), self.metric)
+        new_points = []
+        with self._locked():
+            self._catch_up()
+            for row in runs.itertuples(index=False):
+                # Keys are kept as strings so they survive the JSON round trip (NaN included)
+                exp_id, device, condition, channel = (str(v) for v in row[:4])
+                value, n = float(row[4]), int(row[5])
+                key = (device, condition, channel)
+                if (exp_id, *key) in self.runs:
+                    continue
+                self.runs.add((exp_id, *key))
+
+                s = self.keys.setdefault(key, {"n": 0, "mean": 0.0, "m2": 0.0, "recent": []})
+                mean, sd = self.limits(key)
+                point = {
+                    "Experiment_ID": exp_id, "Device": device, "Condition": condition, "Channel": channel,
+                    "Value": value, "N": n, "Run_index": s["n"], "Mean": mean, "SD": sd,
+                    "z": float("nan"), "Violations": [], "Reject": False, "Added": time.time(),
+                }
+                if s["n"] >= self.min_baseline and sd > 0:
+                    z = (value - mean) / sd
+                    hits = westgard((s["recent"] + [z])[-HISTORY:])
+                    point.update(z=float(z), Violations=hits, Reject=any(RULES[h][1] for h in hits))
+
+                new_points.append(point)
+                self._fold(s, point)
+
+            if new_points:
+                self._append(new_points)
+        return pd.DataFrame(new_points)
+
+    def _append(self, new_points):
+        # Caller holds the file lock; one write, so readers never see half a batch
+        lines = [(json.dumps(p, allow_nan=True) + "\n").encode() for p in new_points]
+        with open(self.points_file, "ab") as fh:
+            fh.write(b"".join(lines))
+        for p, line in zip(new_points, lines):
+            self.offsets.setdefault((p["Device"], p["Condition"], p["Channel"]), []).append(self._offset)
+            self._offset += len(line)
+
+    def points(self, key=None, last=None):
+        if not self.points_file.exists():
+            return pd.DataFrame()
+        if key is None:
+            # Everything: read in chunks rather than one json.loads per line
+            with pd.read_json(self.points_file, lines=True, chunksize=50_000, dtype=False) as reader:
+                df = pd.concat(list(reader), ignore_index=True)
+            return df.tail(last).reset_index(drop=True) if last else df
+        with self._lock:
+            self._catch_up()
+            offsets = self.offsets.get(tuple(str(v) for v in key), [])
+            offsets = offsets[-last:] if last else list(offsets)
+        rows = []
+        with open(self.points_file, "rb") as fh:
+            for offset in offsets:
+                fh.seek(offset)
+                rows.append(json.loads(fh.readline()))
+        return pd.DataFrame(rows)
+
+    def summary(self):
+        rows = []
+        for key, s in self.keys.items():
+            mean, sd = self.limits(key)
+            rows.append(dict(zip(TREND_KEY, key), Runs=s["n"], Mean=mean, SD=sd,
+                             CV_pct=100 * sd / mean if mean else float("nan")))
+        return pd.DataFrame(rows, columns=TREND_KEY + ["Runs", "Mean", "SD", "CV_pct"])
+
+
+def control_chart(points, metric="Cq", title=None):
+    # Levey-Jennings chart: each run against the mean / ±1-3 SD limits it was judged by
+    import plotly.graph_objects as go
+
+    x = points["Experiment_ID"].astype(str)
+    fig = go.Figure()
+    for k, dash, color in ((3, "solid", "#d62728"), (2, "dash", "#ff7f0e"), (1, "dot", "#bbbbbb")):
+        for sign in (1, -1):
+            fig.add_trace(go.Scatter(
+                x=x, y=points["Mean"] + sign * k * points["SD"], mode="lines", line_shape="hv",
+                line=dict(dash=dash, color=color, width=1), name=f"±{k} SD", legendgroup=f"{k}sd",
+                showlegend=sign == 1, hoverinfo="skip",
+            ))
+    fig.add_trace(go.Scatter(
+        x=x, y=points["Mean"], mode="lines", line_shape="hv", line=dict(color="#444444", width=1), name="Mean",
+    ))
+    violations = points["Violations"].apply(lambda v: ", ".join(v) if isinstance(v, list) else "")
+    fig.add_trace(go.Scatter(
+        x=x, y=points["Value"], mode="lines+markers", name=metric,
+        line=dict(color="#636efa"),
+        marker=dict(
+            size=9,
+            color=np.where(points["Reject"], "#d62728", np.where(violations != "", "#ff7f0e", "#636efa")),
+        ),
+        text=violations,
+        hovertemplate="%{x}<br>" + metric + ": %{y:.2f}<br>%{text}<extra></extra>",
+    ))
+    fig.update_layout(title=title or f"{metric} control chart", xaxis_title="Run", yaxis_title=metric)
+    return fig
@@ -0,0 +1,206 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from formats import NON_NUMERIC
+
+# Declarative data-validation rules, checked before the summaries are built. Every rule
+# is one vectorized check over whole columns (numeric conversions are done once per
+# column and shared), so validating a million-row multi-experiment file costs a few
+# column scans. The result is a QC report with one row per violated rule.
+
+# Expected detection channels (up to 6-plex); other names are reported as a warning
+CHANNELS = [f"CH{i}" for i in range(1, 7)]
+CLASSIFICATIONS = ["POSITIVE", "NEGATIVE"]
+SEVERITIES = ["error", "warning"]
+REPORT_COLUMNS = ["Rule", "Severity", "Column", "Rows", "Pct", "Examples", "Description"]
+
+
+def _rules(well_col, sample_col, layout=False, channels=CHANNELS):
+    # (name, severity, check, columns, options, description)
+    rules = [
+        ("channel_known", "warning", "isin", ["Channel"], {"values": list(channels)},
+         f"Channel is not one of {', '.join(channels)}"),
+        ("well_present", "error", "notna", [well_col], {}, "Well ID missing after fill-down"),
+        ("classification_present", "error", "notna", ["Classification"], {}, "Classification missing"),
+        ("classification_known", "warning", "isin", ["Classification"], {"values": CLASSIFICATIONS, "skipna": True},
+         "Classification is not POSITIVE/NEGATIVE"),
+        ("cq_numeric", "error", "numeric", ["Cq"], {}, "Cq is not a number"),
+        ("cq_range", "warning", "range", ["Cq"], {"min": 0, "max": 50, "allow": [-1]},
+         "Cq outside 0-50 (other than the -1 'no Cq' sentinel)"),
+        ("numeric_ampl_slope", "warning", "numeric", ["Ampl.", "Slope"], {}, "Ampl./Slope is not a number"),
+        ("sentinel_outside_cq", "warning", "equals", ["Ampl.", "Slope"], {"value": -1},
+         "-1 sentinel in a column other than Cq"),
+        ("positive_without_cq", "warning", "positive_without_cq", ["Cq"], {},
+         "Classified POSITIVE but Cq is missing or -1"),
+        ("duplicate_well_channel", "warning", "duplicated", [well_col, "Channel"], {"by": ["Experiment_ID"]},
+         "Same well and channel appears more than once"),
+        ("sample_present", "warning", "notna", [sample_col], {}, "Sample name missing after fill-down"),
+    ]
+    if layout:
+        rules.append(("loaded_mapped", "error", "notna", ["Loaded"], {},
+                      "Well ID not covered by the loading scheme (Loaded is empty)"))
+    else:
+        rules.append(("loaded_present", "warning", "notna", ["Loaded"], {},
+                      "Loaded is empty; these rows are left out of the summary"))
+    return rules
+
+
+POD_RULES = _rules("Well_ID", "Sample_Name", layout=True)
+MULTI_RULES = _rules("Well ID", "Sample Name")
+
+
+class _Columns:
+    # Per-column numeric conversions, computed once and shared by all rules
+    def __init__(self, df):
+        self.df = df
+        self._numeric = {}
+
+    def raw(self, col):
+        return self.df[col]
+
+    def numeric(self, col):
+        if col not in self._numeric:
+            self._numeric[col] = pd.to_numeric(self.df[col], errors="coerce").to_numpy(dtype=float)
+        return self._numeric[col]
+
+
+def _check(cols, check, col, opts):
+    # -> boolean numpy mask of violating rows
+    if check == "notna":
+        return cols.raw(col).isna().to_numpy()
+    if check == "isin":
+        s = cols.raw(col)
+        bad = ~s.isin(opts["values"]).to_numpy()
+        return bad & s.notna().to_numpy() if opts.get("skipna") else bad
+    if check == "numeric":
+        # Frames from formats are already typed; their failed cells are listed in NON_NUMERIC
+        if NON_NUMERIC in cols.df.columns:
+            names = cols.raw(NON_NUMERIC).fillna("").str.split(", ")
+            return names.map(lambda failed: col in failed).to_numpy(dtype=bool)
+        return np.isnan(cols.numeric(col)) & cols.raw(col).notna().to_numpy()
+    if check == "range":
+        x = cols.numeric(col)
+        allowed = np.isin(x, opts.get("allow", []))
+        return ((x < opts["min"]) | (x > opts["max"])) & ~allowed
+    if check == "equals":
+        return cols.numeric(col) == opts["value"]
+    if check == "positive_without_cq":
+        # A missing Classification column is reported by classification_present
+        if "Classification" not in cols.df.columns:
+            return np.zeros(len(cols.df), dtype=bool)
+        x = cols.numeric(col)
+        return (cols.raw("Classification") == "POSITIVE").to_numpy() & (np.isnan(x) | (x == -1))
+    raise ValueError(f"Unknown check: {check}")
+
+
+def validate(df, rules, well_col=None, examples=5):
+    cols = _Columns(df)
+    n = len(df)
+    rows = []
+    for name, severity, check, columns, opts, description in rules:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            rows.append((name, "error", ", ".join(missing), n, 100.0, "", f"Missing column(s): {', '.join(missing)}"))
+            continue
+
+        if check == "duplicated":
+            keys = [c for c in opts.get("by", []) if c in df.columns] + columns
+            bad = df.duplicated(keys, keep=False).to_numpy()
+            targets = [", ".join(columns)]
+            masks = [bad]
+        else:
+            targets = columns
+            masks = [_check(cols, check, col, opts) for col in columns]
+
+        for col, bad in zip(targets, masks):
+            count = int(bad.sum())
+            if not count:
+                continue
+            idx = np.flatnonzero(bad)[:examples]
+            if well_col and well_col in df.columns:
+                wells = df[well_col].iloc[idx]
+                ex = ", ".join(f"row {i} (well {w:g})" if isinstance(w, float) else f"row {i} (well {w})"
+                               for i, w in zip(idx, wells))
+            else:
+                ex = ", ".join(f"row {i}" for i in idx)
+            rows.append((name, severity, col, count, round(100 * count / max(n, 1), 2), ex, description))
+
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    order = {s: i for i, s in enumerate(SEVERITIES)}
+    return report.sort_values("Severity", key=lambda s: s.map(order), kind="stable").reset_index(drop=True)
+
+
+def validate_pod(df, channels=CHANNELS):
+    rules = POD_RULES if channels is CHANNELS else _rules("Well_ID", "Sample_Name", layout=True, channels=channels)
+    return validate(df, rules, well_col="Well_ID")
+
+
+def validate_multi(df, channels=CHANNELS):
+    rules = MULTI_RULES if channels is CHANNELS else _rules("Well ID", "Sample Name", channels=channels)
+    return validate(df, rules, well_col="Well ID")
+
+
+def has_errors(report):
+    return bool(len(report)) and (report["Severity"] == "error").any()
+
+
+def show_validation_report(report, container=None):
+    # QC report panel shown above the results; errors expand it
+    import streamlit as st
+
+    container = container or st
+    if report is None:
+        return
+    errors = int((report["Severity"] == "error").sum()) if len(report) else 0
+    label = f"Data validation: {errors} error(s), {len(report) - errors} warning(s)" if len(report) else "Data validation: no issues"
+    with container.expander(label, expanded=errors > 0):
+        if not len(report):
+            st.caption("All validation rules passed.")
+            return
+        if errors:
+            st.error("Some rows failed validation; results for the affected wells may be incomplete or wrong.")
+        st.dataframe(report, hide_index=True)
+
+
+def main():
+    # python validation.py export.xlsx [--layout scheme.txt] [--strict]
+    from analysis_v6 import apply_layout
+    from formats import load
+
+    parser = argparse.ArgumentParser(description="Validate qPCR exports before analysis")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--layout", help="tab-separated loading scheme for single-pod exports")
+    parser.add_argument("--strict", action="store_true", help="exit 1 on warnings too")
+    parser.add_argument("--channels", default=",".join(CHANNELS), help="comma-separated expected channels")
+    args = parser.parse_args()
+
+    channels = [c.strip() for c in args.channels.split(",") if c.strip()]
+    failed = False
+    for path in args.files:
+        fmt, df = load(Path(path).read_bytes())
+        if fmt == "single_pod":
+            if args.layout:
+                df = apply_layout(df, Path(args.layout).read_text().strip().split("\n"))
+                report = validate_pod(df, channels)
+            else:
+                rules = _rules("Well_ID", "Sample_Name", layout=True, channels=channels)
+                report = validate(df, [r for r in rules if r[0] != "loaded_mapped"], well_col="Well_ID")
+        else:
+            report = validate_multi(df, channels)
+
+        print(f"{path} ({fmt}, {len(df)} rows)")
+        if len(report):
+            with pd.option_context("display.max_colwidth", 60, "display.width", 200):
+                print(report.drop(columns="Description").to_string(index=False))
+        else:
+            print("  no issues")
+        failed |= has_errors(report) or (args.strict and len(report) > 0)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())